@@ -0,0 +1,125 @@
+"""
+Rasch (one-parameter IRT) model for adaptive practice.
+
+The chance that a learner of ability theta answers a question of difficulty
+b correctly is sigmoid(theta - b). Both are on the same logit scale, and a
+question tells the most about a learner (its Fisher information p(1 - p)
+is largest) when b is closest to theta.
+
+calibrate() fits every question's difficulty and every learner's ability of
+a class from its answer history at once: joint maximum likelihood with a
+normal prior on both, solved by Newton steps that update all learners and
+then all questions as NumPy array operations. The prior keeps questions
+that everyone got right (or wrong) at a finite difficulty, and centres each
+question on its hand-set difficulty label until there is evidence.
+
+Between calibrations a learner's ability follows their answers with
+update_ability(), one step per answer sized by how much is already known,
+and closest_question() picks the next question by bisecting the
+difficulties sorted once per calibration.
+"""
+
+import bisect
+import math
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DIFFICULTY_PRIORS = {"easy": -1.0, "medium": 0.0, "hard": 1.0}  # logits for the hand-set labels
+DIFFICULTY_PRIOR_SD = 1.0
+ABILITY_PRIOR_SD = 1.0
+MAX_LOGIT = 6.0
+
+
+def difficulty_prior(label: Optional[str]) -> float:
+    return DIFFICULTY_PRIORS.get((label or "").strip().lower(), 0.0)
+
+
+def probability_correct(ability: float, difficulty: float) -> float:
+    return 1.0 / (1.0 + math.exp(difficulty - ability))
+
+
+def update_ability(ability: float, information: float, difficulty: float, is_correct: bool) -> Tuple[float, float]:
+    """(ability, information) after one answer.
+
+    `information` is the prior's 1 / ABILITY_PRIOR_SD**2 plus p(1 - p) of
+    every answer so far; the step shrinks as it grows, so early answers
+    move the estimate a lot and later ones fine-tune it.
+    """
+    p = probability_correct(ability, difficulty)
+    information += p * (1.0 - p)
+    ability += ((1.0 if is_correct else 0.0) - p) / information
+    return max(-MAX_LOGIT, min(MAX_LOGIT, ability)), information
+
+
+def calibrate(
+    learner_index: np.ndarray,
+    question_index: np.ndarray,
+    correct: np.ndarray,
+    prior_difficulty: np.ndarray,
+    num_learners: int,
+    max_iterations: int = 100,
+    tolerance: float = 1e-4,
+):
+    """Fit a Rasch model to a class's answers.
+
+    Answer i is learner learner_index[i] answering question
+    question_index[i], correct[i] being 1 or 0. prior_difficulty holds the
+    prior mean of every question, including ones without answers.
+
+    Returns (difficulty, difficulty standard error, ability, ability
+    information, iterations), the arrays indexed like the inputs.
+    """
+    num_questions = len(prior_difficulty)
+    correct = correct.astype(np.float64)
+    difficulty = prior_difficulty.astype(np.float64).copy()
+    ability = np.zeros(num_learners)
+    ability_precision = 1.0 / ABILITY_PRIOR_SD ** 2
+    difficulty_precision = 1.0 / DIFFICULTY_PRIOR_SD ** 2
+
+    iterations = 0
+    for iterations in range(1, max_iterations + 1):
+        p = 1.0 / (1.0 + np.exp(difficulty[question_index] - ability[learner_index]))
+        gradient = np.bincount(learner_index, correct - p, num_learners) - ability * ability_precision
+        hessian = np.bincount(learner_index, p * (1.0 - p), num_learners) + ability_precision
+        ability_step = gradient / hessian
+        ability = np.clip(ability + ability_step, -MAX_LOGIT, MAX_LOGIT)
+
+        p = 1.0 / (1.0 + np.exp(difficulty[question_index] - ability[learner_index]))
+        gradient = np.bincount(question_index, p - correct, num_questions) - (difficulty - prior_difficulty) * difficulty_precision
+        hessian = np.bincount(question_index, p * (1.0 - p), num_questions) + difficulty_precision
+        difficulty_step = gradient / hessian
+        difficulty = np.clip(difficulty + difficulty_step, -MAX_LOGIT, MAX_LOGIT)
+
+        if max(np.abs(ability_step).max(initial=0.0), np.abs(difficulty_step).max(initial=0.0)) < tolerance:
+            break
+
+    p = 1.0 / (1.0 + np.exp(difficulty[question_index] - ability[learner_index]))
+    information = p * (1.0 - p)
+    difficulty_error = 1.0 / np.sqrt(np.bincount(question_index, information, num_questions) + difficulty_precision)
+    ability_information = np.bincount(learner_index, information, num_learners) + ability_precision
+    return difficulty, difficulty_error, ability, ability_information, iterations
+
+
+def closest_question(difficulties: Sequence[float], question_ids: Sequence[int], ability: float, exclude: Iterable[int] = ()) -> Optional[int]:
+    """Id of the question whose difficulty is nearest `ability` (the most
+    informative one), skipping `exclude`; `difficulties` must be sorted"""
+    exclude = set(exclude)
+    right = bisect.bisect_left(difficulties, ability)
+    left = right - 1
+    while left >= 0 or right < len(difficulties):
+        if right >= len(difficulties) or (left >= 0 and ability - difficulties[left] <= difficulties[right] - ability):
+            candidate = question_ids[left]
+            left -= 1
+        else:
+            candidate = question_ids[right]
+            right += 1
+        if candidate not in exclude:
+            return candidate
+    return None
+
+
+def sorted_parameters(parameters: List[Tuple[int, float]]) -> Tuple[List[float], List[int]]:
+    """(difficulties, question ids) sorted by difficulty, for closest_question()"""
+    parameters = sorted(parameters, key=lambda pair: pair[1])
+    return [difficulty for _, difficulty in parameters], [question_id for question_id, _ in parameters]
@@ -0,0 +1,125 @@
+"""
+Group commit for graded quiz attempts.
+
+Concurrent submissions share one commit instead of queueing on SQLite's
+write lock, where waiting writers back off and sleep.
+"""
+
+import queue
+import threading
+import time
+from typing import List
+
+from sqlalchemy.exc import OperationalError
+
+
+class AttemptWriter:
+    """Group commit: submissions queue their rows and one thread stores everything queued in a single transaction"""
+
+    def __init__(self, sessions, store, max_batch: int, retries: int = 3, retry_delay: float = 0.05):
+        self.sessions = sessions  # session factory
+        self.store = store  # store(db, batch) inserts a batch's rows and returns the attempt ids, uncommitted
+        self.max_batch = max_batch
+        self.retries = retries  # further tries after a transient error, e.g. a locked database
+        self.retry_delay = retry_delay  # seconds before the first retry, doubled for each one after
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.closed = False
+        self.commits = 0
+        self.attempts = 0
+
+    def write(self, attempt_row: dict, response_rows: List[dict]) -> int:
+        """Store one attempt and its responses; returns the attempt id once committed"""
+        entry = {"attempt": attempt_row, "responses": response_rows, "done": threading.Event(), "id": None, "error": None}
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("The attempt writer is shut down")
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name="attempt-writer", daemon=True)
+                self.thread.start()
+            self.queue.put(entry)
+        entry["done"].wait()
+        if entry["error"] is not None:
+            raise entry["error"]
+        return entry["id"]
+
+    def close(self) -> None:
+        """Stop taking attempts, store the ones already queued and stop the thread"""
+        with self.lock:
+            self.closed = True
+            thread = self.thread
+            if thread is not None and thread.is_alive():
+                self.queue.put(None)  # queued after every accepted attempt
+        if thread is not None:
+            thread.join()
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            while batch[-1] is not None and len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is None
+            if stopping:
+                batch.pop()
+            if batch:
+                self.flush(batch)
+            if stopping:
+                return
+
+    def flush(self, batch: List[dict]) -> None:
+        if not self.commit(batch):
+            # Something in the batch failed, e.g. its quiz was deleted; store
+            # the others one at a time so only that submission gets the error
+            for entry in batch:
+                self.commit([entry])
+        for entry in batch:
+            entry["done"].set()
+
+    def commit(self, batch: List[dict]) -> bool:
+        """Store a batch in one transaction. False if a row in it was refused
+        and the batch has to be split; a lone entry gets the error instead"""
+        for retry in range(self.retries + 1):
+            db = self.sessions()
+            try:
+                attempt_ids = self.store(db, batch)
+                db.commit()
+                for entry, attempt_id in zip(batch, attempt_ids):
+                    entry["id"] = attempt_id
+                with self.lock:
+                    self.commits += 1
+                    self.attempts += len(batch)
+                return True
+            except OperationalError as e:
+                # Locked database, dropped connection: the rows are fine, try again
+                db.rollback()
+                if retry < self.retries:
+                    print(f"⚠️ Storing {len(batch)} quiz attempts failed, retrying: {e}")
+                    time.sleep(self.retry_delay * 2 ** retry)
+                    continue
+                print(f"❌ Could not store {len(batch)} quiz attempts: {e}")
+                for entry in batch:
+                    entry["error"] = e
+                return True
+            except Exception as e:
+                # IntegrityError and the like: a row is bad, e.g. its quiz was deleted
+                db.rollback()
+                if len(batch) > 1:
+                    return False
+                print(f"❌ Could not store quiz attempt: {e}")
+                batch[0]["error"] = e
+                return True
+            finally:
+                db.close()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "commits": self.commits,
+                "attempts": self.attempts,
+                "attempts_per_commit": self.attempts / self.commits if self.commits else 0.0,
+                "queued": self.queue.qsize()
+            }
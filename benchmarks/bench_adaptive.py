@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Adaptive practice: calibrating a class of --questions questions from
+--answers simulated answers by --learners learners, and choosing the next
+question per request.
+
+Answers follow a Rasch model with known difficulties, so the fit can be
+checked against them. The calibration is timed end to end (reading the
+answers, the vectorized NumPy fit and storing the results) and one Newton
+iteration is also timed written as a plain Python loop over the answers,
+which is what each of the fit's iterations replaces. Selection is timed on
+its own (bisect over the sorted difficulties) and as the whole
+/api/adaptive/next handler.
+
+Usage: python benchmarks/bench_adaptive.py [--questions 5000] [--learners 20000] [--answers 1000000]
+"""
+
+import argparse
+import math
+import random
+import time
+
+import numpy as np
+from sqlalchemy import func, select
+
+from common import load_server, percentile, report
+
+
+def python_iteration(learner_index, question_index, correct, ability, difficulty):
+    """One Newton step for the learners and the questions, answer by answer"""
+    gradient = [0.0] * len(ability)
+    hessian = [1.0] * len(ability)
+    for learner, question, x in zip(learner_index, question_index, correct):
+        p = 1.0 / (1.0 + math.exp(difficulty[question] - ability[learner]))
+        gradient[learner] += x - p
+        hessian[learner] += p * (1.0 - p)
+    ability = [a + (g - a) / h for a, g, h in zip(ability, gradient, hessian)]
+    gradient = [0.0] * len(difficulty)
+    hessian = [1.0] * len(difficulty)
+    for learner, question, x in zip(learner_index, question_index, correct):
+        p = 1.0 / (1.0 + math.exp(difficulty[question] - ability[learner]))
+        gradient[question] += p - x
+        hessian[question] += p * (1.0 - p)
+    return ability, [b + (g - b) / h for b, g, h in zip(difficulty, gradient, hessian)]
+
+
+def main(num_questions, num_learners, num_answers):
+    server = load_server()
+    db = server.SessionLocal()
+    class_id = server.bulk_insert(db, server.ClassDB.__table__, [{"name": "Bench"}])[0]
+    labels = ["easy", "medium", "hard"]
+    question_ids = server.bulk_insert(db, server.QuestionBankDB.__table__, [{
+        "question": f"Question {i}?", "question_type": "multiple_choice", "options": '["a", "b"]',
+        "correct_answer": "a", "class_id": class_id, "difficulty": labels[i % 3], "tags": "[]"
+    } for i in range(num_questions)])
+
+    rng = np.random.default_rng(0)
+    true_difficulty = rng.normal(0, 1, num_questions) + np.array([server.difficulty_prior(labels[i % 3]) for i in range(num_questions)])
+    true_ability = rng.normal(0, 1, num_learners)
+    learner_index = rng.integers(0, num_learners, num_answers)
+    question_index = rng.integers(0, num_questions, num_answers)
+    correct = (rng.random(num_answers) < 1 / (1 + np.exp(true_difficulty[question_index] - true_ability[learner_index]))).astype(int)
+
+    start = time.perf_counter()
+    for begin in range(0, num_answers, 50000):
+        db.execute(server.BankResponseDB.__table__.insert(), [{
+            "learner": f"learner-{learner}", "class_id": class_id, "question_id": question_ids[question],
+            "is_correct": int(x), "answered_at": "2024-01-01T00:00:00"
+        } for learner, question, x in zip(
+            learner_index[begin:begin + 50000].tolist(), question_index[begin:begin + 50000].tolist(), correct[begin:begin + 50000].tolist()
+        )])
+    db.execute(server.LearnerAbilityDB.__table__.insert(), [{
+        "learner": f"learner-{learner}", "class_id": class_id, "ability": 0.0, "information": 1.0, "responses": int(count)
+    } for learner, count in enumerate(np.bincount(learner_index, minlength=num_learners))])
+    responses = server.BankResponseDB.__table__
+    abilities = server.LearnerAbilityDB.__table__
+    db.execute(abilities.update().values(last_response_id=select(func.max(responses.c.id)).where(
+        responses.c.learner == abilities.c.learner, responses.c.class_id == abilities.c.class_id
+    ).scalar_subquery()))
+    db.commit()
+    db.close()
+    print(f"{num_questions} questions, {num_learners} learners, {num_answers} answers (loaded in {time.perf_counter() - start:.0f}s)\n")
+
+    result = server.calibrate_class(class_id)
+    db = server.SessionLocal()
+    fitted = dict(db.query(server.ItemCalibrationDB.question_id, server.ItemCalibrationDB.difficulty).all())
+    db.close()
+    estimate = np.array([fitted[question_id] for question_id in question_ids])
+    print(f"\ncalibration: {result['seconds']:.2f}s, {result['iterations']} iterations, "
+          f"correlation with the true difficulties {np.corrcoef(estimate, true_difficulty)[0, 1]:.3f}")
+
+    start = time.perf_counter()
+    server.calibrate(learner_index, question_index, correct.astype(float), np.zeros(num_questions), num_learners, max_iterations=1)
+    numpy_iteration = time.perf_counter() - start
+    start = time.perf_counter()
+    python_iteration(learner_index.tolist(), question_index.tolist(), correct.tolist(), [0.0] * num_learners, [0.0] * num_questions)
+    python_seconds = time.perf_counter() - start
+    print(f"one iteration: NumPy {numpy_iteration * 1000:.0f}ms, Python loop {python_seconds * 1000:.0f}ms\n")
+
+    db = server.SessionLocal()
+    parameters = server.ITEM_PARAMETERS.get(db, class_id)
+    db.close()
+    samples = []
+    for _ in range(2000):
+        ability = random.gauss(0, 1.5)
+        recent = random.sample(question_ids, server.ADAPTIVE_RECENT_QUESTIONS)
+        start = time.perf_counter()
+        server.closest_question(parameters.difficulties, parameters.question_ids, ability, recent)
+        samples.append(time.perf_counter() - start)
+    print(f"{'select next question (bisect)':<40} n={len(samples):<5} "
+          f"p50={percentile(samples, 50) * 1e6:7.1f}us p95={percentile(samples, 95) * 1e6:7.1f}us")
+
+    samples = []
+    for _ in range(1000):
+        db = server.SessionLocal()
+        start = time.perf_counter()
+        server.get_next_adaptive_question(f"learner-{random.randrange(num_learners)}", class_id, db)
+        samples.append(time.perf_counter() - start)
+        db.close()
+    report("/api/adaptive/next handler", samples)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=5000)
+    parser.add_argument("--learners", type=int, default=20000)
+    parser.add_argument("--answers", type=int, default=1000000)
+    args = parser.parse_args()
+    main(args.questions, args.learners, args.answers)
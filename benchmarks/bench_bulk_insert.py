@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Row-by-row ORM inserts vs. the bulk insert path.
+
+For each size, creates a quiz and inserts that many questions two ways:
+  * row-by-row: one QuestionDB object added to the session per question
+    (how create_quiz / update_quiz / add-to-bank used to write)
+  * bulk: server.bulk_insert, one executemany in a single transaction
+
+and then times a full POST /api/quizzes import at the same size.
+
+Usage: python benchmarks/bench_bulk_insert.py [--sizes 100 1000 10000]
+"""
+
+import argparse
+import json
+
+from fastapi.testclient import TestClient
+
+from common import load_server, Timer
+
+
+def make_questions(count):
+    return [
+        {"question": f"Question {i}?", "question_type": "multiple_choice",
+         "options": ["a", "b", "c", "d"], "correct_answer": "a"}
+        for i in range(count)
+    ]
+
+
+def row_by_row(server, quiz_id, questions):
+    db = server.SessionLocal()
+    try:
+        for q in questions:
+            db.add(server.QuestionDB(
+                question=q["question"],
+                question_type=q["question_type"],
+                options=json.dumps(q["options"]),
+                correct_answer=q["correct_answer"],
+                quiz_id=quiz_id
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def bulk(server, quiz_id, questions):
+    db = server.SessionLocal()
+    try:
+        rows = [dict(q, options=json.dumps(q["options"]), quiz_id=quiz_id) for q in questions]
+        ids = server.bulk_insert(db, server.QuestionDB.__table__, rows)
+        db.commit()
+        assert len(ids) == len(questions)
+    finally:
+        db.close()
+
+
+def main(sizes):
+    server = load_server()
+    with TestClient(server.app) as client:
+        class_id = client.post("/api/classes", json={"name": "Bench"}).json()["class_id"]
+
+        print(f"{'questions':>10} {'row-by-row':>12} {'bulk':>10} {'speedup':>8} {'POST /api/quizzes':>18}")
+        for size in sizes:
+            questions = make_questions(size)
+            quiz_ids = [
+                client.post("/api/quizzes", json={"title": f"Target {size} {i}", "class_id": class_id,
+                                                  "questions": questions[:1]}).json()["quiz_id"]
+                for i in range(2)
+            ]
+
+            with Timer() as slow:
+                row_by_row(server, quiz_ids[0], questions)
+            with Timer() as fast:
+                bulk(server, quiz_ids[1], questions)
+            with Timer() as api:
+                response = client.post("/api/quizzes", json={"title": f"Import {size}", "class_id": class_id,
+                                                             "questions": questions})
+                response.raise_for_status()
+
+            print(f"{size:>10} {slow.elapsed * 1000:>10.1f}ms {fast.elapsed * 1000:>8.1f}ms "
+                  f"{slow.elapsed / fast.elapsed:>7.1f}x {api.elapsed * 1000:>16.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    args = parser.parse_args()
+    main(args.sizes)
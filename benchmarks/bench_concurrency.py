@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Read latency while a slow write is in flight.
+
+Creates a large quiz (the slow write) and, concurrently, issues a stream of
+GET /api/classes requests. If database work ran on the event loop, every read
+issued during the write would wait for the write to finish; with handlers
+running in the worker threadpool the reads stay close to their idle latency.
+
+Usage: python benchmarks/bench_concurrency.py [--questions 20000] [--readers 8]
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from common import load_server, report, Timer
+
+
+async def read_loop(client, stop, samples):
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get("/api/classes")
+        response.raise_for_status()
+        samples.append(time.perf_counter() - start)
+
+
+async def main(num_questions, num_readers):
+    server = load_server()
+    await server.configure_threadpool()
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        class_id = (await client.post("/api/classes", json={"name": "Bench"})).json()["class_id"]
+
+        idle = []
+        stop = asyncio.Event()
+        readers = [asyncio.create_task(read_loop(client, stop, idle)) for _ in range(num_readers)]
+        await asyncio.sleep(1.0)
+        stop.set()
+        await asyncio.gather(*readers)
+
+        quiz = {
+            "title": "Slow write",
+            "class_id": class_id,
+            "questions": [
+                {"question": f"Question {i}?", "options": ["a", "b", "c", "d"], "correct_answer": "a"}
+                for i in range(num_questions)
+            ],
+        }
+        during = []
+        stop = asyncio.Event()
+        readers = [asyncio.create_task(read_loop(client, stop, during)) for _ in range(num_readers)]
+        with Timer() as write_timer:
+            response = await client.post("/api/quizzes", json=quiz, timeout=None)
+            response.raise_for_status()
+        stop.set()
+        await asyncio.gather(*readers)
+
+    print(f"slow write: {num_questions} questions in {write_timer.elapsed * 1000:.0f}ms")
+    report("GET /api/classes (idle)", idle)
+    report("GET /api/classes (during write)", during)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=20000)
+    parser.add_argument("--readers", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(main(args.questions, args.readers))
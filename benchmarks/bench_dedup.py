@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate checks against a large question bank: a --bank question
+class, then imports of --batch questions of which a fifth are edited copies
+of bank questions (case and punctuation changed, options reordered, a word
+added) and the rest new.
+
+The check is timed as check_duplicates() alone (band key lookups in the
+LSH index, then comparing the candidates' signatures) and as the whole
+/api/ai/add-to-bank handler, which also inserts and indexes the new
+questions. For comparison one batch is also checked by brute force,
+comparing every signature of the class. Recall of the planted copies and
+new questions wrongly flagged are printed, and the class's duplicate
+cluster report is timed last.
+
+Usage: python benchmarks/bench_dedup.py [--bank 200000] [--batch 500] [--runs 5]
+"""
+
+import argparse
+import random
+import string
+import time
+
+import numpy as np
+
+from common import load_server, report
+
+INSERT_BATCH = 5000
+
+
+def random_question(rng, words):
+    question = " ".join(rng.choice(words) for _ in range(rng.randint(8, 14))).capitalize() + "?"
+    return {"question": question, "options": [rng.choice(words) for _ in range(4)]}
+
+
+def edited_copy(rng, words, question):
+    text = question["question"].rstrip("?")
+    text = rng.choice([text.upper(), text.lower(), text + ","]) + " " + rng.choice(words) + "?"
+    return {"question": text, "options": rng.sample(question["options"], len(question["options"]))}
+
+
+def bank_row(question, class_id):
+    return {
+        "question": question["question"], "question_type": "multiple_choice", "options": question["options"],
+        "correct_answer": question["options"][0], "class_id": class_id, "difficulty": "medium", "tags": []
+    }
+
+
+def main(bank_size, batch_size, runs):
+    server = load_server()
+    rng = random.Random(0)
+    words = ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10))) for _ in range(5000)]
+    bank = [random_question(rng, words) for _ in range(bank_size)]
+    # One bank question in a hundred is already an edited copy of another
+    for i in range(0, bank_size, 100):
+        bank[i] = edited_copy(rng, words, bank[rng.randrange(bank_size)])
+
+    start = time.perf_counter()
+    db = server.SessionLocal()
+    class_id = server.bulk_insert(db, server.ClassDB.__table__, [{"name": "Bench"}])[0]
+    for begin in range(0, bank_size, INSERT_BATCH):
+        rows = [server.question_bank_row(question, class_id, "2024-01-01T00:00:00")[0] for question in bank[begin:begin + INSERT_BATCH]]
+        question_ids = server.bulk_insert(db, server.QuestionBankDB.__table__, rows)
+        signature_matrix = server.signatures([server.question_text(row["question"], row["options"]) for row in rows])
+        server.index_bank_questions(db, class_id, question_ids, signature_matrix)
+    db.commit()
+    db.close()
+    print(f"{bank_size} bank questions (loaded and indexed in {time.perf_counter() - start:.0f}s)\n")
+
+    def make_batch():
+        copies = batch_size // 5
+        questions = [edited_copy(rng, words, rng.choice(bank)) for _ in range(copies)]
+        questions += [random_question(rng, words) for _ in range(batch_size - copies)]
+        return questions, copies
+
+    samples = []
+    found = wrongly_flagged = planted = 0
+    for _ in range(runs):
+        questions, copies = make_batch()
+        texts = [server.question_text(question["question"], question["options"]) for question in questions]
+        db = server.SessionLocal()
+        start_time = time.perf_counter()
+        check = server.check_duplicates(db, class_id, texts)
+        samples.append(time.perf_counter() - start_time)
+        db.close()
+        found += sum(1 for match in check.matches[:copies] if match)
+        wrongly_flagged += sum(1 for match in check.matches[copies:] if match)
+        planted += copies
+    report(f"check {batch_size} (LSH)", samples)
+    print(f"{'':<40} copies found {found}/{planted}, new questions flagged {wrongly_flagged}/{runs * batch_size - planted}")
+
+    samples = []
+    for _ in range(1):  # slow; once is enough
+        questions, _ = make_batch()
+        texts = [server.question_text(question["question"], question["options"]) for question in questions]
+        db = server.SessionLocal()
+        start_time = time.perf_counter()
+        batch_signatures = server.signatures(texts)
+        signature_rows = db.query(server.QuestionSignatureDB.signature).filter(server.QuestionSignatureDB.class_id == class_id).all()
+        bank_signatures = np.stack([server.from_bytes(signature) for signature, in signature_rows])
+        for signature in batch_signatures:
+            server.similarities(signature, bank_signatures).max()
+        samples.append(time.perf_counter() - start_time)
+        db.close()
+    report(f"check {batch_size} (every signature)", samples)
+
+    samples = []
+    for _ in range(runs):
+        questions, _ = make_batch()
+        db = server.SessionLocal()
+        start_time = time.perf_counter()
+        server.add_ai_questions_to_bank({
+            "class_id": class_id, "skip_duplicates": True, "questions": [bank_row(question, class_id) for question in questions]
+        }, db)
+        samples.append(time.perf_counter() - start_time)
+        db.close()
+    report(f"add {batch_size} to bank, skipping copies", samples)
+
+    db = server.SessionLocal()
+    start_time = time.perf_counter()
+    clusters = server.get_duplicate_clusters(class_id, 100, db)
+    seconds = time.perf_counter() - start_time
+    db.close()
+    print(f"\nduplicate clusters of the class: {seconds:.2f}s, {clusters['total_clusters']} clusters, "
+          f"{clusters['duplicate_questions']} duplicate questions")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bank", type=int, default=200000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    main(args.bank, args.batch, args.runs)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+A class of students asking for the same explanation at once.
+
+--students concurrent requests hit /api/ai/explain-answer for one question.
+Their wrong answers are drawn from a few spellings of --distinct-answers
+mistakes. Concurrent identical requests share one model call, and later
+ones are served from the explanation cache. The OpenAI client is replaced
+by a stand-in that sleeps for --model-latency seconds.
+
+Usage: python benchmarks/bench_explanation_cache.py [--students 200] [--distinct-answers 3] [--model-latency 2.0]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from common import StubAIClient, load_server, report
+
+
+async def main(num_students, distinct_answers, model_latency):
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    server = load_server()
+    await server.configure_threadpool()
+    server.AI_CLIENT = StubAIClient(model_latency, "Photosynthesis happens in the chloroplast.")
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def ask(student, samples):
+            # Same mistake, different spacing and capitalisation
+            answer = f"Wrong answer {student % distinct_answers}"
+            answer = answer.upper() if student % 2 else f"  {answer.lower()} "
+            start = time.perf_counter()
+            response = await client.post("/api/ai/explain-answer", json={
+                "question": "Where does photosynthesis happen?",
+                "question_type": "multiple_choice",
+                "options": ["Chloroplast", "Nucleus", "Mitochondria", "Ribosome"],
+                "correct_answer": "Chloroplast",
+                "user_answer": answer
+            })
+            response.raise_for_status()
+            samples.append(time.perf_counter() - start)
+
+        burst = []
+        await asyncio.gather(*[ask(student, burst) for student in range(num_students)])
+        burst_calls = server.AI_CLIENT.calls
+        repeat = []
+        await asyncio.gather(*[ask(student, repeat) for student in range(num_students)])
+
+    print(f"{num_students} students, {distinct_answers} distinct wrong answers, model latency {model_latency:.1f}s")
+    print(f"model calls: {burst_calls} for the first burst, {server.AI_CLIENT.calls - burst_calls} for the second")
+    report("explain-answer (concurrent burst)", burst)
+    report("explain-answer (cached)", repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--distinct-answers", type=int, default=3)
+    parser.add_argument("--model-latency", type=float, default=2.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.students, args.distinct_answers, args.model_latency))
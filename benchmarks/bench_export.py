@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Exporting a large question bank: building the whole export in memory, as
+the quiz export did, vs. the streamed /api/question-bank/export as a JSON
+array, NDJSON and gzipped NDJSON.
+
+The bank is filled with --questions questions repeated from
+example_quizzes/*.json through the batch import endpoint. The app runs
+under uvicorn in this process with tracemalloc on, so the peak covers
+everything the server allocates for the export. The in-memory baseline
+loads every row, builds the export dict and encodes it with FastAPI's
+jsonable_encoder and json.dumps, which is what returning the dict did.
+
+Usage: python benchmarks/bench_export.py [--questions 50000]
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import time
+import tracemalloc
+
+import httpx
+import uvicorn
+from fastapi.encoders import jsonable_encoder
+
+from common import REPO_ROOT, load_server
+
+PORT = 8795
+
+
+def example_questions():
+    questions = []
+    for path in sorted(glob.glob(os.path.join(REPO_ROOT, "example_quizzes", "**", "*.json"), recursive=True)):
+        with open(path, encoding="utf-8") as export_file:
+            questions.extend(json.load(export_file).get("questions", []))
+    return questions
+
+
+def measure(function):
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    size = function()
+    return time.perf_counter() - start, (tracemalloc.get_traced_memory()[1] - before) / 1e6, size
+
+
+async def measure_async(function):
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    size = await function()
+    return time.perf_counter() - start, (tracemalloc.get_traced_memory()[1] - before) / 1e6, size
+
+
+async def main(num_questions):
+    server = load_server()
+    app_server = uvicorn.Server(uvicorn.Config(server.app, port=PORT, log_level="warning"))
+    serving = asyncio.ensure_future(app_server.serve())
+    while not app_server.started:
+        await asyncio.sleep(0.05)
+
+    examples = example_questions()
+    body = json.dumps([examples[i % len(examples)] for i in range(num_questions)]).encode("utf-8")
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", timeout=None) as client:
+        class_id = (await client.post("/api/classes", json={"name": "Bench"})).json()["class_id"]
+        response = await client.post(
+            f"/api/validate-json-questions/batch?add_to_bank=true&class_id={class_id}", content=body
+        )
+        response.raise_for_status()
+        print(f"{response.json()['questions_added']} questions in the bank\n")
+        print(f"{'':<26} {'time':>8} {'peak memory':>12} {'download':>10}")
+
+        def in_memory():
+            db = server.SessionLocal()
+            try:
+                rows = db.query(server.QuestionBankDB).all()
+                export = {"export_info": {"total_questions": len(rows)},
+                          "questions": [server.export_question(row) for row in rows]}
+                return len(json.dumps(jsonable_encoder(export)).encode("utf-8"))
+            finally:
+                db.close()
+
+        async def streamed(query):
+            size = 0
+            async with client.stream("GET", f"/api/question-bank/export?{query}") as stream:
+                stream.raise_for_status()
+                async for chunk in stream.aiter_raw():
+                    size += len(chunk)
+            return size
+
+        tracemalloc.start()
+        results = [("in memory (old)", measure(in_memory))]
+        for label, query in [("streamed JSON array", "format=json"),
+                             ("streamed NDJSON", "format=ndjson"),
+                             ("streamed NDJSON, gzip", "format=ndjson&gzip=true")]:
+            results.append((label, await measure_async(lambda: streamed(query))))
+        tracemalloc.stop()
+
+        for label, (elapsed, peak, size) in results:
+            print(f"{label:<26} {elapsed:7.2f}s {peak:10.1f}MB {size / 1e6:8.1f}MB")
+
+    app_server.should_exit = True
+    await serving
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=50000)
+    args = parser.parse_args()
+    asyncio.run(main(args.questions))
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Latency of /api/ai/generate-questions with and without a generation cache hit.
+
+The OpenAI client is replaced by a stand-in that sleeps for --model-latency
+seconds, so no API key or network is needed. Each distinct input is sent
+once (a miss that calls the model and stores the result) and then again
+--repeats times (hits served from the cache).
+
+Usage: python benchmarks/bench_generation_cache.py [--inputs 20] [--repeats 5] [--model-latency 2.0]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from common import StubAIClient, load_server, report
+
+
+async def main(num_inputs, repeats, model_latency):
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    server = load_server()
+    await server.configure_threadpool()
+    server.AI_CLIENT = StubAIClient(
+        model_latency,
+        '{"questions": [{"question": "Stub question?", "question_type": "multiple_choice", '
+        '"options": ["a", "b", "c", "d"], "correct_answer": "a"}]}'
+    )
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        class_id = (await client.post("/api/classes", json={"name": "Bench"})).json()["class_id"]
+
+        misses, hits = [], []
+        for i in range(num_inputs):
+            body = {"class_id": class_id, "text_content": f"Pasted worksheet number {i}. " * 200}
+            for attempt in range(repeats + 1):
+                start = time.perf_counter()
+                response = await client.post("/api/ai/generate-questions", json=body)
+                response.raise_for_status()
+                (hits if response.json()["cached"] else misses).append(time.perf_counter() - start)
+
+    print(f"{num_inputs} inputs x {repeats + 1} requests, model latency {model_latency:.1f}s, "
+          f"{server.AI_CLIENT.calls} model calls")
+    report("generate (cache miss)", misses)
+    report("generate (cache hit)", hits)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--inputs", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--model-latency", type=float, default=2.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.inputs, args.repeats, args.model_latency))
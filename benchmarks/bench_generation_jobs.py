@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Wall time of a generation job by number of job workers.
+
+Starts benchmarks/stub_model_server.py and the app under uvicorn in this
+process, with the app's OpenAI client pointed at the stub through
+OPENAI_BASE_URL, so the whole path (HTTP client, retries, job tables) runs
+without an API key or network. For each worker count a job over a
+document of --chunks chunks is created and polled until it finishes.
+--failure-rate makes the stub answer that share of calls with 429 or 500.
+
+Usage: python benchmarks/bench_generation_jobs.py [--chunks 60] [--workers 1,4,8] [--model-latency 1.0] [--failure-rate 0.1]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+import uvicorn
+
+import stub_model_server
+from common import load_server
+
+STUB_PORT = 8900
+APP_PORT = 8798
+
+
+async def set_config(client, key, value):
+    response = await client.put(f"/api/ai/config/{key}", json={"config_key": key, "config_value": str(value), "config_type": "integer"})
+    response.raise_for_status()
+
+
+async def run_job(server, workers, num_chunks, run):
+    server.JOB_WORKER_COUNT = workers
+    app_server = uvicorn.Server(uvicorn.Config(server.app, port=APP_PORT, log_level="warning"))
+    serving = asyncio.ensure_future(app_server.serve())
+    while not app_server.started:
+        await asyncio.sleep(0.05)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{APP_PORT}", timeout=None) as client:
+        class_id = (await client.post("/api/classes", json={"name": f"Bench {run}"})).json()["class_id"]
+        # One paragraph per chunk; the run number keeps the generation cache out of it
+        document = "\n\n".join(f"Run {run}, section {i}. " + "Filler sentence. " * 20 for i in range(num_chunks))
+        await set_config(client, "ai_job_chunk_chars", max(len(p) for p in document.split("\n\n")))
+        await set_config(client, "ai_job_requests_per_minute", 6000)
+        await set_config(client, "ai_job_retry_delay_seconds", 1)
+
+        requests_before = stub_model_server.app.state.requests
+        start = time.perf_counter()
+        job = (await client.post("/api/ai/jobs", json={"class_id": class_id, "text_content": document, "questions_per_chunk": 5})).json()
+        while True:
+            status = (await client.get(f"/api/ai/jobs/{job['job_id']}")).json()
+            if status["status"] in ["completed", "failed"]:
+                break
+            await asyncio.sleep(0.1)
+        elapsed = time.perf_counter() - start
+
+    app_server.should_exit = True
+    await serving
+    print(f"{workers:>3} workers: {elapsed:7.2f}s for {status['total_chunks']} chunks, "
+          f"{status['question_count']} questions, {status['chunks']['failed']} failed chunks, "
+          f"{stub_model_server.app.state.requests - requests_before} model calls")
+
+
+async def main(num_chunks, worker_counts, model_latency, failure_rate):
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/v1"
+    server = load_server()
+
+    stub_model_server.app.state.latency = model_latency
+    stub_model_server.app.state.failure_rate = failure_rate
+    stub = uvicorn.Server(uvicorn.Config(stub_model_server.app, port=STUB_PORT, log_level="warning"))
+    stub_serving = asyncio.ensure_future(stub.serve())
+    while not stub.started:
+        await asyncio.sleep(0.05)
+
+    print(f"model latency {model_latency:.1f}s, failure rate {failure_rate:.0%}")
+    for run, workers in enumerate(worker_counts):
+        await run_job(server, workers, num_chunks, run)
+
+    stub.should_exit = True
+    await stub_serving
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=60)
+    parser.add_argument("--workers", default="1,4,8")
+    parser.add_argument("--model-latency", type=float, default=1.0)
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    args = parser.parse_args()
+    asyncio.run(main(args.chunks, [int(n) for n in args.workers.split(",")], args.model_latency, args.failure_rate))
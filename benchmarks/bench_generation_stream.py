@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Time to first question: /api/ai/generate-questions vs. its streaming variant.
+
+Runs the app under uvicorn on a local port, since the streaming endpoint
+only shows its benefit over a real connection. The OpenAI client is
+replaced by a stand-in that takes --model-latency seconds to write
+--questions questions, and emits them gradually when streamed. The
+generation cache is bypassed with force_refresh.
+
+Usage: python benchmarks/bench_generation_stream.py [--questions 20] [--model-latency 10] [--runs 3]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import httpx
+import uvicorn
+
+from common import StubAIClient, load_server, report
+
+PORT = 8799
+
+
+def stub_response(num_questions):
+    return json.dumps({"questions": [
+        {
+            "question": f"Generated question {i} about the pasted text?",
+            "question_type": "multiple_choice",
+            "options": ["First option", "Second option", "Third option", "Fourth option"],
+            "correct_answer": "First option",
+            "difficulty": "medium",
+            "tags": ["benchmark"],
+            "explanation": "The first option is correct because the text says so."
+        }
+        for i in range(num_questions)
+    ]}, indent=2)
+
+
+async def main(num_questions, model_latency, runs):
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    server = load_server()
+    uvicorn_server = uvicorn.Server(uvicorn.Config(server.app, port=PORT, log_level="warning"))
+    serving = asyncio.create_task(uvicorn_server.serve())
+    while not uvicorn_server.started:
+        await asyncio.sleep(0.05)
+    server.AI_CLIENT = StubAIClient(model_latency, stub_response(num_questions))
+
+    blocking_first, stream_first, stream_total = [], [], []
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", timeout=None) as client:
+        class_id = (await client.post("/api/classes", json={"name": "Bench"})).json()["class_id"]
+        body = {"class_id": class_id, "text_content": "Pasted notes", "num_questions": num_questions, "force_refresh": True}
+
+        for _ in range(runs):
+            start = time.perf_counter()
+            response = await client.post("/api/ai/generate-questions", json=body)
+            response.raise_for_status()
+            blocking_first.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            first = None
+            async with client.stream("POST", "/api/ai/generate-questions/stream", json=body) as response:
+                async for line in response.aiter_lines():
+                    if first is None and line and json.loads(line)["type"] == "question":
+                        first = time.perf_counter() - start
+            stream_first.append(first)
+            stream_total.append(time.perf_counter() - start)
+
+    uvicorn_server.should_exit = True
+    await serving
+
+    print(f"{num_questions} questions, model writes them over {model_latency:.1f}s")
+    report("blocking: first (= all) questions", blocking_first)
+    report("streaming: first question", stream_first)
+    report("streaming: all questions", stream_total)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--model-latency", type=float, default=10)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.questions, args.model_latency, args.runs))
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Throughput of POST /api/quizzes/{id}/attempts under concurrent submissions.
+
+Starts the app with uvicorn in a child process on a throwaway database,
+creates a quiz of --questions questions (half fill-in-the-blank) and sends
+--submissions whole-quiz submissions from --concurrency clients at once.
+Each submission is graded and stored with all of its responses. The
+client shares the machine with the server, so the server's own CPU time
+per submission is reported too (read from /proc, Linux only). Runs once
+with the answer key cache and once with it disabled
+(ANSWER_KEY_CACHE_SIZE=0), where every submission reloads the questions.
+
+Usage: python benchmarks/bench_grading.py [--questions 40] [--submissions 2000] [--concurrency 64]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from common import REPO_ROOT, report
+
+PORT = 8794
+
+
+def process_cpu_seconds(pid):
+    """User + system CPU time of a process (Linux /proc)"""
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def quiz_questions(num_questions):
+    questions = []
+    for i in range(num_questions):
+        if i % 2:
+            questions.append({
+                "question": f"Stage {i} of the process is called {{blank}}.",
+                "question_type": "fill_blank",
+                "options": [f"answer {i}", f"the answer {i}"],
+                "correct_answer": f"answer {i}"
+            })
+        else:
+            questions.append({
+                "question": f"Question {i}?",
+                "question_type": "multiple_choice",
+                "options": ["a", "b", "c", "d"],
+                "correct_answer": "a"
+            })
+    return questions
+
+
+def submission(questions, version):
+    answers = []
+    for question in questions:
+        if question["question_type"] == "fill_blank":
+            answer = [random.choice(question["options"] + ["wrong"]).upper()]
+        else:
+            answer = random.choice(question["options"])
+        answers.append({"question_id": question["id"], "answer": answer})
+    return {"answers": answers, "quiz_version": version}
+
+
+async def run(cache_size, num_questions, num_submissions, concurrency):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, ANSWER_KEY_CACHE_SIZE=str(cache_size))
+    env.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(PORT), "--log-level", "warning"],
+        cwd=tempfile.mkdtemp(prefix="quiz-bench-"), env=env, stdout=subprocess.DEVNULL
+    )
+    try:
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", timeout=None, limits=limits) as client:
+            while True:
+                try:
+                    await client.get("/api/classes")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+
+            class_id = (await client.post("/api/classes", json={"name": "Bench"})).json()["class_id"]
+            quiz_id = (await client.post("/api/quizzes", json={
+                "title": "Graded", "class_id": class_id, "questions": quiz_questions(num_questions)
+            })).json()["quiz_id"]
+            quiz = (await client.get(f"/api/quizzes/{quiz_id}")).json()
+            bodies = [submission(quiz["questions"], quiz["version"]) for _ in range(num_submissions)]
+
+            samples = []
+            pending = iter(bodies)
+
+            async def submitter():
+                for body in pending:
+                    start = time.perf_counter()
+                    response = await client.post(f"/api/quizzes/{quiz_id}/attempts", json=body)
+                    response.raise_for_status()
+                    samples.append(time.perf_counter() - start)
+
+            cpu_before = process_cpu_seconds(app.pid)
+            start = time.perf_counter()
+            await asyncio.gather(*(submitter() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+            server_cpu = process_cpu_seconds(app.pid) - cpu_before
+    finally:
+        app.terminate()
+        app.wait()
+
+    label = "answer key cache" if cache_size else "no cache"
+    print(f"\n[{label}] {num_submissions / elapsed:7.1f} submissions/s, "
+          f"server CPU {server_cpu / num_submissions * 1000:.2f}ms per submission "
+          f"(at most {num_submissions / server_cpu:.0f}/s per core)")
+    report("  submission latency", samples)
+
+
+async def main(num_questions, num_submissions, concurrency):
+    print(f"{num_submissions} submissions of {num_questions} answers, {concurrency} at a time")
+    for cache_size in [512, 0]:
+        await run(cache_size, num_questions, num_submissions, concurrency)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=40)
+    parser.add_argument("--submissions", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(main(args.questions, args.submissions, args.concurrency))
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Generating questions from a stack of phone photos: one request per image
+vs. one request with image_data_list, and the bytes saved by downscaling.
+
+The photos are synthetic JPEGs of --size pixels with an EXIF rotation.
+The OpenAI client is replaced by a stand-in that takes --model-latency
+seconds, plus the time to upload the image at --upload-mbps, so smaller
+images make the stand-in faster just as they would a real model. The batch
+is run with images prepared in the process pool and on the thread pool
+(IMAGE_PROCESS_WORKERS=0).
+
+Usage: python benchmarks/bench_image_batch.py [--images 8] [--size 4000x3000] [--model-latency 2.0] [--upload-mbps 20]
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import os
+import time
+
+import httpx
+from PIL import Image
+
+from common import StubAIClient, load_server
+
+STUB_CONTENT = (
+    '{"questions": [{"question": "Stub question?", "question_type": "multiple_choice", '
+    '"options": ["a", "b", "c", "d"], "correct_answer": "a"}]}'
+)
+
+
+class UploadTimedClient(StubAIClient):
+    """Adds the time to upload the request's images at `upload_mbps` to every call"""
+
+    def __init__(self, latency, upload_mbps):
+        super().__init__(latency, STUB_CONTENT)
+        self.upload_mbps = upload_mbps
+        self.bytes_sent = 0
+
+    async def create(self, timeout=None, stream=False, **kwargs):
+        image_chars = sum(
+            len(part["image_url"]["url"])
+            for message in kwargs["messages"] if isinstance(message["content"], list)
+            for part in message["content"] if part.get("type") == "image_url"
+        )
+        self.bytes_sent += image_chars
+        await asyncio.sleep(image_chars * 8 / (self.upload_mbps * 1_000_000))
+        return await super().create(timeout=timeout, stream=stream, **kwargs)
+
+
+def synthetic_photo(width, height, seed):
+    """Noisy gradient, about as hard to compress as a photographed page"""
+    gradient = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    noise = Image.effect_noise((width, height), 40 + seed).convert("RGB")
+    photo = Image.blend(gradient, noise, 0.5)
+    exif = Image.Exif()
+    exif[0x0112] = 6  # taken in portrait, stored rotated
+    output = io.BytesIO()
+    photo.save(output, "JPEG", quality=92, exif=exif)
+    return base64.b64encode(output.getvalue()).decode("ascii")
+
+
+async def main(num_images, width, height, model_latency, upload_mbps):
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    server = load_server()
+    await server.configure_threadpool()
+    images = [synthetic_photo(width, height, i) for i in range(num_images)]
+    print(f"{num_images} images of {width}x{height}, {sum(len(i) for i in images) * 3 / 4 / 1e6:.1f} MB, "
+          f"model latency {model_latency:.1f}s + upload at {upload_mbps:g} Mbit/s")
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        class_id = (await client.post("/api/classes", json={"name": "Bench"})).json()["class_id"]
+
+        for workers in [os.cpu_count() or 1, 0]:
+            server.IMAGE_PROCESS_WORKERS = workers
+            await server.start_image_pool()
+            pool = f"{workers} processes" if workers else "thread pool"
+
+            server.AI_CLIENT = UploadTimedClient(model_latency, upload_mbps)
+            start = time.perf_counter()
+            for image_data in images:
+                response = await client.post("/api/ai/generate-questions", json={
+                    "class_id": class_id, "image_data": image_data, "num_questions": 1, "force_refresh": True
+                })
+                response.raise_for_status()
+            sequential = time.perf_counter() - start
+
+            server.AI_CLIENT = UploadTimedClient(model_latency, upload_mbps)
+            start = time.perf_counter()
+            response = await client.post("/api/ai/generate-questions", json={
+                "class_id": class_id, "image_data_list": images, "num_questions": 1, "force_refresh": True
+            })
+            response.raise_for_status()
+            batch = time.perf_counter() - start
+            reports = response.json()["images"]
+            await server.stop_image_pool()
+
+            print(f"\n[{pool}]")
+            print(f"  one request per image   {sequential:7.2f}s")
+            print(f"  one batched request     {batch:7.2f}s")
+            print(f"  processing per image    {sum(r['process_ms'] for r in reports) / len(reports):7.1f}ms "
+                  f"(max {max(r['process_ms'] for r in reports):.1f}ms)")
+            original = sum(r["original_bytes"] for r in reports)
+            processed = sum(r["processed_bytes"] for r in reports)
+            print(f"  bytes to the model      {original / 1e6:7.2f} MB -> {processed / 1e6:.2f} MB "
+                  f"({1 - processed / original:.0%} saved)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=8)
+    parser.add_argument("--size", default="4000x3000")
+    parser.add_argument("--model-latency", type=float, default=2.0)
+    parser.add_argument("--upload-mbps", type=float, default=20.0)
+    args = parser.parse_args()
+    width, height = (int(n) for n in args.size.split("x"))
+    asyncio.run(main(args.images, width, height, args.model_latency, args.upload_mbps))
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Per-question statistics of a quiz with a long attempt history: computed
+from the raw responses on every view vs. read from the running totals that
+the attempt writer keeps up to date.
+
+A quiz of --questions questions gets --attempts graded attempts, written
+through the attempt writer in batches of --batch as concurrent submissions
+would be, which also maintains the totals; the time that maintenance adds
+to each batch is measured on its own. The rebuild from history is timed
+last.
+
+Usage: python benchmarks/bench_item_analytics.py [--questions 40] [--attempts 20000] [--batch 200]
+"""
+
+import argparse
+import json
+import math
+import random
+import time
+from types import SimpleNamespace
+
+from common import load_server, report
+
+
+def main(num_questions, num_attempts, batch_size):
+    server = load_server()
+    db = server.SessionLocal()
+    class_id = server.bulk_insert(db, server.ClassDB.__table__, [{"name": "Bench"}])[0]
+    quiz_id = server.bulk_insert(db, server.QuizDB.__table__, [{"title": "Analytics", "class_id": class_id, "version": 1}])[0]
+    question_ids = server.bulk_insert(db, server.QuestionDB.__table__, [{
+        "question": f"Question {i}?", "question_type": "multiple_choice",
+        "options": json.dumps(["a", "b", "c", "d"]), "correct_answer": "a", "quiz_id": quiz_id, "position": i
+    } for i in range(num_questions)])
+    db.commit()
+    db.close()
+
+    random.seed(0)
+    difficulty = [random.uniform(-1.5, 1.5) for _ in question_ids]
+    batch_samples = []
+    totals_samples = []
+    for start in range(0, num_attempts, batch_size):
+        batch = []
+        for _ in range(min(batch_size, num_attempts - start)):
+            ability = random.gauss(0, 1)
+            responses = []
+            for question_id, b in zip(question_ids, difficulty):
+                is_correct = random.random() < 1 / (1 + math.exp(b - ability))
+                responses.append({
+                    "question_id": question_id,
+                    "answer": json.dumps("a" if is_correct else random.choice("bcd")),
+                    "is_correct": int(is_correct),
+                    "seconds": random.randint(5, 60)
+                })
+            score = sum(row["is_correct"] for row in responses)
+            batch.append({"attempt": {
+                "quiz_id": quiz_id, "quiz_version": 1, "score": score, "total": len(responses),
+                "submitted_at": "2024-01-01T00:00:00"
+            }, "responses": responses})
+
+        start_time = time.perf_counter()
+        server.ATTEMPT_WRITER.commit(batch)
+        batch_samples.append(time.perf_counter() - start_time)
+
+        db = server.SessionLocal()
+        start_time = time.perf_counter()
+        totals = server.ItemTotals()
+        for entry in batch:
+            totals.add_attempt(entry["attempt"]["score"], entry["attempt"]["total"], entry["responses"])
+        server.add_item_totals(db, "question", totals)
+        totals_samples.append(time.perf_counter() - start_time)
+        db.rollback()
+        db.close()
+
+    print(f"{num_attempts} attempts of {num_questions} questions ({num_attempts * num_questions} responses)\n")
+    report(f"commit of {batch_size} attempts", batch_samples)
+    report("  of which: updating the totals", totals_samples)
+
+    def from_raw_responses():
+        db = server.SessionLocal()
+        try:
+            totals = server.ItemTotals()
+            server.add_recorded_responses(db, totals, server.QuizAttemptDB.quiz_id == quiz_id)
+            return [server.item_statistics(SimpleNamespace(**row)) for row in totals.rows()]
+        finally:
+            db.close()
+
+    def from_totals():
+        db = server.SessionLocal()
+        try:
+            return server.get_quiz_analytics(quiz_id, db)
+        finally:
+            db.close()
+
+    print()
+    for label, function, runs in [("quiz statistics, from raw responses", from_raw_responses, 3),
+                                  ("quiz statistics, from running totals", from_totals, 200)]:
+        samples = []
+        for _ in range(runs):
+            start_time = time.perf_counter()
+            function()
+            samples.append(time.perf_counter() - start_time)
+        report(label, samples)
+
+    start_time = time.perf_counter()
+    result = server.rebuild_item_stats()
+    print(f"\nrebuild from history: {result['responses']} responses in {time.perf_counter() - start_time:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=40)
+    parser.add_argument("--attempts", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=200)
+    args = parser.parse_args()
+    main(args.questions, args.attempts, args.batch)
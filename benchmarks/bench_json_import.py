@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Validating a large JSON import: /api/validate-json-questions with the whole
+file as a JSON body vs. /api/validate-json-questions/batch with the file
+streamed as the raw body, and the batch endpoint adding the questions to
+the question bank.
+
+The import is --questions questions in the quiz export format, built by
+repeating the questions of example_quizzes/*.json, with --invalid-ratio of
+them broken. The app runs under uvicorn in this process with tracemalloc
+on, so the peak covers everything the server allocates for the request.
+The body is sent in 64 KB pieces from data prepared before tracing starts.
+
+Usage: python benchmarks/bench_json_import.py [--questions 20000] [--invalid-ratio 0.01]
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import time
+import tracemalloc
+
+import httpx
+import uvicorn
+
+from common import REPO_ROOT, load_server
+
+PORT = 8796
+PIECE = 64 * 1024
+
+
+def example_questions():
+    questions = []
+    for path in sorted(glob.glob(os.path.join(REPO_ROOT, "example_quizzes", "**", "*.json"), recursive=True)):
+        with open(path, encoding="utf-8") as export_file:
+            questions.extend(json.load(export_file).get("questions", []))
+    return questions
+
+
+def import_body(num_questions, invalid_ratio):
+    examples = example_questions()
+    invalid_every = int(1 / invalid_ratio) if invalid_ratio else 0
+    questions = []
+    for i in range(num_questions):
+        question = dict(examples[i % len(examples)])
+        if invalid_every and i % invalid_every == 0:
+            question["correct_answer"] = "Not one of the options"
+        questions.append(question)
+    return json.dumps({"export_info": {"total_questions": num_questions}, "questions": questions}, indent=2).encode("utf-8")
+
+
+async def in_pieces(data):
+    for start in range(0, len(data), PIECE):
+        yield data[start:start + PIECE]
+
+
+async def traced(send):
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    response = await send()
+    elapsed = time.perf_counter() - start
+    response.raise_for_status()
+    return elapsed, (tracemalloc.get_traced_memory()[1] - before) / 1e6, len(response.content) / 1e6
+
+
+async def main(num_questions, invalid_ratio):
+    server = load_server()
+    app_server = uvicorn.Server(uvicorn.Config(server.app, port=PORT, log_level="warning"))
+    serving = asyncio.ensure_future(app_server.serve())
+    while not app_server.started:
+        await asyncio.sleep(0.05)
+
+    body = import_body(num_questions, invalid_ratio)
+    print(f"{num_questions} questions, {len(body) / 1e6:.1f} MB file, {invalid_ratio:.0%} invalid\n")
+    print(f"{'':<36} {'time':>8} {'peak memory':>12} {'response':>10}")
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", timeout=None) as client:
+        class_id = (await client.post("/api/classes", json={"name": "Bench"})).json()["class_id"]
+        headers = {"Content-Type": "application/json", "Content-Length": str(len(body))}
+        runs = [
+            ("whole body, full echo", "/api/validate-json-questions"),
+            ("streamed, summary only", "/api/validate-json-questions/batch"),
+            ("streamed + add to question bank", f"/api/validate-json-questions/batch?add_to_bank=true&class_id={class_id}"),
+        ]
+        tracemalloc.start()
+        for label, url in runs:
+            elapsed, peak, response_mb = await traced(
+                lambda: client.post(url, content=in_pieces(body), headers=headers)
+            )
+            print(f"{label:<36} {elapsed:7.2f}s {peak:10.1f}MB {response_mb:8.2f}MB")
+        tracemalloc.stop()
+
+    app_server.should_exit = True
+    await serving
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=20000)
+    parser.add_argument("--invalid-ratio", type=float, default=0.01)
+    args = parser.parse_args()
+    asyncio.run(main(args.questions, args.invalid_ratio))
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Post-processing a complete model reply: the old inline code in the
+generation endpoint vs. question_normalization.
+
+The old code imported json and re on every call, searched the reply with
+the greedy pattern \\[.*\\] and found blanks by slicing the question text at
+every character for each marker. The replies are generated: --questions
+questions, --fill-ratio of them fill-in-the-blank with long question text,
+in the {"questions": [...]} shape the prompt asks for. The same replies are
+then wrapped in a ```json fence with a closing remark that mentions [1],
+which the greedy pattern reads as part of the JSON.
+
+Usage: python benchmarks/bench_response_normalization.py [--questions 200] [--text-chars 2000] [--runs 20]
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from common import REPO_ROOT, report
+
+sys.path.insert(0, REPO_ROOT)
+from question_normalization import normalize_questions  # noqa: E402
+
+
+def old_process(q_data, difficulty_preference):
+    if q_data.get("question_type") == "fill_blank":
+        question_text = q_data.get("question", "")
+        blank_positions = []
+        blank_markers = ["_____", "[blank]", "____", "___"]
+        for i, marker in enumerate(blank_markers):
+            if marker in question_text:
+                blank_positions = [pos for pos, char in enumerate(question_text) if question_text[pos:pos+len(marker)] == marker]
+                break
+        correct_answer = q_data.get("correct_answer", "")
+        acceptable_answers = q_data.get("acceptable_answers", [correct_answer])
+        return {"question": question_text, "blank_positions": blank_positions, "options": acceptable_answers}
+    options = q_data.get("options", [])
+    return {"question": q_data.get("question", ""), "options": options}
+
+
+def old_normalize(ai_response, difficulty_preference):
+    import json
+    import re
+    json_match = re.search(r'\[.*\]', ai_response, re.DOTALL)
+    if json_match:
+        questions_data = json.loads(json_match.group())
+    else:
+        questions_data = json.loads(ai_response)
+    return [old_process(q, difficulty_preference) for q in questions_data]
+
+
+def model_reply(num_questions, text_chars, fill_ratio):
+    filler = ("The passage describes how the process works in several stages. " * (text_chars // 64 + 1))[:text_chars]
+    questions = []
+    for i in range(num_questions):
+        if i < num_questions * fill_ratio:
+            questions.append({
+                "question": f"{filler} Stage {i} is called _____ and is followed by _____.",
+                "question_type": "fill_blank",
+                "correct_answer": "diffusion",
+                "acceptable_answers": ["diffusion", "Diffusion"],
+                "tags": ["benchmark"],
+                "explanation": "See [the passage]."
+            })
+        else:
+            questions.append({
+                "question": f"Which statement about stage {i} is true? {filler[:200]}",
+                "question_type": "multiple_choice",
+                "options": ["First option", "Second option", "Third option", "Fourth option"],
+                "correct_answer": "First option",
+                "tags": ["benchmark"],
+                "explanation": "The first option is correct because the text says so."
+            })
+    return json.dumps({"questions": questions}, indent=2)
+
+
+def timed(function, reply, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        try:
+            function(reply, "medium")
+        except ValueError:
+            return None
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main(num_questions, text_chars, fill_ratio, runs):
+    reply = model_reply(num_questions, text_chars, fill_ratio)
+    fenced = f"Here are your questions:\n```json\n{reply}\n```\nLet me know if you want more than [1] set."
+    print(f"{num_questions} questions, {len(reply) / 1e3:.0f} KB reply, {fill_ratio:.0%} fill-in-the-blank\n")
+
+    for label, text in [("bare", reply), ("fenced + prose", fenced)]:
+        for name, function in [("old inline code", old_normalize), ("question_normalization", normalize_questions)]:
+            samples = timed(function, text, runs)
+            if samples is None:
+                print(f"{label + ' / ' + name:<40} failed: reply not parsed")
+            else:
+                report(f"{label} / {name}", samples)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--text-chars", type=int, default=2000)
+    parser.add_argument("--fill-ratio", type=float, default=0.5)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    main(args.questions, args.text_chars, args.fill_ratio, args.runs)
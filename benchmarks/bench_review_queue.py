@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Serving the next due questions of a spaced-repetition review from a large
+history: --learners learners over a class bank of --items questions.
+
+Most learners have reviewed about --reviews questions; one in a hundred is
+a heavy learner who has worked through --heavy-reviews of them. Due dates
+are spread from ten days ago to two months ahead, except for half of the
+heavy learners, who are caught up and get new questions. For heavy
+learners the due query is timed with the (learner, class, due) index and
+with that index dropped, where SQLite reads all of the learner's states and
+sorts them, and serving new questions is timed with the learner's cursor
+and without it (scanning the bank from the start past every question
+already reviewed). Grading a 20-question session is timed last.
+
+Usage: python benchmarks/bench_review_queue.py [--learners 10000] [--items 50000] [--reviews 50] [--heavy-reviews 5000]
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from common import load_server, report
+
+INSERT_BATCH = 50000
+
+
+def main(num_learners, num_items, num_reviews, heavy_reviews):
+    server = load_server()
+    db = server.SessionLocal()
+    class_id = server.bulk_insert(db, server.ClassDB.__table__, [{"name": "Bench"}])[0]
+    first_id = server.bulk_insert(db, server.QuestionBankDB.__table__, [{
+        "question": f"Question {i}?", "question_type": "multiple_choice", "options": '["a", "b", "c", "d"]',
+        "correct_answer": "a", "class_id": class_id, "difficulty": "medium", "tags": "[]"
+    } for i in range(num_items)])[0]
+    db.commit()
+
+    random.seed(0)
+    now = datetime.now()
+    behind = [f"learner-{i}" for i in range(0, num_learners, 200)]
+    caught_up = [f"learner-{i}" for i in range(100, num_learners, 200)]
+    start = time.perf_counter()
+    rows = []
+    progress = []
+    total_states = 0
+    for i in range(num_learners):
+        learner = f"learner-{i}"
+        reviewed = min(num_items, heavy_reviews if i % 100 == 0 else num_reviews)
+        for question_id in range(first_id, first_id + reviewed):
+            earliest = 60 if i % 200 == 100 else -10 * 24 * 60
+            due = now + timedelta(minutes=random.randint(earliest, 60 * 24 * 60))
+            rows.append({
+                "learner": learner, "question_id": question_id, "class_id": class_id, "repetitions": 2,
+                "interval_days": 6.0, "ease": 2.5, "lapses": 0, "reviews": 2,
+                "due_at": due.isoformat(timespec="seconds"), "last_reviewed_at": now.isoformat(timespec="seconds")
+            })
+        progress.append({"learner": learner, "class_id": class_id, "new_cursor": first_id + reviewed - 1})
+        if len(rows) >= INSERT_BATCH:
+            db.execute(server.ReviewStateDB.__table__.insert(), rows)
+            total_states += len(rows)
+            rows = []
+    db.execute(server.ReviewStateDB.__table__.insert(), rows)
+    db.execute(server.ReviewProgressDB.__table__.insert(), progress)
+    total_states += len(rows)
+    db.commit()
+    db.execute(text("ANALYZE"))
+    db.commit()
+    db.close()
+    print(f"{num_learners} learners, {num_items} questions, {total_states} review states "
+          f"(loaded in {time.perf_counter() - start:.0f}s)\n")
+
+    def timed(learners, runs, **params):
+        samples = []
+        for _ in range(runs):
+            learner = random.choice(learners)
+            db = server.SessionLocal()
+            start_time = time.perf_counter()
+            server.get_due_reviews(learner=learner, class_id=class_id, db=db, **params)
+            samples.append(time.perf_counter() - start_time)
+            db.close()
+        return samples
+
+    everyone = [f"learner-{i}" for i in range(num_learners)]
+    report("next 20 due, any learner", timed(everyone, 500, limit=20, new_limit=0))
+    report("next 20 due, heavy learner", timed(behind, 200, limit=20, new_limit=0))
+    report("next 20 new, heavy learner", timed(caught_up, 200, limit=20, new_limit=20))
+
+    db = server.SessionLocal()
+    db.execute(text("DROP INDEX ix_review_states_due"))
+    db.execute(server.ReviewProgressDB.__table__.update().values(new_cursor=0))
+    db.commit()
+    db.close()
+    report("next 20 due, heavy, no due index", timed(behind, 20, limit=20, new_limit=0))
+    report("next 20 new, heavy, no cursor", timed(caught_up, 20, limit=20, new_limit=20))
+
+    samples = []
+    for _ in range(100):
+        learner = random.choice(everyone)
+        question_ids = random.sample(range(first_id, first_id + num_items), 20)
+        grades = server.ReviewGradesModel(learner=learner, reviews=[
+            {"question_id": question_id, "answer": random.choice("ab"), "seconds": random.randint(2, 30)}
+            for question_id in question_ids
+        ])
+        db = server.SessionLocal()
+        start_time = time.perf_counter()
+        server.record_review_grades(grades, db)
+        samples.append(time.perf_counter() - start_time)
+        db.close()
+    print()
+    report("grade a 20-question session", samples)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--learners", type=int, default=10000)
+    parser.add_argument("--items", type=int, default=50000)
+    parser.add_argument("--reviews", type=int, default=50)
+    parser.add_argument("--heavy-reviews", type=int, default=5000)
+    args = parser.parse_args()
+    main(args.learners, args.items, args.reviews, args.heavy_reviews)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Several app instances sharing one database.
+
+Starts N processes at the same moment. Each one imports the app against the
+same database URL, so they all run the schema migrations concurrently. Each
+instance then creates a class and a number of quizzes through the API, and
+reads the catalog back. Finally the parent checks that every migration was
+applied exactly once and that each instance's writes are visible to all the
+others.
+
+The default is a fresh SQLite file. Pass --url to use another backend, for
+example a throwaway PostgreSQL database.
+
+Usage: python benchmarks/bench_shared_database.py [--instances 4] [--quizzes 50] [--url URL]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+
+from common import REPO_ROOT, load_server, report
+
+
+async def run_instance(server, index, num_quizzes):
+    import httpx
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/api/classes", json={"name": f"Instance {index}"})
+        response.raise_for_status()
+        class_id = response.json()["class_id"]
+
+        write_latencies = []
+        for n in range(num_quizzes):
+            quiz = {
+                "title": f"Instance {index} quiz {n}",
+                "class_id": class_id,
+                "questions": [
+                    {"question": f"Question {i}?", "options": ["a", "b", "c", "d"], "correct_answer": "a"}
+                    for i in range(10)
+                ],
+            }
+            start = time.perf_counter()
+            response = await client.post("/api/quizzes", json=quiz)
+            response.raise_for_status()
+            write_latencies.append(time.perf_counter() - start)
+
+        read_latencies = []
+        for _ in range(num_quizzes):
+            start = time.perf_counter()
+            response = await client.get("/api/catalog")
+            response.raise_for_status()
+            read_latencies.append(time.perf_counter() - start)
+        return write_latencies, read_latencies
+
+
+def instance_main(index, url, num_quizzes, start_barrier, results):
+    os.environ["DATABASE_URL"] = url
+    start_barrier.wait()
+    start = time.perf_counter()
+    server = load_server()
+    startup = time.perf_counter() - start
+    write_latencies, read_latencies = asyncio.run(run_instance(server, index, num_quizzes))
+    results.put((index, startup, write_latencies, read_latencies))
+
+
+def main(num_instances, num_quizzes, url):
+    if url is None:
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='quiz-bench-'), 'shared.db')}"
+
+    context = multiprocessing.get_context("spawn")
+    start_barrier = context.Barrier(num_instances)
+    results = context.Queue()
+    processes = [
+        context.Process(target=instance_main, args=(index, url, num_quizzes, start_barrier, results))
+        for index in range(num_instances)
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    startups, writes, reads = [], [], []
+    for _, startup, write_latencies, read_latencies in sorted(collected):
+        startups.append(startup)
+        writes.extend(write_latencies)
+        reads.extend(read_latencies)
+
+    sys.path.insert(0, REPO_ROOT)
+    from migrations import MIGRATIONS
+
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        version = conn.execute(text("SELECT version FROM schema_version")).scalar()
+        classes = conn.execute(text("SELECT COUNT(*) FROM classes")).scalar()
+        quizzes = conn.execute(text("SELECT COUNT(*) FROM quizzes")).scalar()
+        questions = conn.execute(text("SELECT COUNT(*) FROM questions")).scalar()
+    engine.dispose()
+
+    print(f"{num_instances} instances on {url}")
+    print(f"schema version {version} of {len(MIGRATIONS)}; "
+          f"{classes} classes, {quizzes} quizzes, {questions} questions "
+          f"(expected {num_instances}, {num_instances * num_quizzes}, {num_instances * num_quizzes * 10})")
+    report("instance startup incl. migrations", startups)
+    report("POST /api/quizzes (10 questions)", writes)
+    report("GET /api/catalog", reads)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--instances", type=int, default=4)
+    parser.add_argument("--quizzes", type=int, default=50)
+    parser.add_argument("--url", default=None, help="shared database URL (default: a new SQLite file)")
+    args = parser.parse_args()
+    main(args.instances, args.quizzes, args.url)
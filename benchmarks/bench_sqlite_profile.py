@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Mixed read/write load against the "basic" and "production" storage profiles.
+
+For each profile a fresh SQLite file is seeded with a question bank. Then
+reader threads page through the question bank while writer threads add
+questions in small transactions. The benchmark reports throughput, latency
+and "database is locked" failures for each side.
+
+Usage: python benchmarks/bench_sqlite_profile.py [--seconds 5] [--readers 8] [--writers 2]
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from common import load_server, report
+
+SEED_QUESTIONS = 20000
+
+
+def seed(server, Session):
+    db = Session()
+    try:
+        class_id = server.bulk_insert(db, server.ClassDB.__table__, [{"name": "Bench", "description": ""}])[0]
+        server.bulk_insert(db, server.QuestionBankDB.__table__, [{
+            "question": f"Seed question {i}?", "question_type": "multiple_choice",
+            "options": json.dumps(["a", "b", "c", "d"]), "correct_answer": "a",
+            "class_id": class_id, "difficulty": ("easy", "medium", "hard")[i % 3], "tags": "[]",
+        } for i in range(SEED_QUESTIONS)])
+        db.commit()
+        return class_id
+    finally:
+        db.close()
+
+
+def reader(server, Session, class_id, stop, latencies, errors):
+    while not stop.is_set():
+        start = time.perf_counter()
+        db = Session()
+        try:
+            db.query(server.QuestionBankDB) \
+                .filter(server.QuestionBankDB.class_id == class_id, server.QuestionBankDB.id > random.randrange(SEED_QUESTIONS)) \
+                .order_by(server.QuestionBankDB.id).limit(50).all()
+            latencies.append(time.perf_counter() - start)
+        except OperationalError:
+            errors.append(1)
+        finally:
+            db.close()
+
+
+def writer(server, Session, class_id, stop, latencies, errors):
+    n = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        db = Session()
+        try:
+            server.bulk_insert(db, server.QuestionBankDB.__table__, [{
+                "question": f"Written question {threading.get_ident()} {n} {i}?", "question_type": "multiple_choice",
+                "options": json.dumps(["a", "b"]), "correct_answer": "a",
+                "class_id": class_id, "difficulty": "medium", "tags": "[]",
+            } for i in range(20)])
+            db.commit()
+            latencies.append(time.perf_counter() - start)
+        except OperationalError:
+            db.rollback()
+            errors.append(1)
+        finally:
+            db.close()
+        n += 1
+
+
+def run_profile(server, profile, seconds, num_readers, num_writers):
+    path = os.path.join(tempfile.mkdtemp(prefix="quiz-bench-"), "bench.db")
+    engine = server.create_db_engine(f"sqlite:///{path}", profile)
+    server.run_migrations(engine, server.Base.metadata)
+    Session = sessionmaker(bind=engine)
+    class_id = seed(server, Session)
+
+    stop = threading.Event()
+    read_latencies, read_errors, write_latencies, write_errors = [], [], [], []
+    threads = [threading.Thread(target=reader, args=(server, Session, class_id, stop, read_latencies, read_errors))
+               for _ in range(num_readers)]
+    threads += [threading.Thread(target=writer, args=(server, Session, class_id, stop, write_latencies, write_errors))
+                for _ in range(num_writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    print(f"\n[{profile}] {len(read_latencies) / seconds:.0f} reads/s, {len(write_latencies) / seconds:.0f} write txns/s, "
+          f"locked errors: {len(read_errors)} reads / {len(write_errors)} writes")
+    report("read (50-question page)", read_latencies)
+    report("write (20-row transaction)", write_latencies)
+
+
+def main(seconds, num_readers, num_writers):
+    server = load_server()
+    for profile in ("basic", "production"):
+        run_profile(server, profile, seconds, num_readers, num_writers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    args = parser.parse_args()
+    main(args.seconds, args.readers, args.writers)
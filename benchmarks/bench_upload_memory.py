@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Peak Python memory while the server receives one image: base64 in a JSON
+body (/api/ai/generate-questions) vs. a multipart file upload
+(/api/ai/generate-questions/upload).
+
+Runs the app under uvicorn in this process with tracemalloc on, so the
+peak covers everything the server allocates for the request. Both bodies
+are sent in 64 KB pieces from data prepared before tracing starts. Images
+are processed in the image process pool, outside the traced process, and
+the OpenAI client is a stand-in that answers at once.
+
+Usage: python benchmarks/bench_upload_memory.py [--sizes 2000x1500,4000x3000,6000x4500]
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import tempfile
+import tracemalloc
+
+import httpx
+import uvicorn
+from PIL import Image
+
+from common import StubAIClient, load_server
+
+PORT = 8797
+PIECE = 64 * 1024
+STUB_CONTENT = (
+    '{"questions": [{"question": "Stub question?", "question_type": "multiple_choice", '
+    '"options": ["a", "b", "c", "d"], "correct_answer": "a"}]}'
+)
+
+
+def synthetic_photo(width, height):
+    gradient = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    noise = Image.effect_noise((width, height), 50).convert("RGB")
+    output = io.BytesIO()
+    Image.blend(gradient, noise, 0.5).save(output, "JPEG", quality=92)
+    return output.getvalue()
+
+
+async def in_pieces(data):
+    for start in range(0, len(data), PIECE):
+        yield data[start:start + PIECE]
+
+
+async def traced_peak(send):
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    response = await send()
+    response.raise_for_status()
+    return (tracemalloc.get_traced_memory()[1] - before) / 1e6
+
+
+async def main(sizes):
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    server = load_server()
+    server.AI_CLIENT = StubAIClient(0, STUB_CONTENT)
+    app_server = uvicorn.Server(uvicorn.Config(server.app, port=PORT, log_level="warning"))
+    serving = asyncio.ensure_future(app_server.serve())
+    while not app_server.started:
+        await asyncio.sleep(0.05)
+    # Startup created a real client; keep the stand-in
+    server.AI_CLIENT = StubAIClient(0, STUB_CONTENT)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", timeout=None) as client:
+        class_id = (await client.post("/api/classes", json={"name": "Bench"})).json()["class_id"]
+        options = {"class_id": class_id, "num_questions": 1, "force_refresh": True}
+
+        print(f"{'image':>12} {'file size':>10} {'JSON base64':>12} {'multipart':>10}")
+        for width, height in sizes:
+            image = synthetic_photo(width, height)
+            json_body = json.dumps({**options, "image_data": base64.b64encode(image).decode("ascii")}).encode("utf-8")
+            with tempfile.NamedTemporaryFile(suffix=".jpg") as image_file:
+                image_file.write(image)
+                image_file.flush()
+
+                tracemalloc.start()
+                json_peak = await traced_peak(lambda: client.post(
+                    "/api/ai/generate-questions", content=in_pieces(json_body),
+                    headers={"Content-Type": "application/json", "Content-Length": str(len(json_body))}
+                ))
+                with open(image_file.name, "rb") as upload:
+                    upload_peak = await traced_peak(lambda: client.post(
+                        "/api/ai/generate-questions/upload",
+                        data={"request": json.dumps(options)},
+                        files={"images": ("photo.jpg", upload, "image/jpeg")}
+                    ))
+                tracemalloc.stop()
+
+            print(f"{width}x{height:<6} {len(image) / 1e6:8.1f}MB {json_peak:10.1f}MB {upload_peak:8.1f}MB")
+
+    app_server.should_exit = True
+    await serving
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="2000x1500,4000x3000,6000x4500")
+    args = parser.parse_args()
+    asyncio.run(main([tuple(int(n) for n in size.split("x")) for size in args.sizes.split(",")]))
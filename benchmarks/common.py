@@ -0,0 +1,84 @@
+"""
+Shared helpers for the benchmark scripts in this directory.
+
+Each benchmark imports the app against a throwaway database in a temporary
+directory, so running them never touches the real quizzes.db.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_server():
+    """Import server.py with its working directory set to a fresh temp dir"""
+    workdir = tempfile.mkdtemp(prefix="quiz-bench-")
+    os.chdir(workdir)
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    import server
+    return server
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(label, samples):
+    """Print count / p50 / p95 / max of a list of durations in seconds"""
+    print(
+        f"{label:<40} n={len(samples):<5} "
+        f"p50={percentile(samples, 50) * 1000:8.2f}ms "
+        f"p95={percentile(samples, 95) * 1000:8.2f}ms "
+        f"max={max(samples) * 1000 if samples else 0:8.2f}ms"
+    )
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+class StubAIClient:
+    """Stand-in for the OpenAI client: every chat completion takes `latency`
+    seconds and returns `content`. With stream=True the content arrives in
+    `stream_chunks` evenly spaced deltas over the same time."""
+
+    def __init__(self, latency, content, stream_chunks=100):
+        self.latency = latency
+        self.content = content
+        self.stream_chunks = stream_chunks
+        self.calls = 0
+        self.chat = type("Chat", (), {"completions": self})
+
+    async def create(self, timeout=None, stream=False, **kwargs):
+        self.calls += 1
+        if stream:
+            return self.stream()
+        await asyncio.sleep(self.latency)
+        message = type("Message", (), {"content": self.content})
+        choice = type("Choice", (), {"message": message})
+        return type("Response", (), {"choices": [choice]})
+
+    async def stream(self):
+        size = max(1, -(-len(self.content) // self.stream_chunks))
+        for start in range(0, len(self.content), size):
+            await asyncio.sleep(self.latency / self.stream_chunks)
+            delta = type("Delta", (), {"content": self.content[start:start + size]})
+            choice = type("Choice", (), {"delta": delta})
+            yield type("Chunk", (), {"choices": [choice]})
+
+    async def close(self):
+        pass
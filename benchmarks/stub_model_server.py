@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Minimal OpenAI-compatible chat completions server for offline testing.
+
+Answers POST /v1/chat/completions, streamed or not, with a "questions"
+object holding as many multiple choice questions as the prompt asks for
+("generate N questions"). It can add latency and fail a share of requests
+with 429 or 500 to exercise retries.
+
+Point the app at it with:
+
+    python benchmarks/stub_model_server.py --port 8900 --latency 1.5 --failure-rate 0.1
+    OPENAI_API_KEY=stub OPENAI_BASE_URL=http://127.0.0.1:8900/v1 uvicorn server:app
+
+Usage: python benchmarks/stub_model_server.py [--port 8900] [--latency 1.0] [--failure-rate 0.0]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+QUESTION_COUNT = re.compile(r"generate (\d+)")
+
+app = FastAPI()
+app.state.latency = 1.0
+app.state.failure_rate = 0.0
+app.state.requests = 0
+app.state.failures = 0
+
+
+def prompt_text(messages) -> str:
+    parts = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(part.get("text", "") for part in content or [] if part.get("type") == "text")
+    return "\n".join(parts)
+
+
+def questions_for(text: str) -> str:
+    counts = [int(n) for n in QUESTION_COUNT.findall(text)] or [5]
+    return json.dumps({"questions": [
+        {
+            "question": f"Stub question {i + 1} of {count}?",
+            "question_type": "multiple_choice",
+            "options": ["Right", "Wrong", "Also wrong", "Still wrong"],
+            "correct_answer": "Right",
+            "difficulty": "medium",
+            "tags": ["stub"],
+            "explanation": "Generated by the stub model server."
+        }
+        for count in counts
+        for i in range(count)
+    ]}, indent=2)
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    app.state.requests += 1
+    if random.random() < app.state.failure_rate:
+        app.state.failures += 1
+        status = random.choice([429, 500])
+        return JSONResponse({"error": {"message": "stub failure", "type": "stub", "code": status}}, status_code=status)
+
+    content = questions_for(prompt_text(body.get("messages", [])))
+    created = int(time.time())
+    model = body.get("model", "stub")
+
+    if not body.get("stream"):
+        await asyncio.sleep(app.state.latency)
+        return {
+            "id": f"chatcmpl-stub-{app.state.requests}",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }
+
+    async def events():
+        pieces = [content[i:i + 40] for i in range(0, len(content), 40)]
+        for piece in pieces:
+            await asyncio.sleep(app.state.latency / len(pieces))
+            chunk = {
+                "id": f"chatcmpl-stub-{app.state.requests}",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+async def stats():
+    return {"requests": app.state.requests, "failures": app.state.failures}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    app.state.latency = args.latency
+    app.state.failure_rate = args.failure_rate
+    uvicorn.run(app, port=args.port, log_level="warning")
@@ -0,0 +1,80 @@
+"""
+Grading of quiz answers.
+
+answer_key() turns a quiz's questions into what grading needs: for every
+question its type and the set of accepted answers, normalized (lowercased,
+whitespace collapsed) once, so grading one answer is a set lookup. Keys are
+built once per quiz version and shared by every submission.
+
+A multiple choice answer must be the correct answer. A fill-in-the-blank
+answer is a list with one entry per blank. A single blank is correct when
+it is an accepted answer. Several blanks are correct when, joined by
+spaces, they are an accepted answer, or when they match, in order, the
+parts of an accepted answer written one part per blank ("moon, earth")
+or the list of accepted answers itself when it has one entry per blank.
+Each blank is tied to its own answer, so repeating one answer in every
+blank or swapping them is wrong. An empty blank is never correct.
+"""
+
+import json
+import re
+from typing import Dict, Iterable, List, NamedTuple, Union
+
+# Separates the per-blank parts of an answer to a question with several blanks
+BLANK_SEPARATOR = re.compile(r"\s*[,;|]\s*")
+
+
+class KeyedQuestion(NamedTuple):
+    question_type: str
+    correct_answer: str
+    accepted: frozenset  # normalized answers that are graded correct
+    ordered: frozenset = frozenset()  # tuples of normalized answers, one per blank, for several blanks
+
+
+def normalize_answer(answer) -> str:
+    if not isinstance(answer, str):
+        return ""
+    return " ".join(answer.lower().split())
+
+
+def answer_key(questions: Iterable) -> Dict[int, KeyedQuestion]:
+    """Answer key by question id for rows of (id, question_type, options, correct_answer)"""
+    key = {}
+    for question_id, question_type, options, correct_answer in questions:
+        if question_type == "fill_blank":
+            try:
+                answers = json.loads(options)
+            except (TypeError, ValueError):
+                answers = []
+            if not isinstance(answers, list):
+                answers = []
+            accepted = {normalize_answer(answer) for answer in answers + [correct_answer]}
+            ordered = {tuple(normalize_answer(part) for part in BLANK_SEPARATOR.split(answer)) for answer in accepted}
+            ordered.add(tuple(normalize_answer(answer) for answer in answers))
+            ordered = {blanks for blanks in ordered if len(blanks) > 1 and "" not in blanks}
+        else:
+            accepted = {normalize_answer(correct_answer)}
+            ordered = set()
+        accepted.discard("")
+        key[question_id] = KeyedQuestion(question_type, correct_answer, frozenset(accepted), frozenset(ordered))
+    return key
+
+
+def answer_blanks(answer: Union[str, List[str], None]) -> List[str]:
+    """A submitted answer as a list of normalized blanks"""
+    if answer is None:
+        return []
+    if isinstance(answer, str):
+        return [normalize_answer(answer)]
+    return [normalize_answer(blank) for blank in answer]
+
+
+def grade_answer(keyed: KeyedQuestion, answer: Union[str, List[str], None]) -> bool:
+    blanks = answer_blanks(answer)
+    if not blanks or "" in blanks:
+        return False
+    if keyed.question_type != "fill_blank":
+        return len(blanks) == 1 and blanks[0] in keyed.accepted
+    if len(blanks) == 1:
+        return blanks[0] in keyed.accepted
+    return " ".join(blanks) in keyed.accepted or tuple(blanks) in keyed.ordered
@@ -0,0 +1,93 @@
+"""
+Image preparation for AI question generation.
+
+Phone photos of textbook pages are several megabytes, far more detail than
+the model uses, and slow to upload to it. The prepare_image functions
+decode an image, apply its EXIF orientation, scale it down to fit
+`max_dimension` and re-encode it as JPEG at `quality`.
+
+They are CPU bound and meant to run in a process pool. This module only
+imports Pillow, so worker processes stay small. prepare_image_file() reads
+an uploaded file from its path, so the upload never has to pass through
+the calling process.
+"""
+
+import base64
+import binascii
+import io
+import os
+import time
+from typing import BinaryIO
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+EXIF_ORIENTATION = 0x0112
+
+
+def prepare_image(image_data: str, max_dimension: int, quality: int) -> dict:
+    """Downscale and recompress one base64 encoded image.
+
+    Returns the new base64 `image_data` with byte counts, pixel sizes and
+    the time taken. The original is kept when it already fits, needs no
+    rotation and recompressing would not make it smaller. Raises ValueError
+    for data that is not a readable image.
+    """
+    start = time.perf_counter()
+    try:
+        raw = base64.b64decode(image_data)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"Image is not valid base64: {e}")
+    return prepare_stream(io.BytesIO(raw), len(raw), max_dimension, quality, start)
+
+
+def prepare_image_bytes(raw: bytes, max_dimension: int, quality: int) -> dict:
+    """prepare_image() for raw image bytes"""
+    return prepare_stream(io.BytesIO(raw), len(raw), max_dimension, quality, time.perf_counter())
+
+
+def prepare_image_file(path: str, max_dimension: int, quality: int) -> dict:
+    """prepare_image() for an image file on disk"""
+    start = time.perf_counter()
+    with open(path, "rb") as image_file:
+        return prepare_stream(image_file, os.fstat(image_file.fileno()).st_size, max_dimension, quality, start)
+
+
+def prepare_stream(stream: BinaryIO, original_bytes: int, max_dimension: int, quality: int, start: float) -> dict:
+    try:
+        with Image.open(stream) as source:
+            original_size = source.size
+            rotated = source.getexif().get(EXIF_ORIENTATION, 1) != 1
+            # JPEG can decode straight to a reduced size, much faster than decoding in full
+            source.draft("RGB", (max_dimension, max_dimension))
+            image = ImageOps.exif_transpose(source)
+            image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+            if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+                # JPEG has no alpha; put transparent areas on white rather than black
+                image = image.convert("RGBA")
+                flattened = Image.new("RGB", image.size, "white")
+                flattened.paste(image, mask=image.getchannel("A"))
+                image = flattened
+            elif image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            output = io.BytesIO()
+            image.save(output, "JPEG", quality=quality, optimize=True)
+            processed_size = image.size
+            source_format = source.format
+    except UnidentifiedImageError:
+        raise ValueError("Not a recognized image format")
+    except OSError as e:
+        raise ValueError(f"Could not read image: {e}")
+
+    processed = output.getvalue()
+    if len(processed) >= original_bytes and processed_size == original_size and not rotated and source_format == "JPEG":
+        stream.seek(0)
+        processed = stream.read()
+
+    return {
+        "image_data": base64.b64encode(processed).decode("ascii"),
+        "original_bytes": original_bytes,
+        "processed_bytes": len(processed),
+        "original_size": list(original_size),
+        "processed_size": list(processed_size),
+        "process_ms": round((time.perf_counter() - start) * 1000, 1)
+    }
@@ -0,0 +1,138 @@
+"""
+Item statistics for graded questions, kept as running totals.
+
+ItemTotals adds up, per question, the sums its statistics are computed
+from. Sums only ever grow, so the stored totals are updated by adding each
+batch of graded attempts to them, and reading a question's statistics never
+touches the attempts again. item_statistics() turns one question's totals
+into:
+
+- percent correct, and how many responses were left unanswered
+- discrimination: the point-biserial correlation between answering the
+  question correctly and the attempt's rest score (the share of the
+  attempt's other questions answered correctly). Leaving the question
+  itself out of the score keeps it from correlating with itself.
+- average seconds spent, over the answers that reported a time
+
+Answers are also counted per distinct answer, for the answer distribution.
+
+Run the rebuild, which recomputes the stored totals from every recorded
+attempt, with:
+
+    python item_analysis.py
+"""
+
+import json
+import math
+from collections import Counter
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from grading import normalize_answer
+
+# Running totals stored per question, in this order
+STAT_FIELDS = (
+    "responses",
+    "correct",
+    "unanswered",
+    "rest_score_sum",
+    "rest_score_sq_sum",
+    "correct_rest_score_sum",
+    "timed_responses",
+    "seconds_sum",
+)
+ANSWER_LABEL_CHARS = 200  # longer answers are counted by their start
+NO_RESPONSES = SimpleNamespace(**{field: 0 for field in STAT_FIELDS})
+
+
+def answer_label(answer) -> Optional[str]:
+    """What an answer is counted as in the distribution; None if unanswered.
+
+    A chosen option is counted as is, fill-in-the-blank answers by their
+    normalized blanks joined with " / ".
+    """
+    if isinstance(answer, list):
+        blanks = [normalize_answer(blank) for blank in answer]
+        label = " / ".join(blanks) if any(blanks) else ""
+    elif isinstance(answer, str):
+        label = answer.strip()
+    else:
+        label = ""
+    return label[:ANSWER_LABEL_CHARS] or None
+
+
+class ItemTotals:
+    """Running totals of a set of graded responses, by question id"""
+
+    def __init__(self):
+        self.items: Dict[int, List[float]] = {}  # question id -> sums in STAT_FIELDS order
+        self.answers = Counter()  # (question id, answer label) -> responses
+        self.labels = {}  # stored answer JSON -> answer label; most responses repeat a few answers
+
+    def add(self, score: int, total: int, question_id: int, answer_json: Optional[str], is_correct: int, seconds: Optional[float]) -> None:
+        """One stored response of an attempt that scored `score` of `total`"""
+        rest_score = (score - is_correct) / (total - 1) if total > 1 else 0.0
+        sums = self.items.get(question_id)
+        if sums is None:
+            sums = self.items[question_id] = [0, 0, 0, 0.0, 0.0, 0.0, 0, 0.0]
+        sums[0] += 1
+        sums[3] += rest_score
+        sums[4] += rest_score * rest_score
+        if is_correct:
+            sums[1] += 1
+            sums[5] += rest_score
+        if seconds is not None and seconds >= 0:
+            sums[6] += 1
+            sums[7] += seconds
+        if answer_json is None:
+            label = None
+        elif answer_json in self.labels:
+            label = self.labels[answer_json]
+        else:
+            label = self.labels[answer_json] = answer_label(json.loads(answer_json))
+        if label is None:
+            sums[2] += 1
+        else:
+            self.answers[(question_id, label)] += 1
+
+    def add_attempt(self, score: int, total: int, responses: List[dict]) -> None:
+        """An attempt's rows as stored in quiz_attempt_responses"""
+        for row in responses:
+            self.add(score, total, row["question_id"], row["answer"], row["is_correct"], row.get("seconds"))
+
+    def rows(self) -> List[dict]:
+        return [dict(zip(STAT_FIELDS, sums), item_id=item_id) for item_id, sums in self.items.items()]
+
+
+def item_statistics(totals) -> dict:
+    """Statistics of one question from its stored totals (anything with
+    STAT_FIELDS attributes). Totals of None, for a question without
+    responses yet, give zero responses and None for every statistic"""
+    if totals is None:
+        totals = NO_RESPONSES
+    responses = totals.responses
+    correct = totals.correct
+    statistics = {
+        "responses": responses,
+        "correct": correct,
+        "unanswered": totals.unanswered,
+        "percent_correct": round(100.0 * correct / responses, 1) if responses else None,
+        "discrimination": None,
+        "avg_seconds": round(totals.seconds_sum / totals.timed_responses, 1) if totals.timed_responses else None,
+    }
+    incorrect = responses - correct
+    if correct and incorrect:
+        mean = totals.rest_score_sum / responses
+        variance = totals.rest_score_sq_sum / responses - mean * mean
+        if variance > 1e-12:
+            mean_correct = totals.correct_rest_score_sum / correct
+            mean_incorrect = (totals.rest_score_sum - totals.correct_rest_score_sum) / incorrect
+            p = correct / responses
+            statistics["discrimination"] = round((mean_correct - mean_incorrect) / math.sqrt(variance) * math.sqrt(p * (1 - p)), 3)
+    return statistics
+
+
+if __name__ == "__main__":
+    import server
+    result = server.rebuild_item_stats()
+    print(f"✅ Rebuilt statistics of {result['questions']} questions from {result['responses']} responses")
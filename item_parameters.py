@@ -0,0 +1,77 @@
+"""
+Cached Rasch difficulties of each class's bank questions.
+
+Questions without a calibration yet get the prior of their hand-set
+difficulty label.
+"""
+
+import threading
+import time
+from typing import List, NamedTuple
+
+from sqlalchemy.orm import Session
+
+from adaptive import difficulty_prior, sorted_parameters
+from models import ItemCalibrationDB, QuestionBankDB
+
+
+class ClassParameters(NamedTuple):
+    loaded_at: float
+    difficulties: List[float]  # sorted
+    question_ids: List[int]  # in the order of difficulties
+    by_id: dict  # question id -> difficulty
+
+
+class ItemParameterCache:
+    """Question difficulties of each class, sorted for closest_question(), kept for `ttl_seconds` or until invalidated"""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        self.classes = {}
+        self.generations = {}  # class id -> invalidations so far
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, db: Session, class_id: int) -> ClassParameters:
+        with self.lock:
+            entry = self.classes.get(class_id)
+            if entry is not None and time.monotonic() - entry.loaded_at < self.ttl_seconds:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            generation = self.generations.get(class_id, 0)
+
+        rows = (
+            db.query(QuestionBankDB.id, QuestionBankDB.difficulty, ItemCalibrationDB.difficulty)
+            .outerjoin(ItemCalibrationDB, ItemCalibrationDB.question_id == QuestionBankDB.id)
+            .filter(QuestionBankDB.class_id == class_id)
+            .all()
+        )
+        parameters = [
+            (question_id, calibrated if calibrated is not None else difficulty_prior(label))
+            for question_id, label, calibrated in rows
+        ]
+        difficulties, question_ids = sorted_parameters(parameters)
+        entry = ClassParameters(time.monotonic(), difficulties, question_ids, dict(parameters))
+        with self.lock:
+            # Keep the entry only if the class was not invalidated while it was loading
+            if generation == self.generations.get(class_id, 0):
+                self.classes[class_id] = entry
+        return entry
+
+    def invalidate(self, class_id: int) -> None:
+        with self.lock:
+            self.classes.pop(class_id, None)
+            self.generations[class_id] = self.generations.get(class_id, 0) + 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "cached_classes": len(self.classes),
+                "ttl_seconds": self.ttl_seconds
+            }
@@ -0,0 +1,178 @@
+"""
+The queue of background generation job chunks, stored in
+generation_job_chunks so that every instance on the database shares it.
+"""
+
+import asyncio
+import json
+import re
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session, joinedload
+
+from models import GenerationJobChunkDB, GenerationJobDB
+
+CLAIM_BATCH = 5  # runnable chunks tried per claim, in case others claim some first
+CLAIM_GRACE_SECONDS = 60  # a chunk running this long past the AI timeout was abandoned
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+class RateLimiter:
+    """Spaces out model calls so at most `per_minute` start in any minute on this instance"""
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.next_slot = 0.0
+
+    async def wait(self) -> None:
+        # Reserve the slot before sleeping; nothing awaits in between, so
+        # concurrent workers on the event loop never get the same slot
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self.next_slot)
+        self.next_slot = slot + 60.0 / max(self.per_minute, 1e-3)
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def split_text_into_chunks(text_content: str, max_chars: int) -> List[str]:
+    """Split text into pieces of at most `max_chars`, breaking between
+    paragraphs where possible, then between sentences, then anywhere"""
+    pieces = []  # (separator before the piece, piece)
+    for paragraph in PARAGRAPH_BREAK.split(text_content):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            pieces.append(("\n\n", paragraph))
+            continue
+        separator = "\n\n"
+        for sentence in SENTENCE_END.split(paragraph):
+            for start in range(0, len(sentence), max_chars):
+                pieces.append((separator, sentence[start:start + max_chars]))
+                separator = " "
+
+    chunks = []
+    current = ""
+    for separator, piece in pieces:
+        if current and len(current) + len(separator) + len(piece) > max_chars:
+            chunks.append(current)
+            current = ""
+        current = current + separator + piece if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def job_summary(job: GenerationJobDB) -> dict:
+    return {
+        "job_id": job.id,
+        "class_id": job.class_id,
+        "status": job.status,
+        "total_chunks": job.total_chunks,
+        "completed_chunks": job.completed_chunks,
+        "failed_chunks": job.failed_chunks,
+        "question_count": job.question_count,
+        "ai_model_used": job.ai_model,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at
+    }
+
+
+def refresh_job_progress(db: Session, job: GenerationJobDB) -> None:
+    """Recount the job's chunks and settle its status; the caller holds the job row lock and commits"""
+    counts = {}
+    questions = 0
+    for status, chunk_count, question_count in (
+        db.query(GenerationJobChunkDB.status, func.count(GenerationJobChunkDB.id), func.coalesce(func.sum(GenerationJobChunkDB.question_count), 0))
+        .filter(GenerationJobChunkDB.job_id == job.id)
+        .group_by(GenerationJobChunkDB.status)
+    ):
+        counts[status] = chunk_count
+        questions += question_count
+    job.completed_chunks = counts.get("done", 0)
+    job.failed_chunks = counts.get("failed", 0)
+    job.question_count = questions
+    if job.status != "cancelled":
+        if job.completed_chunks + job.failed_chunks >= job.total_chunks:
+            job.status = "completed" if job.completed_chunks else "failed"
+        elif counts.get("running") or job.completed_chunks or job.failed_chunks:
+            job.status = "running"
+    job.updated_at = datetime.now().isoformat()
+
+
+def claim_chunk(db: Session, timeout: float) -> Optional[GenerationJobChunkDB]:
+    """Claim the next pending chunk, or one abandoned past `timeout`, with a conditional UPDATE; None if there is none"""
+    now = datetime.now()
+    stale_before = (now - timedelta(seconds=timeout + CLAIM_GRACE_SECONDS)).isoformat()
+    runnable = or_(
+        and_(GenerationJobChunkDB.status == "pending", GenerationJobChunkDB.available_at <= now.isoformat()),
+        and_(GenerationJobChunkDB.status == "running", GenerationJobChunkDB.claimed_at < stale_before)
+    )
+    candidates = db.query(GenerationJobChunkDB.id).filter(runnable).order_by(GenerationJobChunkDB.id).limit(CLAIM_BATCH).all()
+    claimed_id = None
+    for (chunk_id,) in candidates:
+        claimed = db.query(GenerationJobChunkDB).filter(GenerationJobChunkDB.id == chunk_id, runnable).update(
+            {"status": "running", "claimed_at": now.isoformat(), "attempts": GenerationJobChunkDB.attempts + 1},
+            synchronize_session=False
+        )
+        db.commit()
+        if claimed:
+            claimed_id = chunk_id
+            break
+    if claimed_id is None:
+        return None
+
+    chunk = db.query(GenerationJobChunkDB).options(joinedload(GenerationJobChunkDB.job)).filter(GenerationJobChunkDB.id == claimed_id).first()
+    if chunk.job.status == "queued":
+        job = db.query(GenerationJobDB).filter(GenerationJobDB.id == chunk.job_id).with_for_update().first()
+        refresh_job_progress(db, job)
+        db.commit()
+    return chunk
+
+
+def finish_chunk(db: Session, job_id: int, chunk_id: int, claimed_at: str, questions: Optional[List[dict]] = None,
+                 error: Optional[str] = None, retry_at: Optional[str] = None) -> None:
+    """Record the outcome of a chunk claimed at `claimed_at`: its questions, a retry at `retry_at`, or a final failure"""
+    job = db.query(GenerationJobDB).filter(GenerationJobDB.id == job_id).with_for_update().first()
+    chunk = db.query(GenerationJobChunkDB).filter(GenerationJobChunkDB.id == chunk_id).first()
+    if job is None or chunk is None:
+        return
+    if chunk.status != "running" or chunk.claimed_at != claimed_at:
+        # Another worker reclaimed the chunk after this one took too long
+        return
+    if questions is not None:
+        chunk.status = "done"
+        chunk.result = json.dumps(questions)
+        chunk.question_count = len(questions)
+        chunk.error = None
+    elif job.status == "cancelled":
+        chunk.status = "cancelled"
+        chunk.error = error
+    elif retry_at is not None:
+        chunk.status = "pending"
+        chunk.available_at = retry_at
+        chunk.error = error
+    else:
+        chunk.status = "failed"
+        chunk.error = error
+    db.flush()
+    refresh_job_progress(db, job)
+    db.commit()
+
+
+def release_chunk(db: Session, chunk_id: int, claimed_at: str) -> None:
+    """Hand a chunk claimed at `claimed_at` back without counting the attempt"""
+    db.query(GenerationJobChunkDB).filter(
+        GenerationJobChunkDB.id == chunk_id,
+        GenerationJobChunkDB.status == "running",
+        GenerationJobChunkDB.claimed_at == claimed_at
+    ).update(
+        {"status": "pending", "claimed_at": None, "attempts": GenerationJobChunkDB.attempts - 1},
+        synchronize_session=False
+    )
+    db.commit()
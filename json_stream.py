@@ -0,0 +1,178 @@
+"""
+Incremental extraction of objects from a JSON array.
+
+JSONArrayStream is fed text as it arrives, e.g. deltas of a streamed model
+response or blocks of an uploaded file, and returns each object of the array
+as soon as its closing brace has been seen. Only the unfinished tail is kept
+in memory.
+
+The array is either the top-level value or the value of `key` in the
+top-level object, so both of these yield the two questions:
+
+    {"questions": [{"question": "A?"}, {"question": "B?"}]}
+    [{"question": "A?"}, {"question": "B?"}]
+
+Text before the JSON (prose, a ```json fence) is skipped. Entries that are
+not objects are ignored, and entries that fail to parse are counted in
+`malformed` and skipped rather than failing the stream.
+
+NDJSONStream does the same for newline-delimited JSON, one object per line.
+"""
+
+import json
+import re
+from typing import Any, List
+
+# Characters that change nesting or string state; everything else is skipped in bulk
+STRUCTURAL = re.compile(r'[\[\]{}"]')
+STRING_SPECIAL = re.compile(r'["\\]')
+FIRST_CONTAINER = re.compile(r'[\[{]')
+
+
+class JSONArrayStream:
+    def __init__(self, key: str = "questions"):
+        self.key_pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+        self.buffer = ""
+        self.pos = 0  # next unscanned index in buffer
+        self.in_array = False
+        self.done = False  # the array's closing bracket has been seen
+        self.item_start = None  # buffer index of the object being read
+        self.depth = 0
+        self.in_string = False
+        self.items = 0
+        self.malformed = 0
+
+    def feed(self, text: str) -> List[Any]:
+        """Add the next piece of text; returns the objects it completed"""
+        if self.done or not text:
+            return []
+        self.buffer += text
+        if not self.in_array and not self.find_array():
+            return []
+
+        completed = []
+        buffer = self.buffer
+        pos = self.pos
+        while not self.done:
+            if self.in_string:
+                match = STRING_SPECIAL.search(buffer, pos)
+                if not match:
+                    pos = len(buffer)
+                    break
+                if match.group() == "\\":
+                    if match.end() >= len(buffer):
+                        # The escaped character has not arrived yet
+                        pos = match.start()
+                        break
+                    pos = match.end() + 1
+                    continue
+                self.in_string = False
+                pos = match.end()
+                continue
+
+            match = STRUCTURAL.search(buffer, pos)
+            if not match:
+                pos = len(buffer)
+                break
+            char = match.group()
+            pos = match.end()
+            if char == '"':
+                self.in_string = True
+            elif char in "[{":
+                if self.depth == 0 and char == "{":
+                    self.item_start = match.start()
+                self.depth += 1
+            elif char in "]}":
+                if self.depth == 0:
+                    self.done = True
+                    break
+                self.depth -= 1
+                if self.depth == 0 and self.item_start is not None:
+                    self.emit(buffer[self.item_start:pos], completed)
+                    self.item_start = None
+
+        # Drop everything before the unfinished object
+        keep_from = self.item_start if self.item_start is not None else pos
+        self.buffer = buffer[keep_from:]
+        self.pos = pos - keep_from
+        if self.item_start is not None:
+            self.item_start = 0
+        return completed
+
+    def find_array(self) -> bool:
+        """Locate the opening bracket of the array; False until enough text has arrived"""
+        container = FIRST_CONTAINER.search(self.buffer)
+        if not container:
+            return False
+        if container.group() == "[":
+            start = container.end()
+        else:
+            match = self.key_pattern.search(self.buffer, container.start())
+            if not match:
+                return False
+            start = match.end()
+        self.in_array = True
+        self.buffer = self.buffer[start:]
+        self.pos = 0
+        return True
+
+    def emit(self, text: str, completed: List[Any]) -> None:
+        try:
+            value = json.loads(text)
+        except ValueError:
+            self.malformed += 1
+            return
+        if isinstance(value, dict):
+            self.items += 1
+            completed.append(value)
+
+
+class NDJSONStream:
+    """JSONArrayStream for newline-delimited JSON: one object per line.
+
+    Objects having `skip_key` (e.g. the export_info header line of an
+    export) are not returned. Call finish() after the last piece of text
+    for the final line if it has no newline.
+    """
+
+    def __init__(self, skip_key: str = None):
+        self.skip_key = skip_key
+        self.buffer = ""
+        self.in_array = False  # a non-blank line has been seen
+        self.done = False
+        self.items = 0
+        self.malformed = 0
+
+    def feed(self, text: str) -> List[Any]:
+        if self.done or not text:
+            return []
+        lines = (self.buffer + text).split("\n")
+        self.buffer = lines.pop()
+        completed = []
+        for line in lines:
+            self.emit(line, completed)
+        return completed
+
+    def finish(self) -> List[Any]:
+        completed = []
+        if not self.done:
+            self.emit(self.buffer, completed)
+            self.buffer = ""
+            self.done = True
+        return completed
+
+    def emit(self, line: str, completed: List[Any]) -> None:
+        line = line.strip()
+        if not line:
+            return
+        self.in_array = True
+        try:
+            value = json.loads(line)
+        except ValueError:
+            self.malformed += 1
+            return
+        if not isinstance(value, dict):
+            self.malformed += 1
+        elif self.skip_key is None or self.skip_key not in value:
+            self.items += 1
+            completed.append(value)
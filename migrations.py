@@ -0,0 +1,285 @@
+"""
+Versioned schema migrations.
+
+The schema_version table records how many of MIGRATIONS have been applied.
+upgrade() applies the rest in order, each in its own transaction, while
+holding a lock on the schema_version row, so several app instances starting
+against one database apply every migration exactly once.
+
+Every migration checks what already exists before changing it. Databases
+created before this module existed (by create_all) start at version 0 and
+are brought up to date by the same steps as an empty database.
+
+Run them as a deploy step with:
+
+    python migrations.py
+
+and start the app instances with AUTO_MIGRATE=false.
+"""
+
+import json
+
+from sqlalchemy import Column, Integer, MetaData, Table, func, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+
+import near_duplicates
+
+BACKFILL_BATCH_SIZE = 1000
+
+version_metadata = MetaData()
+schema_version = Table(
+    "schema_version", version_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("version", Integer, nullable=False),
+)
+
+
+def create_tables(conn: Connection, metadata: MetaData, names) -> None:
+    for name in names:
+        metadata.tables[name].create(bind=conn, checkfirst=True)
+
+
+def add_column(conn: Connection, metadata: MetaData, table_name: str, column_name: str) -> None:
+    """ALTER TABLE ADD COLUMN for a model column the table does not have yet"""
+    existing = {column["name"] for column in inspect(conn).get_columns(table_name)}
+    if column_name in existing:
+        return
+    column = metadata.tables[table_name].c[column_name]
+    # the dialect renders name, type, quoted server default and NULL-ability as create_all would
+    definition = CreateColumn(column).compile(dialect=conn.dialect)
+    conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {definition}"))
+
+
+def create_indexes(conn: Connection, metadata: MetaData, table_names) -> None:
+    for name in table_names:
+        for index in metadata.tables[name].indexes:
+            index.create(bind=conn, checkfirst=True)
+
+
+def initial_schema(conn: Connection, metadata: MetaData) -> None:
+    create_tables(conn, metadata, ["classes", "quizzes", "questions", "question_bank", "system_prompts", "ai_config"])
+
+
+def question_positions_and_quiz_versions(conn: Connection, metadata: MetaData) -> None:
+    add_column(conn, metadata, "questions", "position")
+    add_column(conn, metadata, "quizzes", "version")
+
+
+def foreign_key_indexes(conn: Connection, metadata: MetaData) -> None:
+    create_indexes(conn, metadata, ["questions", "question_bank"])
+
+
+def question_tags(conn: Connection, metadata: MetaData) -> None:
+    """Tag tables, backfilled from the JSON tags column of existing bank questions"""
+    create_tables(conn, metadata, ["tags", "question_tags"])
+    tags_table = metadata.tables["tags"]
+    links_table = metadata.tables["question_tags"]
+    if conn.execute(select(links_table.c.question_id).limit(1)).first():
+        return
+
+    bank = metadata.tables["question_bank"]
+    names_by_question = {}
+    for question_id, raw_tags in conn.execute(select(bank.c.id, bank.c.tags).where(bank.c.tags.isnot(None))):
+        try:
+            names = {tag.strip().lower() for tag in json.loads(raw_tags) if isinstance(tag, str) and tag.strip()}
+        except (ValueError, TypeError):
+            continue
+        if names:
+            names_by_question[question_id] = names
+    if not names_by_question:
+        return
+
+    all_names = set().union(*names_by_question.values())
+    tag_ids = dict(conn.execute(select(tags_table.c.name, tags_table.c.id)).all())
+    missing = [{"name": name} for name in all_names if name not in tag_ids]
+    if missing:
+        conn.execute(tags_table.insert(), missing)
+        tag_ids = dict(conn.execute(select(tags_table.c.name, tags_table.c.id)).all())
+    conn.execute(links_table.insert(), [
+        {"question_id": question_id, "tag_id": tag_ids[name]}
+        for question_id, names in names_by_question.items()
+        for name in names
+    ])
+    print(f"✅ Migrated tags for {len(names_by_question)} question bank entries")
+
+
+def question_bank_search_index(conn: Connection, metadata: MetaData) -> None:
+    """SQLite FTS5 index over question bank text and tags, kept in sync by triggers.
+
+    Other backends search with ILIKE and skip this step. If the SQLite build
+    lacks FTS5 the step is still recorded and search falls back the same way.
+    """
+    if conn.dialect.name != "sqlite":
+        return
+    try:
+        with conn.begin_nested():
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS question_bank_fts "
+                "USING fts5(question, tags, content='question_bank', content_rowid='id')"
+            ))
+    except OperationalError as e:
+        print(f"⚠️ Full-text search unavailable, falling back to substring search: {e}")
+        return
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS question_bank_fts_ai AFTER INSERT ON question_bank BEGIN "
+        "INSERT INTO question_bank_fts(rowid, question, tags) VALUES (new.id, new.question, new.tags); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS question_bank_fts_ad AFTER DELETE ON question_bank BEGIN "
+        "INSERT INTO question_bank_fts(question_bank_fts, rowid, question, tags) VALUES ('delete', old.id, old.question, old.tags); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS question_bank_fts_au AFTER UPDATE ON question_bank BEGIN "
+        "INSERT INTO question_bank_fts(question_bank_fts, rowid, question, tags) VALUES ('delete', old.id, old.question, old.tags); "
+        "INSERT INTO question_bank_fts(rowid, question, tags) VALUES (new.id, new.question, new.tags); END"
+    ))
+    # Index rows that were added before the index existed
+    conn.execute(text("INSERT INTO question_bank_fts(question_bank_fts) VALUES ('rebuild')"))
+
+
+def ai_response_cache(conn: Connection, metadata: MetaData) -> None:
+    create_tables(conn, metadata, ["ai_response_cache"])
+
+
+def generation_jobs(conn: Connection, metadata: MetaData) -> None:
+    create_tables(conn, metadata, ["generation_jobs", "generation_job_chunks"])
+
+
+def quiz_attempts(conn: Connection, metadata: MetaData) -> None:
+    create_tables(conn, metadata, ["quiz_attempts", "quiz_attempt_responses"])
+
+
+def item_stats(conn: Connection, metadata: MetaData) -> None:
+    add_column(conn, metadata, "quiz_attempt_responses", "seconds")
+    create_tables(conn, metadata, ["item_stats", "item_answer_counts"])
+
+
+def review_states(conn: Connection, metadata: MetaData) -> None:
+    create_tables(conn, metadata, ["review_states", "review_progress"])
+
+
+def adaptive_practice(conn: Connection, metadata: MetaData) -> None:
+    create_tables(conn, metadata, ["bank_responses", "learner_abilities", "item_calibrations", "calibration_runs"])
+
+
+def question_duplicate_index(conn: Connection, metadata: MetaData) -> None:
+    """MinHash signatures and LSH band keys (see near_duplicates), backfilled for existing bank questions"""
+    create_tables(conn, metadata, ["question_signatures", "question_lsh_bands"])
+    signatures_table = metadata.tables["question_signatures"]
+    bands_table = metadata.tables["question_lsh_bands"]
+    bank = metadata.tables["question_bank"]
+    last_id = conn.execute(select(func.max(signatures_table.c.question_id))).scalar() or 0
+    indexed = 0
+    while True:
+        rows = conn.execute(
+            select(bank.c.id, bank.c.class_id, bank.c.question, bank.c.options)
+            .where(bank.c.id > last_id).order_by(bank.c.id).limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        signature_matrix = near_duplicates.signatures([near_duplicates.question_text(row.question, row.options) for row in rows])
+        keys = near_duplicates.band_keys(signature_matrix)
+        conn.execute(signatures_table.insert(), [
+            {"question_id": row.id, "class_id": row.class_id, "signature": near_duplicates.to_bytes(signature)}
+            for row, signature in zip(rows, signature_matrix)
+        ])
+        conn.execute(bands_table.insert(), [
+            {"class_id": row.class_id, "band_key": key, "question_id": row.id}
+            for row, row_keys in zip(rows, keys.tolist())
+            for key in set(row_keys)
+        ])
+        last_id = rows[-1].id
+        indexed += len(rows)
+    if indexed:
+        print(f"✅ Indexed {indexed} question bank entries for duplicate detection")
+
+
+def learner_response_watermarks(conn: Connection, metadata: MetaData) -> None:
+    """Newest bank answer behind each learner's ability, backfilled from bank_responses"""
+    add_column(conn, metadata, "learner_abilities", "last_response_id")
+    abilities = metadata.tables["learner_abilities"]
+    responses = metadata.tables["bank_responses"]
+    newest = select(func.max(responses.c.id)).where(
+        responses.c.learner == abilities.c.learner, responses.c.class_id == abilities.c.class_id
+    ).scalar_subquery()
+    conn.execute(abilities.update().where(abilities.c.last_response_id.is_(None)).values(last_response_id=newest))
+
+
+def generation_job_image_keys(conn: Connection, metadata: MetaData) -> None:
+    add_column(conn, metadata, "generation_job_chunks", "image_key")
+
+
+# Append new migrations to the end; never reorder or edit applied ones
+MIGRATIONS = [
+    initial_schema,
+    question_positions_and_quiz_versions,
+    foreign_key_indexes,
+    question_tags,
+    question_bank_search_index,
+    ai_response_cache,
+    generation_jobs,
+    quiz_attempts,
+    item_stats,
+    review_states,
+    adaptive_practice,
+    question_duplicate_index,
+    learner_response_watermarks,
+    generation_job_image_keys,
+]
+
+
+def current_version(engine: Engine) -> int:
+    if not inspect(engine).has_table("schema_version"):
+        return 0
+    with engine.connect() as conn:
+        return conn.execute(select(schema_version.c.version).where(schema_version.c.id == 1)).scalar() or 0
+
+
+def ensure_version_table(engine: Engine) -> None:
+    """Create schema_version and its single row; another instance may be doing the same"""
+    try:
+        schema_version.create(bind=engine, checkfirst=True)
+    except (OperationalError, ProgrammingError):
+        if not inspect(engine).has_table("schema_version"):
+            raise
+    try:
+        with engine.begin() as conn:
+            if conn.execute(select(schema_version.c.id).where(schema_version.c.id == 1)).first() is None:
+                conn.execute(schema_version.insert().values(id=1, version=0))
+    except IntegrityError:
+        pass
+
+
+def lock_schema(conn) -> None:
+    """Take the schema_version row lock until the caller's transaction ends.
+
+    The no-op UPDATE takes the row lock (the database write lock on SQLite).
+    `conn` may be a Connection or a Session; startup code that seeds default
+    rows uses it so concurrent instances do not insert them twice.
+    """
+    conn.execute(schema_version.update().where(schema_version.c.id == 1).values(version=schema_version.c.version))
+
+
+def upgrade(engine: Engine, metadata: MetaData) -> int:
+    """Apply pending migrations for the tables in `metadata`; returns the new version"""
+    ensure_version_table(engine)
+    while True:
+        with engine.begin() as conn:
+            # Held until commit, so the version read below cannot change underneath us
+            lock_schema(conn)
+            version = conn.execute(select(schema_version.c.version).where(schema_version.c.id == 1)).scalar()
+            if version >= len(MIGRATIONS):
+                return version
+            migration = MIGRATIONS[version]
+            migration(conn, metadata)
+            conn.execute(schema_version.update().where(schema_version.c.id == 1).values(version=version + 1))
+        print(f"✅ Applied migration {version + 1}: {migration.__name__}")
+
+
+if __name__ == "__main__":
+    import models
+    from database import create_db_engine
+    version = upgrade(create_db_engine(), models.Base.metadata)
+    print(f"Schema is at version {version} of {len(MIGRATIONS)}")
@@ -0,0 +1,312 @@
+"""
+SQLAlchemy models of the app's tables.
+
+They are kept apart from server.py so that migrations.py can load the
+schema without importing the app.
+"""
+
+from sqlalchemy import BigInteger, Column, Float, ForeignKey, Index, Integer, LargeBinary, String, Table, Text
+from sqlalchemy.orm import declarative_base, relationship
+
+from database import JSONText
+
+Base = declarative_base()
+
+# Database models
+class ClassDB(Base):
+    __tablename__ = "classes"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True, nullable=False)
+    description = Column(Text, nullable=True)
+
+    quizzes = relationship("QuizDB", back_populates="class_ref", cascade="all, delete-orphan")
+
+
+class QuizDB(Base):
+    __tablename__ = "quizzes"
+    id = Column(Integer, primary_key=True, index=True)
+    title = Column(String, index=True, nullable=False)
+    class_id = Column(Integer, ForeignKey("classes.id"), nullable=False)
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # bumped on every save, for optimistic concurrency
+
+    class_ref = relationship("ClassDB", back_populates="quizzes")
+    questions = relationship(
+        "QuestionDB", back_populates="quiz", cascade="all, delete-orphan",
+        order_by="[QuestionDB.position, QuestionDB.id]"
+    )
+
+
+class QuestionDB(Base):
+    __tablename__ = "questions"
+    id = Column(Integer, primary_key=True, index=True)
+    question = Column(Text, nullable=False)
+    question_type = Column(String, nullable=False, default="multiple_choice")
+    options = Column(JSONText, nullable=False)  # JSON-encoded list of options or acceptable answers
+    correct_answer = Column(String, nullable=False)
+    quiz_id = Column(Integer, ForeignKey("quizzes.id"), index=True)
+    position = Column(Integer, nullable=True)  # order within the quiz; rows saved before positions existed sort by id
+
+    quiz = relationship("QuizDB", back_populates="questions")
+
+
+class QuestionBankDB(Base):
+    __tablename__ = "question_bank"
+    id = Column(Integer, primary_key=True, index=True)
+    question = Column(Text, nullable=False)
+    question_type = Column(String, nullable=False, default="multiple_choice")
+    options = Column(JSONText, nullable=False)  # JSON-encoded list of options or acceptable answers
+    correct_answer = Column(String, nullable=False)
+    class_id = Column(Integer, ForeignKey("classes.id"), nullable=False, index=True)
+    difficulty = Column(String, nullable=True)  # easy, medium, hard
+    tags = Column(JSONText, nullable=True)  # JSON-encoded list of tags, kept for display; queries use question_tags
+    created_at = Column(String, nullable=True)  # timestamp
+
+    class_ref = relationship("ClassDB")
+    tag_refs = relationship("TagDB", secondary="question_tags")
+
+
+class TagDB(Base):
+    __tablename__ = "tags"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True, nullable=False)  # normalized: stripped and lowercased
+
+
+question_tags = Table(
+    "question_tags", Base.metadata,
+    Column("question_id", Integer, ForeignKey("question_bank.id"), primary_key=True),
+    Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True),
+    Index("ix_question_tags_tag_question", "tag_id", "question_id"),
+)
+
+
+class SystemPromptDB(Base):
+    __tablename__ = "system_prompts"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)  # e.g., "question_generation", "image_analysis"
+    prompt_text = Column(Text, nullable=False)
+    version = Column(Integer, nullable=False, default=1)
+    is_active = Column(String, nullable=False, default="false")  # "true" or "false"
+    created_at = Column(String, nullable=False)
+    created_by = Column(String, nullable=True, default="system")
+    description = Column(Text, nullable=True)
+
+
+class AIConfigDB(Base):
+    __tablename__ = "ai_config"
+    id = Column(Integer, primary_key=True, index=True)
+    config_key = Column(String, nullable=False, unique=True)  # e.g., "default_model", "api_provider"
+    config_value = Column(Text, nullable=False)
+    config_type = Column(String, nullable=False, default="string")  # "string", "integer", "boolean", "json"
+    description = Column(Text, nullable=True)
+    updated_at = Column(String, nullable=False)
+    updated_by = Column(String, nullable=True, default="system")
+
+
+class AIResponseCacheDB(Base):
+    __tablename__ = "ai_response_cache"
+    id = Column(Integer, primary_key=True, index=True)
+    namespace = Column(String, nullable=False)  # endpoint that produced the response, e.g. "generate_questions"
+    cache_key = Column(String, nullable=False)  # sha256 of everything that determines the model output
+    response = Column(JSONText, nullable=False)  # JSON-encoded response body
+    created_at = Column(String, nullable=False)  # timestamp; the TTL counts from here
+    last_used_at = Column(String, nullable=False)  # timestamp; eviction drops the least recently used first
+    hit_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        Index("ix_ai_response_cache_key", "namespace", "cache_key", unique=True),
+        Index("ix_ai_response_cache_lru", "namespace", "last_used_at"),
+    )
+
+
+class QuizAttemptDB(Base):
+    __tablename__ = "quiz_attempts"
+    id = Column(Integer, primary_key=True, index=True)
+    quiz_id = Column(Integer, ForeignKey("quizzes.id"), nullable=False)
+    quiz_version = Column(Integer, nullable=False)  # quiz version the answers were graded against
+    student_name = Column(String, nullable=True)
+    score = Column(Integer, nullable=False)  # questions answered correctly
+    total = Column(Integer, nullable=False)  # questions in the quiz
+    duration_seconds = Column(Integer, nullable=True)  # time taken, as reported by the client
+    submitted_at = Column(String, nullable=False)  # timestamp
+
+    __table_args__ = (
+        Index("ix_quiz_attempts_quiz_submitted", "quiz_id", "submitted_at"),
+    )
+
+
+class QuizAttemptResponseDB(Base):
+    __tablename__ = "quiz_attempt_responses"
+    id = Column(Integer, primary_key=True, index=True)
+    attempt_id = Column(Integer, ForeignKey("quiz_attempts.id"), nullable=False)
+    question_id = Column(Integer, nullable=False)  # not a foreign key: questions may be deleted after the attempt
+    answer = Column(JSONText, nullable=True)  # JSON-encoded answer: option text, or list of blanks; null if unanswered
+    is_correct = Column(Integer, nullable=False)  # 1 or 0
+    seconds = Column(Float, nullable=True)  # time spent on the question, as reported by the client
+
+    __table_args__ = (
+        Index("ix_quiz_attempt_responses_attempt", "attempt_id"),
+        Index("ix_quiz_attempt_responses_question", "question_id", "is_correct"),
+    )
+
+
+class ItemStatsDB(Base):
+    """Running totals of every graded response to a question (see item_analysis)"""
+    __tablename__ = "item_stats"
+    item_type = Column(String, primary_key=True)  # "question" (QuestionDB) or "bank" (QuestionBankDB)
+    item_id = Column(Integer, primary_key=True)
+    responses = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+    unanswered = Column(Integer, nullable=False, default=0)
+    rest_score_sum = Column(Float, nullable=False, default=0.0)  # share of the attempt's other questions answered correctly
+    rest_score_sq_sum = Column(Float, nullable=False, default=0.0)
+    correct_rest_score_sum = Column(Float, nullable=False, default=0.0)  # rest scores of the correct responses only
+    timed_responses = Column(Integer, nullable=False, default=0)
+    seconds_sum = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(String, nullable=True)  # timestamp
+
+
+class ReviewStateDB(Base):
+    """A learner's spaced-repetition schedule for one question bank question (see spaced_repetition)"""
+    __tablename__ = "review_states"
+    learner = Column(String, primary_key=True)  # learner id chosen by the client, e.g. a student name
+    question_id = Column(Integer, ForeignKey("question_bank.id"), primary_key=True)
+    class_id = Column(Integer, nullable=False)  # the question's class, so a class's due reviews are one index range
+    repetitions = Column(Integer, nullable=False, default=0)
+    interval_days = Column(Float, nullable=False, default=0.0)
+    ease = Column(Float, nullable=False, default=2.5)
+    lapses = Column(Integer, nullable=False, default=0)
+    reviews = Column(Integer, nullable=False, default=0)
+    due_at = Column(String, nullable=False)  # timestamp, to the second
+    last_reviewed_at = Column(String, nullable=False)  # timestamp
+
+    __table_args__ = (
+        Index("ix_review_states_due", "learner", "class_id", "due_at"),
+    )
+
+
+class ReviewProgressDB(Base):
+    __tablename__ = "review_progress"
+    learner = Column(String, primary_key=True)
+    class_id = Column(Integer, primary_key=True)
+    new_cursor = Column(Integer, nullable=False, default=0)  # every bank question of the class up to this id has a review state
+
+
+class BankResponseDB(Base):
+    """Every graded answer to a question bank question; the history adaptive practice is calibrated from"""
+    __tablename__ = "bank_responses"
+    id = Column(Integer, primary_key=True, index=True)
+    learner = Column(String, nullable=False)
+    class_id = Column(Integer, nullable=False)
+    question_id = Column(Integer, ForeignKey("question_bank.id"), nullable=False)
+    is_correct = Column(Integer, nullable=False)  # 1 or 0
+    answered_at = Column(String, nullable=False)  # timestamp
+
+    __table_args__ = (
+        Index("ix_bank_responses_class", "class_id", "id"),
+        Index("ix_bank_responses_learner", "learner", "class_id", "id"),
+    )
+
+
+class LearnerAbilityDB(Base):
+    """A learner's Rasch ability estimate in a class (see adaptive)"""
+    __tablename__ = "learner_abilities"
+    learner = Column(String, primary_key=True)
+    class_id = Column(Integer, primary_key=True)
+    ability = Column(Float, nullable=False, default=0.0)  # logits
+    information = Column(Float, nullable=False, default=1.0)  # 1 / variance of the estimate
+    responses = Column(Integer, nullable=False, default=0)  # bank_responses of the learner in the class
+    last_response_id = Column(Integer, nullable=True)  # newest of those bank_responses rows; calibration only overwrites estimates it covers
+    updated_at = Column(String, nullable=True)  # timestamp
+
+
+class ItemCalibrationDB(Base):
+    __tablename__ = "item_calibrations"
+    question_id = Column(Integer, ForeignKey("question_bank.id"), primary_key=True)
+    class_id = Column(Integer, nullable=False, index=True)
+    difficulty = Column(Float, nullable=False)  # Rasch difficulty, logits
+    std_error = Column(Float, nullable=False)
+    responses = Column(Integer, nullable=False)  # answers the estimate is based on
+    calibrated_at = Column(String, nullable=False)  # timestamp
+
+
+class CalibrationRunDB(Base):
+    __tablename__ = "calibration_runs"
+    class_id = Column(Integer, primary_key=True)
+    last_response_id = Column(Integer, nullable=False)  # newest bank_responses row included
+    responses = Column(Integer, nullable=False)
+    learners = Column(Integer, nullable=False)
+    questions = Column(Integer, nullable=False)
+    iterations = Column(Integer, nullable=False)
+    seconds = Column(Float, nullable=False)
+    calibrated_at = Column(String, nullable=False)  # timestamp
+
+
+class ItemAnswerCountDB(Base):
+    __tablename__ = "item_answer_counts"
+    item_type = Column(String, primary_key=True)
+    item_id = Column(Integer, primary_key=True)
+    answer = Column(String, primary_key=True)  # item_analysis.answer_label of the answer
+    responses = Column(Integer, nullable=False, default=0)
+
+
+class QuestionSignatureDB(Base):
+    """MinHash signature of a question bank question, for near-duplicate checks (see near_duplicates)"""
+    __tablename__ = "question_signatures"
+    question_id = Column(Integer, ForeignKey("question_bank.id"), primary_key=True)
+    class_id = Column(Integer, nullable=False)
+    signature = Column(LargeBinary, nullable=False)  # NUM_HASHES little-endian uint32 values
+
+
+class QuestionLSHBandDB(Base):
+    """LSH band keys of each signature; questions sharing a key within a class are duplicate candidates"""
+    __tablename__ = "question_lsh_bands"
+    class_id = Column(Integer, primary_key=True)
+    band_key = Column(BigInteger, primary_key=True)
+    question_id = Column(Integer, primary_key=True)  # rows are found from the signature's keys, so no index of its own
+
+    __table_args__ = {"sqlite_with_rowid": False}
+
+
+class GenerationJobDB(Base):
+    __tablename__ = "generation_jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    class_id = Column(Integer, ForeignKey("classes.id"), nullable=False, index=True)
+    status = Column(String, nullable=False, default="queued")  # queued, running, completed, failed, cancelled
+    params = Column(JSONText, nullable=False)  # JSON-encoded generation parameters shared by every chunk
+    prompt_id = Column(Integer, ForeignKey("system_prompts.id"), nullable=False)  # prompt version the job was created with
+    ai_model = Column(String, nullable=False)
+    total_chunks = Column(Integer, nullable=False)
+    completed_chunks = Column(Integer, nullable=False, default=0, server_default="0")
+    failed_chunks = Column(Integer, nullable=False, default=0, server_default="0")
+    question_count = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(String, nullable=False)  # timestamp
+    updated_at = Column(String, nullable=False)  # timestamp
+
+    chunks = relationship(
+        "GenerationJobChunkDB", back_populates="job", cascade="all, delete-orphan",
+        order_by="GenerationJobChunkDB.position"
+    )
+
+
+class GenerationJobChunkDB(Base):
+    __tablename__ = "generation_job_chunks"
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("generation_jobs.id"), nullable=False)
+    position = Column(Integer, nullable=False)  # order of the chunk within the source
+    source_type = Column(String, nullable=False)  # "text" or "image"
+    content = Column(Text, nullable=False)  # text excerpt, or base64 encoded image
+    image_key = Column(String, nullable=True)  # image_cache_key() of the image as uploaded, before downscaling
+    status = Column(String, nullable=False, default="pending")  # pending, running, done, failed, cancelled
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    available_at = Column(String, nullable=False)  # timestamp; a retried chunk waits until then
+    claimed_at = Column(String, nullable=True)  # timestamp of the current attempt; identifies the worker's claim
+    result = Column(JSONText, nullable=True)  # JSON-encoded list of generated questions
+    question_count = Column(Integer, nullable=False, default=0, server_default="0")
+    error = Column(Text, nullable=True)  # last failure
+
+    job = relationship("GenerationJobDB", back_populates="chunks")
+
+    __table_args__ = (
+        Index("ix_generation_job_chunks_job", "job_id", "position"),
+        Index("ix_generation_job_chunks_claim", "status", "available_at"),
+    )
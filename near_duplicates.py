@@ -0,0 +1,184 @@
+"""
+Near-duplicate detection for question bank questions, by MinHash and LSH.
+
+A question is compared as its text plus its options (sorted, so reordered
+options do not matter), lowercased with punctuation dropped, and split into
+overlapping character SHINGLE_SIZE-grams. Two questions are near-duplicates
+when the Jaccard similarity of their shingle sets is at least
+DUPLICATE_THRESHOLD.
+
+signatures() summarizes each shingle set as NUM_HASHES MinHash values: the
+share of positions on which two signatures agree estimates the Jaccard
+similarity of the sets. band_keys() hashes the signature in BANDS bands of
+ROWS values each. Questions that share any band key are candidates, and
+with 16 bands of 6 rows a pair at similarity 0.8 shares one 99% of the
+time, while one at 0.3 does about 1% of the time. The band keys are stored
+and indexed, so finding a question's candidates is BANDS index lookups
+however large the bank is, and only the candidates' signatures are
+compared.
+"""
+
+import json
+import re
+import zlib
+from itertools import chain
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+SHINGLE_SIZE = 5
+NUM_HASHES = 96
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+DUPLICATE_THRESHOLD = 0.8
+SIGNATURE_BATCH = 64  # questions hashed per array operation
+
+_PRIME = (1 << 31) - 1
+# Fixed seed: stored signatures are only comparable with ones made by the same hash functions
+_rng = np.random.RandomState(20240601)
+_A = _rng.randint(1, _PRIME, NUM_HASHES).astype(np.uint64)
+_B = _rng.randint(0, _PRIME, NUM_HASHES).astype(np.uint64)
+_FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+_FNV_PRIME = np.uint64(0x100000001B3)
+
+SIGNATURE_DTYPE = np.dtype("<u4")
+
+
+class Match(NamedTuple):
+    """What a checked question duplicates: a bank question, or an earlier question of the same batch"""
+    question_id: Optional[int]
+    index: Optional[int]
+    similarity: float
+
+
+def question_text(question: Optional[str], options) -> str:
+    """Normalized text compared for a question; `options` is a list or its JSON encoding"""
+    if isinstance(options, str):
+        try:
+            options = json.loads(options)
+        except ValueError:
+            options = [options]
+    if not isinstance(options, list):
+        options = []
+    parts = [question or ""] + sorted(str(option) for option in options)
+    return re.sub(r"[\W_]+", " ", " ".join(parts).lower()).strip()
+
+
+def shingle_hashes(text: str) -> List[int]:
+    """CRC32 of every distinct SHINGLE_SIZE-character substring (the whole text if shorter)"""
+    if len(text) <= SHINGLE_SIZE:
+        return [zlib.crc32(text.encode())]
+    return list({zlib.crc32(text[i:i + SHINGLE_SIZE].encode()) for i in range(len(text) - SHINGLE_SIZE + 1)})
+
+
+def signatures(texts: Sequence[str]) -> np.ndarray:
+    """MinHash signature of each text, one row of NUM_HASHES uint32 values per text"""
+    result = np.empty((len(texts), NUM_HASHES), dtype=SIGNATURE_DTYPE)
+    for start in range(0, len(texts), SIGNATURE_BATCH):
+        hashed = [shingle_hashes(text) for text in texts[start:start + SIGNATURE_BATCH]]
+        offsets = np.cumsum([0] + [len(hashes) for hashes in hashed[:-1]])
+        values = np.fromiter(chain.from_iterable(hashed), dtype=np.uint64)
+        # (a * x + b) mod p for every shingle and hash function; below 2**63, so no overflow
+        values = (values[:, None] * _A + _B) % _PRIME
+        result[start:start + len(hashed)] = np.minimum.reduceat(values, offsets, axis=0)
+    return result
+
+
+def band_keys(signature_matrix: np.ndarray) -> np.ndarray:
+    """BANDS signed 64-bit keys per signature row; each band's key also depends on the band's position"""
+    rows = signature_matrix.reshape(len(signature_matrix), BANDS, ROWS).astype(np.uint64)
+    keys = np.broadcast_to(_FNV_OFFSET ^ np.arange(BANDS, dtype=np.uint64), rows.shape[:2]).copy()
+    for row in range(ROWS):
+        keys = (keys ^ rows[:, :, row]) * _FNV_PRIME  # FNV-1a over the band's values, wrapping at 2**64
+    return keys.view(np.int64)
+
+
+def to_bytes(signature: np.ndarray) -> bytes:
+    return signature.astype(SIGNATURE_DTYPE).tobytes()
+
+
+def from_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype=SIGNATURE_DTYPE)
+
+
+def similarities(signature: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """Estimated Jaccard similarity of `signature` with each row of `others`"""
+    return np.count_nonzero(others == signature, axis=1) / NUM_HASHES
+
+
+def match_batch(
+    signature_matrix: np.ndarray,
+    keys: np.ndarray,
+    candidates: Dict[int, List[int]],
+    candidate_signatures: Dict[int, np.ndarray],
+    threshold: float = DUPLICATE_THRESHOLD,
+) -> List[Optional[Match]]:
+    """The closest near-duplicate of each row of a batch, or None.
+
+    `candidates` maps band keys to the bank questions stored under them and
+    `candidate_signatures` holds those questions' signatures. A question is
+    also checked against the earlier questions of the batch that were not
+    duplicates themselves, so a batch's copies all point at its first one.
+    Bank questions win ties.
+    """
+    seen: Dict[int, List[int]] = {}
+    matches = []
+    for index, (signature, row_keys) in enumerate(zip(signature_matrix, keys.tolist())):
+        best = None
+        question_ids = list(set(chain.from_iterable(candidates.get(key, ()) for key in row_keys)))
+        if question_ids:
+            scores = similarities(signature, np.stack([candidate_signatures[question_id] for question_id in question_ids]))
+            best_position = int(np.argmax(scores))
+            if scores[best_position] >= threshold:
+                best = Match(question_ids[best_position], None, float(scores[best_position]))
+        earlier = sorted(set(chain.from_iterable(seen.get(key, ()) for key in row_keys)))
+        if earlier:
+            scores = similarities(signature, signature_matrix[earlier])
+            best_position = int(np.argmax(scores))
+            if scores[best_position] >= threshold and (best is None or scores[best_position] > best.similarity):
+                best = Match(None, earlier[best_position], float(scores[best_position]))
+        matches.append(best)
+        if best is None:
+            for key in row_keys:
+                seen.setdefault(key, []).append(index)
+    return matches
+
+
+def duplicate_clusters(
+    buckets: Iterable[List[int]],
+    signatures_by_id: Dict[int, np.ndarray],
+    threshold: float = DUPLICATE_THRESHOLD,
+) -> List[List[int]]:
+    """Group question ids into clusters of near-duplicates, largest first.
+
+    `buckets` are the ids sharing a band key. Within a bucket every id is
+    compared with the bucket's first one, and those that do not match it
+    are compared among themselves the same way, so a bucket of n copies of
+    one question costs n comparisons rather than n**2. Matches are joined
+    transitively; questions without one are left out.
+    """
+    parent: Dict[int, int] = {}
+
+    def find(question_id: int) -> int:
+        root = question_id
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while question_id != root:
+            parent[question_id], question_id = root, parent.get(question_id, question_id)
+        return root
+
+    for bucket in buckets:
+        remaining = sorted(set(bucket))
+        while len(remaining) > 1:
+            pivot, others = remaining[0], remaining[1:]
+            scores = similarities(signatures_by_id[pivot], np.stack([signatures_by_id[question_id] for question_id in others]))
+            for question_id, score in zip(others, scores):
+                if score >= threshold:
+                    parent.setdefault(pivot, pivot)
+                    parent[find(question_id)] = find(pivot)
+            remaining = [question_id for question_id, score in zip(others, scores) if score < threshold]
+
+    clusters: Dict[int, List[int]] = {}
+    for question_id in parent:
+        clusters.setdefault(find(question_id), []).append(question_id)
+    return sorted((sorted(cluster) for cluster in clusters.values()), key=lambda cluster: (-len(cluster), cluster[0]))
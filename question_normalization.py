@@ -0,0 +1,207 @@
+"""
+Normalization of questions written by the model or imported as JSON.
+
+extract_questions() finds the question list in a complete model reply. The
+system prompt asks for {"questions": [...]}, but replies also come as a bare
+array, wrapped in a ```json fence or after a sentence of prose. Each
+candidate opening bracket is tried with json.JSONDecoder.raw_decode, which
+parses one value and stops, so trailing text and brackets inside strings do
+not matter and nothing is searched twice. A reply cut off before the end
+of its array still gives the questions that were complete, as it would
+when streamed.
+
+blank_positions() is the one place that locates blanks in question text,
+with a compiled pattern in a single pass. validate_question() checks one
+entry of a JSON import against the import schema.
+"""
+
+import json
+import re
+from typing import List, Optional
+
+from json_stream import JSONArrayStream
+
+# The token the prompt and the import schema ask for
+BLANK_TOKEN = re.compile(r"\{blank\}")
+# Also accepted in generated questions: [blank] and runs of three or more underscores
+BLANK_MARKER = re.compile(r"\{blank\}|\[blank\]|_{3,}")
+
+JSON_CANDIDATE = re.compile(r"[\[{]")
+DECODER = json.JSONDecoder()
+
+QUESTION_TYPES = ("multiple_choice", "fill_blank")
+REQUIRED_FIELDS = ("question", "question_type", "options", "correct_answer")
+
+
+def blank_positions(text: str, pattern=BLANK_TOKEN) -> List[int]:
+    """Start index of each blank in `text`"""
+    return [match.start() for match in pattern.finditer(text)]
+
+
+def extract_questions(text: str, key: str = "questions") -> List[dict]:
+    """The question objects in a model reply.
+
+    Takes the first JSON value that is an object with a `key` list or a
+    bare list. Entries that are not objects are dropped. Raises ValueError
+    when the reply holds no such value.
+    """
+    pos = 0
+    while True:
+        match = JSON_CANDIDATE.search(text, pos)
+        if not match:
+            break
+        try:
+            value, end = DECODER.raw_decode(text, match.start())
+        except ValueError:
+            pos = match.end()
+            continue
+        if isinstance(value, dict) and isinstance(value.get(key), list):
+            value = value[key]
+        if isinstance(value, list):
+            return [item for item in value if isinstance(item, dict)]
+        # Some other complete value; nothing inside it is the answer either
+        pos = end
+
+    # Truncated reply: keep the objects that were finished
+    stream = JSONArrayStream(key)
+    questions = stream.feed(text)
+    if not stream.in_array:
+        raise ValueError("AI response was not valid JSON")
+    return questions
+
+
+def process_generated_question(q_data: dict, difficulty_preference: str) -> Optional[dict]:
+    """Normalize one question object from the model; None if it cannot be used"""
+    if q_data.get("question_type") == "fill_blank":
+        question_text = q_data.get("question", "")
+
+        # Get acceptable answers (could be multiple variations)
+        correct_answer = q_data.get("correct_answer", "")
+        acceptable_answers = q_data.get("acceptable_answers", [correct_answer])
+
+        if not acceptable_answers or not any(acceptable_answers):
+            acceptable_answers = [correct_answer]
+
+        return {
+            "question": question_text,
+            "question_type": "fill_blank",
+            "options": acceptable_answers,  # Store all acceptable answers as options
+            "correct_answer": correct_answer,
+            "acceptable_answers": acceptable_answers,
+            "difficulty": q_data.get("difficulty", difficulty_preference),
+            "tags": ",".join(q_data.get("tags", [])),
+            "explanation": q_data.get("explanation", ""),
+            "blank_positions": blank_positions(question_text, BLANK_MARKER)
+        }
+
+    # Multiple choice: the correct answer must be one of the options
+    options = q_data.get("options", [])
+    correct_answer = q_data.get("correct_answer", "")
+    if correct_answer not in options:
+        if options:
+            correct_answer = options[0]  # Fallback to first option
+        else:
+            return None  # Skip invalid questions
+
+    return {
+        "question": q_data.get("question", ""),
+        "question_type": q_data.get("question_type", "multiple_choice"),
+        "options": options,
+        "correct_answer": correct_answer,
+        "difficulty": q_data.get("difficulty", difficulty_preference),
+        "tags": q_data.get("tags", []),
+        "explanation": q_data.get("explanation", "")
+    }
+
+
+def normalize_questions(text: str, difficulty_preference: str) -> List[dict]:
+    """Processed questions from a complete model reply; ValueError if it has none to read"""
+    processed_questions = []
+    for q_data in extract_questions(text):
+        processed_question = process_generated_question(q_data, difficulty_preference)
+        if processed_question:
+            processed_questions.append(processed_question)
+    return processed_questions
+
+
+def normalize_answers(answers) -> List[str]:
+    """Lowercased, stripped answers with empty and non-string entries dropped"""
+    normalized = []
+    for answer in answers if isinstance(answers, list) else []:
+        if isinstance(answer, str):
+            answer = answer.strip().lower()
+            if answer:
+                normalized.append(answer)
+    return normalized
+
+
+def validate_question(q_data: dict) -> dict:
+    """One imported question, normalized, with its `validation_errors` and `is_valid`.
+
+    Fill-in-blank answers are lowercased and become the options, as they are
+    stored in the question bank.
+    """
+    question_errors = []
+    for field in REQUIRED_FIELDS:
+        if field not in q_data or not q_data[field]:
+            question_errors.append(f"Missing required field: {field}")
+
+    question_type = q_data.get("question_type")
+    if question_type not in QUESTION_TYPES:
+        question_errors.append("Invalid question_type. Must be 'multiple_choice' or 'fill_blank'")
+
+    options = q_data.get("options", [])
+    if not isinstance(options, list) or len(options) == 0:
+        question_errors.append("Options must be a non-empty array")
+
+    correct_answer = q_data.get("correct_answer", "")
+    question_text = q_data.get("question", "")
+    if not isinstance(question_text, str):
+        question_errors.append("question must be a string")
+        question_text = ""
+    question_blanks = []
+    acceptable_answers = []
+
+    if question_type == "multiple_choice":
+        if not isinstance(options, list) or correct_answer not in options:
+            question_errors.append("Correct answer must be one of the provided options")
+
+    elif question_type == "fill_blank":
+        question_blanks = blank_positions(question_text)
+        blank_count = len(question_blanks)
+        if blank_count == 0:
+            question_errors.append("Fill-in-blank questions must contain at least one {blank} token")
+
+        given_answers = q_data.get("acceptable_answers", [correct_answer])
+        if given_answers:
+            correct_answer = correct_answer.strip().lower() if isinstance(correct_answer, str) else ""
+            acceptable_answers = normalize_answers(given_answers)
+            if not acceptable_answers or correct_answer not in acceptable_answers:
+                question_errors.append("Correct answer must be in acceptable_answers for fill_blank questions")
+            # Stored with the acceptable answers as options
+            options = acceptable_answers
+        else:
+            question_errors.append("Fill-in-blank questions must have acceptable_answers")
+            acceptable_answers = given_answers
+
+        if blank_count > 1:
+            given_positions = q_data.get("blank_positions", [])
+            if len(given_positions) != blank_count:
+                question_errors.append(f"Question has {blank_count} blanks but blank_positions array has {len(given_positions)} items")
+
+    else:
+        acceptable_answers = q_data.get("acceptable_answers", [])
+
+    return {
+        "question": question_text,
+        "question_type": q_data.get("question_type", "multiple_choice"),
+        "options": options,
+        "correct_answer": correct_answer,
+        "acceptable_answers": acceptable_answers,
+        "difficulty": q_data.get("difficulty", "medium"),
+        "tags": q_data.get("tags", []),
+        "explanation": q_data.get("explanation", ""),
+        "blank_positions": question_blanks,
+        "validation_errors": question_errors,
+        "is_valid": len(question_errors) == 0
+    }
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Iterable, List, Tuple
 from fastapi import HTTPException
 
 class Question:
@@ -28,17 +28,51 @@ def validate_quiz(quiz: Quiz, existing_quiz_titles: List[str]):
         errors.append("Quiz must contain at least one question.")
     
     for index, question in enumerate(quiz.questions):
-        # Check for non-empty question text
-        if not question.question.strip():
-            errors.append(f"Question {index + 1} text cannot be empty.")
-        
-        # Check for at least one option
-        if len(question.options) == 0:
-            errors.append(f"Question {index + 1} must have at least one answer option.")
-        
-        # Check if there's a correct answer
-        if not question.correct_answer or question.correct_answer not in question.options:
-            errors.append(f"Question {index + 1} must have a correct answer marked.")
+        errors.extend(question_errors(index, question))
+
+    if errors:
+        raise HTTPException(status_code=400, detail=" ".join(errors))
+
+def question_errors(index: int, question: Question) -> List[str]:
+    errors = []
+
+    # Check for non-empty question text
+    if not question.question.strip():
+        errors.append(f"Question {index + 1} text cannot be empty.")
+    
+    # Check for at least one option
+    if len(question.options) == 0:
+        errors.append(f"Question {index + 1} must have at least one answer option.")
+    
+    # Check if there's a correct answer
+    if not question.correct_answer or question.correct_answer not in question.options:
+        errors.append(f"Question {index + 1} must have a correct answer marked.")
+
+    return errors
+
+def validate_quiz_patch(title: str, changed_questions: List[Tuple[int, Question]], existing_quiz_titles: List[str], remaining_question_count: int,
+                        updated_question_ids: Iterable[int] = (), deleted_question_ids: Iterable[int] = ()):
+    """Validate a partial quiz update: the new title, only the questions that
+    changed (as (index in quiz, question) pairs), and the number of questions
+    the quiz will have afterwards. A question cannot be both updated and
+    deleted."""
+    errors = []
+
+    both = sorted(set(updated_question_ids) & set(deleted_question_ids))
+    if both:
+        errors.append(f"Questions {both} cannot be both updated and deleted.")
+
+    if not title.strip():
+        errors.append("Quiz title cannot be empty.")
+
+    if title in existing_quiz_titles:
+        errors.append("Quiz title must be unique.")
+
+    if remaining_question_count == 0:
+        errors.append("Quiz must contain at least one question.")
+
+    for index, question in changed_questions:
+        errors.extend(question_errors(index, question))
 
     if errors:
         raise HTTPException(status_code=400, detail=" ".join(errors))
@@ -0,0 +1,99 @@
+"""
+Stored AI responses (the ai_response_cache table), keyed per namespace.
+"""
+
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import AIResponseCacheDB
+
+
+def response_cache_key(*parts) -> str:
+    """sha256 over `parts`; bytes are hashed as-is, anything else as canonical JSON"""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part if isinstance(part, bytes) else json.dumps(part, sort_keys=True).encode("utf-8")
+        # Length-prefix each part so adjacent parts cannot run together
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+# A hit rewrites last_used_at at most this often, so a burst of hits on one
+# entry is not serialized on the database write lock. Hits in between are
+# counted here and added to hit_count on the next write.
+CACHE_TOUCH_INTERVAL_SECONDS = 60
+PENDING_CACHE_HITS = {}
+PENDING_CACHE_HITS_LOCK = threading.Lock()
+
+
+def get_cached_response(db: Session, namespace: str, cache_key: str, ttl_hours: float) -> Optional[dict]:
+    """Cached response body, or None if missing or expired. A hit marks the entry as recently used."""
+    now = datetime.now()
+    entry = db.query(AIResponseCacheDB).filter(
+        AIResponseCacheDB.namespace == namespace,
+        AIResponseCacheDB.cache_key == cache_key
+    ).first()
+    if not entry or entry.created_at < (now - timedelta(hours=ttl_hours)).isoformat():
+        return None
+
+    response = json.loads(entry.response)
+    with PENDING_CACHE_HITS_LOCK:
+        hits = PENDING_CACHE_HITS.get(entry.id, 0) + 1
+        if entry.last_used_at >= (now - timedelta(seconds=CACHE_TOUCH_INTERVAL_SECONDS)).isoformat():
+            PENDING_CACHE_HITS[entry.id] = hits
+            return response
+        PENDING_CACHE_HITS.pop(entry.id, None)
+
+    entry.last_used_at = now.isoformat()
+    entry.hit_count = AIResponseCacheDB.hit_count + hits
+    db.commit()
+    return response
+
+
+def store_cached_response(db: Session, namespace: str, cache_key: str, response: dict, ttl_hours: float, max_entries: int) -> None:
+    """Insert or replace a cache entry, then evict the namespace's expired and least recently used entries"""
+    now = datetime.now()
+    entry = db.query(AIResponseCacheDB).filter(
+        AIResponseCacheDB.namespace == namespace,
+        AIResponseCacheDB.cache_key == cache_key
+    ).first()
+    if entry:
+        entry.response = json.dumps(response)
+        entry.created_at = now.isoformat()
+        entry.last_used_at = now.isoformat()
+    else:
+        db.add(AIResponseCacheDB(
+            namespace=namespace,
+            cache_key=cache_key,
+            response=json.dumps(response),
+            created_at=now.isoformat(),
+            last_used_at=now.isoformat(),
+            hit_count=0
+        ))
+    try:
+        db.flush()
+    except IntegrityError:
+        # A concurrent identical request stored its result first; keep that one
+        db.rollback()
+        return
+
+    db.query(AIResponseCacheDB).filter(
+        AIResponseCacheDB.namespace == namespace,
+        AIResponseCacheDB.created_at < (now - timedelta(hours=ttl_hours)).isoformat()
+    ).delete(synchronize_session=False)
+    least_recently_used = (
+        select(AIResponseCacheDB.id)
+        .where(AIResponseCacheDB.namespace == namespace)
+        .order_by(AIResponseCacheDB.last_used_at.desc(), AIResponseCacheDB.id.desc())
+        .offset(max_entries)
+    )
+    db.query(AIResponseCacheDB).filter(AIResponseCacheDB.id.in_(least_recently_used)).delete(synchronize_session=False)
+    db.commit()
@@ -1,98 +1,256 @@
-from fastapi import FastAPI, Request, HTTPException, Depends
+from fastapi import FastAPI, Request, HTTPException, Depends, Query
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
-from typing import List
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+from typing import List, NamedTuple, Optional, Tuple, Union
 import os
+import re
 import json
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, Text, select
-from sqlalchemy.orm import declarative_base, sessionmaker, relationship, Session
-from quiz_validator import validate_quiz, Quiz, Question
+import math
+import base64
+import binascii
+import codecs
+import hashlib
+import random
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+import zlib
+import anyio
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from sqlalchemy import Column, Integer, Text, MetaData, Table, select, func, text, and_, or_, inspect, bindparam, cast
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import sessionmaker, joinedload, Session
+from quiz_validator import validate_quiz, validate_quiz_patch, Quiz, Question
+from database import create_db_engine
+from models import Base, ClassDB, QuizDB, QuestionDB, QuestionBankDB, TagDB, SystemPromptDB, AIConfigDB, AIResponseCacheDB, QuizAttemptDB, QuizAttemptResponseDB, ItemStatsDB, ReviewStateDB, ReviewProgressDB, BankResponseDB, LearnerAbilityDB, ItemCalibrationDB, CalibrationRunDB, ItemAnswerCountDB, QuestionSignatureDB, QuestionLSHBandDB, GenerationJobDB, GenerationJobChunkDB, question_tags
+from migrations import upgrade as run_migrations, lock_schema
+from json_stream import JSONArrayStream, NDJSONStream
+from grading import answer_key, grade_answer
+from item_analysis import ItemTotals, STAT_FIELDS, answer_label, item_statistics
+from spaced_repetition import MAX_GRADE, MIN_GRADE, ReviewState, grade_for_answer, schedule
+from near_duplicates import band_keys, duplicate_clusters, from_bytes, match_batch, question_text, signatures, similarities, to_bytes
+from adaptive import ABILITY_PRIOR_SD, calibrate, closest_question, difficulty_prior, probability_correct, update_ability
+from question_normalization import blank_positions, normalize_questions, process_generated_question, validate_question
+from image_processing import prepare_image, prepare_image_bytes, prepare_image_file
+from uploads import UploadTooLarge, read_multipart
+from response_cache import get_cached_response, response_cache_key, store_cached_response
+from attempt_writer import AttemptWriter
+from item_parameters import ItemParameterCache
+from job_queue import RateLimiter, claim_chunk, finish_chunk, job_summary, refresh_job_progress, release_chunk, split_text_into_chunks
 
 app = FastAPI()
 
-DATABASE_URL = "sqlite:///./quizzes.db"
-
-engine = create_engine(DATABASE_URL)
+# Database URL and storage profile come from the environment, see database.py
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
 
-templates = Jinja2Templates(directory="templates")
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+templates = Jinja2Templates(directory=os.path.join(BASE_DIR, "templates"))
+
+app.mount("/static", StaticFiles(directory=os.path.join(BASE_DIR, "static")), name="static")
+
+# Schema changes live in migrations.py. Set AUTO_MIGRATE=false when several
+# instances share a database and `python migrations.py` runs as a deploy step.
+if os.getenv("AUTO_MIGRATE", "true").lower() == "true":
+    run_migrations(engine, Base.metadata)
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Full-text index over question bank text and tags. It is an SQLite FTS5
+# external-content table kept in sync with question_bank by triggers, so it
+# lives outside Base.metadata and is only used for MATCH lookups.
+search_metadata = MetaData()
+question_bank_fts = Table(
+    "question_bank_fts", search_metadata,
+    Column("rowid", Integer),
+    Column("question", Text),
+    Column("tags", Text),
+)
 
-# Database models
-class ClassDB(Base):
-    __tablename__ = "classes"
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, unique=True, index=True, nullable=False)
-    description = Column(Text, nullable=True)
+# Created by the question_bank_search_index migration when SQLite has FTS5;
+# otherwise search falls back to ILIKE
+FTS_ENABLED = engine.dialect.name == "sqlite" and inspect(engine).has_table("question_bank_fts")
 
-    quizzes = relationship("QuizDB", back_populates="class_ref", cascade="all, delete-orphan")
+def normalize_tags(tags) -> List[str]:
+    """Tag names as stored in the tags table, from a list or a comma-separated string"""
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    normalized = []
+    for tag in tags or []:
+        if isinstance(tag, str) and tag.strip() and tag.strip().lower() not in normalized:
+            normalized.append(tag.strip().lower())
+    return normalized
 
+def insert_tags(db: Session, names: List[str]) -> None:
+    """Insert tag names, skipping any that exist by then; another request may
+    be adding the same new tag at the same time"""
+    dialect = db.bind.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+        db.execute(insert(TagDB.__table__).on_conflict_do_nothing(index_elements=["name"]), [{"name": name} for name in names])
+        return
+    for name in names:
+        try:
+            with db.begin_nested():
+                db.execute(TagDB.__table__.insert(), {"name": name})
+        except IntegrityError:
+            pass
+
+def set_question_tags(db: Session, tags_by_question) -> None:
+    """Replace the question_tags links for each question id in `tags_by_question`.
 
-class QuizDB(Base):
-    __tablename__ = "quizzes"
-    id = Column(Integer, primary_key=True, index=True)
-    title = Column(String, index=True, nullable=False)
-    class_id = Column(Integer, ForeignKey("classes.id"), nullable=False)
+    Missing tags are created. Uses a fixed number of statements however
+    many questions are passed, so it is safe for bulk imports.
+    """
+    if not tags_by_question:
+        return
+    names = {name for tags in tags_by_question.values() for name in normalize_tags(tags)}
+    tag_ids = {}
+    if names:
+        tag_ids = dict(db.query(TagDB.name, TagDB.id).filter(TagDB.name.in_(names)).all())
+        missing = [name for name in names if name not in tag_ids]
+        if missing:
+            insert_tags(db, missing)
+            tag_ids = dict(db.query(TagDB.name, TagDB.id).filter(TagDB.name.in_(names)).all())
 
-    class_ref = relationship("ClassDB", back_populates="quizzes")
-    questions = relationship("QuestionDB", back_populates="quiz", cascade="all, delete-orphan")
+    db.execute(question_tags.delete().where(question_tags.c.question_id.in_(list(tags_by_question))))
+    links = [
+        {"question_id": question_id, "tag_id": tag_ids[name]}
+        for question_id, tags in tags_by_question.items()
+        for name in normalize_tags(tags)
+    ]
+    if links:
+        db.execute(question_tags.insert(), links)
 
+DUPLICATE_LOOKUP_CHUNK = 500  # band keys or question ids per IN query
 
-class QuestionDB(Base):
-    __tablename__ = "questions"
-    id = Column(Integer, primary_key=True, index=True)
-    question = Column(Text, nullable=False)
-    question_type = Column(String, nullable=False, default="multiple_choice")
-    options = Column(Text, nullable=False)  # JSON-encoded list of options or acceptable answers
-    correct_answer = Column(String, nullable=False)
-    quiz_id = Column(Integer, ForeignKey("quizzes.id"))
+class DuplicateCheck(NamedTuple):
+    signatures: np.ndarray  # one MinHash signature row per checked question, for index_bank_questions
+    matches: list  # near_duplicates.Match or None per checked question
 
-    quiz = relationship("QuizDB", back_populates="questions")
+def load_signatures(db: Session, question_ids) -> dict:
+    """Stored MinHash signatures by question id"""
+    question_ids = list(question_ids)
+    found = {}
+    for start in range(0, len(question_ids), DUPLICATE_LOOKUP_CHUNK):
+        found.update(
+            (question_id, from_bytes(signature))
+            for question_id, signature in db.query(QuestionSignatureDB.question_id, QuestionSignatureDB.signature)
+            .filter(QuestionSignatureDB.question_id.in_(question_ids[start:start + DUPLICATE_LOOKUP_CHUNK]))
+        )
+    return found
 
+def check_duplicates(db: Session, class_id: int, texts: List[str]) -> DuplicateCheck:
+    """Near-duplicates of question texts (see near_duplicates.question_text)
+    in `class_id`'s bank and among the earlier texts of the batch.
 
-class QuestionBankDB(Base):
-    __tablename__ = "question_bank"
-    id = Column(Integer, primary_key=True, index=True)
-    question = Column(Text, nullable=False)
-    question_type = Column(String, nullable=False, default="multiple_choice")
-    options = Column(Text, nullable=False)  # JSON-encoded list of options or acceptable answers
-    correct_answer = Column(String, nullable=False)
-    class_id = Column(Integer, ForeignKey("classes.id"), nullable=False)
-    difficulty = Column(String, nullable=True)  # easy, medium, hard
-    tags = Column(Text, nullable=True)  # JSON-encoded list of tags
-    created_at = Column(String, nullable=True)  # timestamp
+    The batch's band keys are looked up in the LSH index, and only the
+    signatures of bank questions sharing one are loaded and compared, so
+    the cost follows the batch and its candidates rather than the bank.
+    """
+    signature_matrix = signatures(texts)
+    keys = band_keys(signature_matrix)
+    bands = QuestionLSHBandDB.__table__
+    unique_keys = np.unique(keys).tolist()
+    candidates = {}
+    for start in range(0, len(unique_keys), DUPLICATE_LOOKUP_CHUNK):
+        for key, question_id in db.execute(
+            select(bands.c.band_key, bands.c.question_id)
+            .where(bands.c.class_id == class_id, bands.c.band_key.in_(unique_keys[start:start + DUPLICATE_LOOKUP_CHUNK]))
+        ):
+            candidates.setdefault(key, []).append(question_id)
+    candidate_signatures = load_signatures(db, {question_id for question_ids in candidates.values() for question_id in question_ids})
+    return DuplicateCheck(signature_matrix, match_batch(signature_matrix, keys, candidates, candidate_signatures))
 
-    class_ref = relationship("ClassDB")
+def index_bank_questions(db: Session, class_id: int, question_ids: List[int], signature_matrix: np.ndarray) -> None:
+    """Add new bank questions of a class to the duplicate index, with their signatures from check_duplicates()"""
+    if not question_ids:
+        return
+    db.execute(QuestionSignatureDB.__table__.insert(), [
+        {"question_id": question_id, "class_id": class_id, "signature": to_bytes(signature)}
+        for question_id, signature in zip(question_ids, signature_matrix)
+    ])
+    db.execute(QuestionLSHBandDB.__table__.insert(), [
+        {"class_id": class_id, "band_key": key, "question_id": question_id}
+        for question_id, row_keys in zip(question_ids, band_keys(signature_matrix).tolist())
+        for key in set(row_keys)
+    ])
 
+def unindex_bank_questions(db: Session, question_ids: List[int]) -> None:
+    """Remove bank questions from the duplicate index; their band rows are found from the stored signatures"""
+    stored = db.query(QuestionSignatureDB.question_id, QuestionSignatureDB.class_id, QuestionSignatureDB.signature).filter(
+        QuestionSignatureDB.question_id.in_(question_ids)
+    ).all()
+    if not stored:
+        return
+    keys = band_keys(np.stack([from_bytes(signature) for _, _, signature in stored]))
+    bands = QuestionLSHBandDB.__table__
+    db.execute(
+        bands.delete().where(
+            bands.c.class_id == bindparam("b_class_id"),
+            bands.c.band_key == bindparam("b_band_key"),
+            bands.c.question_id == bindparam("b_question_id")
+        ),
+        [
+            {"b_class_id": class_id, "b_band_key": key, "b_question_id": question_id}
+            for (question_id, class_id, _), row_keys in zip(stored, keys.tolist())
+            for key in set(row_keys)
+        ]
+    )
+    db.execute(QuestionSignatureDB.__table__.delete().where(QuestionSignatureDB.question_id.in_(question_ids)))
 
-class SystemPromptDB(Base):
-    __tablename__ = "system_prompts"
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, nullable=False)  # e.g., "question_generation", "image_analysis"
-    prompt_text = Column(Text, nullable=False)
-    version = Column(Integer, nullable=False, default=1)
-    is_active = Column(String, nullable=False, default="false")  # "true" or "false"
-    created_at = Column(String, nullable=False)
-    created_by = Column(String, nullable=True, default="system")
-    description = Column(Text, nullable=True)
+BULK_INSERT_CHUNK_SIZE = 500
 
+def bulk_insert(db: Session, table, rows: List[dict]) -> List[int]:
+    """Insert `rows` into `table` inside the session's transaction and return
+    their new ids, in order.
 
-class AIConfigDB(Base):
-    __tablename__ = "ai_config"
-    id = Column(Integer, primary_key=True, index=True)
-    config_key = Column(String, nullable=False, unique=True)  # e.g., "default_model", "api_provider"
-    config_value = Column(Text, nullable=False)
-    config_type = Column(String, nullable=False, default="string")  # "string", "integer", "boolean", "json"
-    description = Column(Text, nullable=True)
-    updated_at = Column(String, nullable=False)
-    updated_by = Column(String, nullable=True, default="system")
+    SQLite gets a single executemany; new rowids are allocated as max(id) + 1
+    and the transaction holds the write lock, so the batch occupies the last
+    len(rows) ids. Other backends use multi-row INSERT ... RETURNING.
+    """
+    if not rows:
+        return []
+    if db.bind.dialect.name == "sqlite":
+        db.execute(table.insert(), rows)
+        last_id = db.execute(select(func.max(table.c.id))).scalar()
+        return list(range(last_id - len(rows) + 1, last_id + 1))
 
+    ids = []
+    for start in range(0, len(rows), BULK_INSERT_CHUNK_SIZE):
+        chunk = rows[start:start + BULK_INSERT_CHUNK_SIZE]
+        ids.extend(db.execute(table.insert().values(chunk).returning(table.c.id)).scalars().all())
+    return ids
 
-Base.metadata.create_all(bind=engine)
+def filter_by_tags(query, tags_all: Optional[List[str]] = None, tags_any: Optional[List[str]] = None):
+    """Restrict a QuestionBankDB query to questions having every tag in
+    `tags_all` and at least one tag in `tags_any` (indexed lookups on question_tags)"""
+    tags_all = normalize_tags(tags_all)
+    tags_any = normalize_tags(tags_any)
+    if tags_any:
+        any_match = (
+            select(question_tags.c.question_id)
+            .join(TagDB, TagDB.id == question_tags.c.tag_id)
+            .where(TagDB.name.in_(tags_any))
+        )
+        query = query.filter(QuestionBankDB.id.in_(any_match))
+    if tags_all:
+        all_match = (
+            select(question_tags.c.question_id)
+            .join(TagDB, TagDB.id == question_tags.c.tag_id)
+            .where(TagDB.name.in_(tags_all))
+            .group_by(question_tags.c.question_id)
+            .having(func.count(question_tags.c.tag_id) == len(tags_all))
+        )
+        query = query.filter(QuestionBankDB.id.in_(all_match))
+    return query
 
 # Global AI status tracking
 AI_AVAILABLE = False
@@ -102,6 +260,8 @@ OPENAI_API_KEY_STATUS = {"available": False, "error": None}
 def initialize_default_prompts():
     db = SessionLocal()
     try:
+        # Serialize with other instances starting against the same database
+        lock_schema(db)
         # Check if any system prompts exist
         existing_prompts = db.query(SystemPromptDB).count()
         
@@ -204,6 +364,7 @@ def initialize_ai_config():
             print("💡 Set OPENAI_API_KEY environment variable to enable AI features")
         
         # Initialize default AI configuration if not exists
+        lock_schema(db)
         default_configs = [
             {
                 "config_key": "default_model",
@@ -223,6 +384,108 @@ def initialize_ai_config():
                 "config_value": "true",
                 "config_type": "boolean",
                 "description": "Enable image analysis for question generation"
+            },
+            {
+                "config_key": "ai_request_timeout_seconds",
+                "config_value": "120",
+                "config_type": "integer",
+                "description": "Maximum time a single AI model call may take before it is cancelled"
+            },
+            {
+                "config_key": "generation_cache_enabled",
+                "config_value": "true",
+                "config_type": "boolean",
+                "description": "Reuse generated questions for identical generation requests"
+            },
+            {
+                "config_key": "generation_cache_ttl_hours",
+                "config_value": "168",
+                "config_type": "integer",
+                "description": "How long cached generation results stay valid"
+            },
+            {
+                "config_key": "generation_cache_max_entries",
+                "config_value": "1000",
+                "config_type": "integer",
+                "description": "Cached generation results kept before the least recently used are evicted"
+            },
+            {
+                "config_key": "explanation_cache_enabled",
+                "config_value": "true",
+                "config_type": "boolean",
+                "description": "Reuse answer explanations for the same question, answer and model"
+            },
+            {
+                "config_key": "explanation_cache_ttl_hours",
+                "config_value": "720",
+                "config_type": "integer",
+                "description": "How long cached answer explanations stay valid"
+            },
+            {
+                "config_key": "explanation_cache_max_entries",
+                "config_value": "5000",
+                "config_type": "integer",
+                "description": "Cached answer explanations kept before the least recently used are evicted"
+            },
+            {
+                "config_key": "ai_job_chunk_chars",
+                "config_value": "6000",
+                "config_type": "integer",
+                "description": "Maximum characters of source text sent to the model per generation job chunk"
+            },
+            {
+                "config_key": "ai_job_questions_per_chunk",
+                "config_value": "5",
+                "config_type": "integer",
+                "description": "Default number of questions generated from each chunk of a generation job"
+            },
+            {
+                "config_key": "ai_job_max_chunks",
+                "config_value": "200",
+                "config_type": "integer",
+                "description": "Maximum number of chunks (text excerpts plus images) in one generation job"
+            },
+            {
+                "config_key": "ai_job_requests_per_minute",
+                "config_value": "60",
+                "config_type": "integer",
+                "description": "Model calls per minute that generation job workers may start on each app instance"
+            },
+            {
+                "config_key": "ai_job_max_attempts",
+                "config_value": "3",
+                "config_type": "integer",
+                "description": "Attempts per generation job chunk before it is marked as failed"
+            },
+            {
+                "config_key": "ai_job_retry_delay_seconds",
+                "config_value": "10",
+                "config_type": "integer",
+                "description": "Delay before the first retry of a failed job chunk; doubles with every attempt"
+            },
+            {
+                "config_key": "max_images_per_request",
+                "config_value": "10",
+                "config_type": "integer",
+                "description": "Maximum number of images in one question generation request"
+            },
+            {
+                "config_key": "image_max_dimension",
+                "config_value": "2048",
+                "config_type": "integer",
+                "description": "Uploaded images are scaled down to fit this many pixels on their longer side"
+            },
+            {
+                "config_key": "image_jpeg_quality",
+                "config_value": "85",
+                "config_type": "integer",
+                "description": "JPEG quality (1-95) used when recompressing uploaded images"
+            },
+            {
+                "config_key": "max_upload_image_mb",
+                "config_value": "20",
+                "config_type": "integer",
+                "description": "Largest image file accepted by the multipart upload endpoint"
             }
         ]
         
@@ -253,7 +516,254 @@ def initialize_ai_config():
 initialize_default_prompts()
 initialize_ai_config()
 
+# Upper bound on worker threads serving sync (database) route handlers
+DB_THREADPOOL_SIZE = int(os.getenv("DB_THREADPOOL_SIZE", "16"))
+
+@app.on_event("startup")
+async def configure_threadpool():
+    anyio.to_thread.current_default_thread_limiter().total_tokens = DB_THREADPOOL_SIZE
+
+# Shared async OpenAI client, created once at startup so AI calls never block the event loop
+AI_CLIENT = None
+DEFAULT_AI_TIMEOUT_SECONDS = 120
+DISCONNECT_POLL_SECONDS = 1.0
+
+@app.on_event("startup")
+async def create_ai_client():
+    global AI_CLIENT, AI_AVAILABLE, OPENAI_API_KEY_STATUS
+    if not AI_AVAILABLE:
+        return
+    try:
+        from openai import AsyncOpenAI
+        # OPENAI_BASE_URL points the client at another OpenAI-compatible server,
+        # e.g. benchmarks/stub_model_server.py for offline testing
+        AI_CLIENT = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=os.getenv("OPENAI_BASE_URL") or None, max_retries=1)
+    except Exception as e:
+        print(f"❌ Error creating OpenAI client: {e}")
+        OPENAI_API_KEY_STATUS = {"available": False, "error": f"Client initialization error: {str(e)}"}
+        AI_AVAILABLE = False
+
+@app.on_event("shutdown")
+async def close_ai_client():
+    if AI_CLIENT is not None:
+        await AI_CLIENT.close()
+
+# Uploaded images are downscaled in worker processes, so the CPU work neither
+# blocks the event loop nor holds the GIL. 0 runs it on the default thread pool.
+IMAGE_PROCESS_WORKERS = int(os.getenv("IMAGE_PROCESS_WORKERS", str(min(4, os.cpu_count() or 1))))
+IMAGE_POOL = None
+
+@app.on_event("startup")
+async def start_image_pool():
+    global IMAGE_POOL
+    if IMAGE_PROCESS_WORKERS > 0:
+        IMAGE_POOL = ProcessPoolExecutor(max_workers=IMAGE_PROCESS_WORKERS)
+
+@app.on_event("shutdown")
+async def stop_image_pool():
+    global IMAGE_POOL
+    if IMAGE_POOL is not None:
+        IMAGE_POOL.shutdown(wait=False, cancel_futures=True)
+        IMAGE_POOL = None
+
+def parse_config_value(config_type: str, raw_value: str):
+    """Typed value of an ai_config entry; raises ValueError if `raw_value` does not match `config_type`"""
+    if config_type == "integer":
+        return int(raw_value)
+    if config_type == "float":
+        return float(raw_value)
+    if config_type == "boolean":
+        if raw_value.lower() not in ["true", "false"]:
+            raise ValueError("Boolean values must be 'true' or 'false'")
+        return raw_value.lower() == "true"
+    if config_type == "json":
+        return json.loads(raw_value)
+    return raw_value
+
+class AISettingsCache:
+    """Parsed ai_config values and active system prompts; invalidated by writers here, reloaded after `ttl_seconds` for other instances' writes"""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        self.values = None
+        self.prompts = None
+        self.loaded_at = 0.0
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def snapshot(self, db: Session):
+        with self.lock:
+            if self.values is not None and time.monotonic() - self.loaded_at < self.ttl_seconds:
+                self.hits += 1
+                return self.values, self.prompts
+            self.misses += 1
+            generation = self.generation
+
+        values = {}
+        for config in db.query(AIConfigDB).all():
+            try:
+                values[config.config_key] = parse_config_value(config.config_type, config.config_value)
+            except ValueError:
+                print(f"⚠️ Ignoring invalid {config.config_type} value for AI setting '{config.config_key}'")
+        prompts = {
+            prompt.name: {
+                "id": prompt.id,
+                "name": prompt.name,
+                "prompt_text": prompt.prompt_text,
+                "version": prompt.version,
+                "description": prompt.description
+            }
+            for prompt in db.query(SystemPromptDB).filter(SystemPromptDB.is_active == "true")
+        }
+
+        with self.lock:
+            # Keep the snapshot only if nothing was written while it was loading
+            if generation == self.generation:
+                self.values, self.prompts, self.loaded_at = values, prompts, time.monotonic()
+        return values, prompts
+
+    def invalidate(self):
+        with self.lock:
+            self.values = None
+            self.prompts = None
+            self.generation += 1
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "cached": self.values is not None,
+                "age_seconds": time.monotonic() - self.loaded_at if self.values is not None else None,
+                "ttl_seconds": self.ttl_seconds
+            }
+
+AI_SETTINGS = AISettingsCache(float(os.getenv("AI_SETTINGS_CACHE_TTL_SECONDS", "60")))
+
+def get_ai_setting(db: Session, config_key: str, default=None):
+    values, _ = AI_SETTINGS.snapshot(db)
+    return values.get(config_key, default)
+
+def get_active_system_prompt(db: Session, prompt_name: str) -> Optional[dict]:
+    _, prompts = AI_SETTINGS.snapshot(db)
+    return prompts.get(prompt_name)
+
+async def load_ai_settings(db: Session) -> None:
+    """Load the settings snapshot on the threadpool if it is missing, so the
+    get_ai_setting() calls an async handler makes next don't query the
+    database on the event loop"""
+    await run_in_threadpool(AI_SETTINGS.snapshot, db)
+
+def get_ai_timeout(db: Session) -> float:
+    """Per-request timeout for model calls, from the ai_request_timeout_seconds setting"""
+    try:
+        return float(get_ai_setting(db, "ai_request_timeout_seconds", DEFAULT_AI_TIMEOUT_SECONDS))
+    except (TypeError, ValueError):
+        return DEFAULT_AI_TIMEOUT_SECONDS
+
+class SharedCall:
+    """A model call in progress and how many requests are waiting on it"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+# Model calls in progress, by cache key, so concurrent identical requests share one call
+IN_FLIGHT_AI_CALLS = {}
+
+def forget_shared_call(key: str, call: SharedCall) -> None:
+    if IN_FLIGHT_AI_CALLS.get(key) is call:
+        del IN_FLIGHT_AI_CALLS[key]
+
+async def single_flight(key: str, make_call, http_request: Optional[Request] = None):
+    """Await `make_call()`, or the call already running for `key`; the call is cancelled once every caller has gone"""
+    call = IN_FLIGHT_AI_CALLS.get(key)
+    if call is None:
+        call = IN_FLIGHT_AI_CALLS[key] = SharedCall(asyncio.ensure_future(make_call()))
+        call.task.add_done_callback(lambda _: forget_shared_call(key, call))
+    call.waiters += 1
+    try:
+        while True:
+            done, _ = await asyncio.wait({call.task}, timeout=DISCONNECT_POLL_SECONDS if http_request is not None else None)
+            if done:
+                return call.task.result()
+            if await http_request.is_disconnected():
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        call.waiters -= 1
+        if call.waiters == 0 and not call.task.done():
+            call.task.cancel()
+            # A request arriving now starts a new call rather than waiting on the cancelled one
+            forget_shared_call(key, call)
+
+async def run_chat_completion(http_request: Optional[Request], timeout: float, **kwargs):
+    """Run a chat completion on the shared client.
+
+    The call is cancelled when it exceeds `timeout` seconds or when the
+    client that issued `http_request` disconnects. Pass None for calls
+    shared by several requests, which only stop at the timeout.
+    """
+    if AI_CLIENT is None:
+        raise HTTPException(status_code=503, detail="AI client is not initialized")
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    completion = asyncio.ensure_future(AI_CLIENT.chat.completions.create(timeout=timeout, **kwargs))
+    try:
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise HTTPException(status_code=504, detail=f"AI request timed out after {timeout:g} seconds")
+            done, _ = await asyncio.wait({completion}, timeout=min(DISCONNECT_POLL_SECONDS, remaining))
+            if done:
+                return completion.result()
+            if http_request is not None and await http_request.is_disconnected():
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        if not completion.done():
+            completion.cancel()
+
+async def stream_chat_completion(timeout: float, **kwargs):
+    """Yield the text deltas of a streamed chat completion on the shared client.
+
+    Raises a 504 HTTPException once `timeout` seconds have passed since the
+    call started. A StreamingResponse stops iterating when its client
+    disconnects, which closes the upstream stream as well.
+    """
+    if AI_CLIENT is None:
+        raise HTTPException(status_code=503, detail="AI client is not initialized")
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    try:
+        stream = await asyncio.wait_for(AI_CLIENT.chat.completions.create(stream=True, timeout=timeout, **kwargs), timeout)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"AI request timed out after {timeout:g} seconds")
+    chunks = stream.__aiter__()
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), max(deadline - loop.time(), 0))
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                raise HTTPException(status_code=504, detail=f"AI request timed out after {timeout:g} seconds")
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        response = getattr(stream, "response", None)
+        if response is not None:
+            await response.aclose()
+
 class QuestionModel(BaseModel):
+    id: Optional[int] = None  # existing question id when saving an edited quiz
     question: str
     question_type: str = "multiple_choice"
     options: List[str]
@@ -263,6 +773,28 @@ class QuizModel(BaseModel):
     title: str
     class_id: int
     questions: List[QuestionModel]
+    version: Optional[int] = None  # when set, the save fails with 409 if the quiz changed since this version
+
+class AttemptAnswerModel(BaseModel):
+    question_id: int
+    answer: Union[List[str], str, None] = None  # option text, or one entry per blank
+    seconds: Optional[float] = None  # time spent on this question
+
+class QuizAttemptModel(BaseModel):
+    answers: List[AttemptAnswerModel] = []  # questions left out are graded as unanswered
+    quiz_version: Optional[int] = None  # when set, the submission fails with 409 if the quiz changed since
+    student_name: Optional[str] = None
+    duration_seconds: Optional[int] = None
+
+class QuestionPatchModel(QuestionModel):
+    position: Optional[int] = None  # new questions without a position are appended
+
+class QuizPatchModel(BaseModel):
+    version: int
+    title: Optional[str] = None
+    class_id: Optional[int] = None
+    upsert_questions: List[QuestionPatchModel] = []  # with id: replace that question, without: add it
+    delete_question_ids: List[int] = []
 
 class ClassModel(BaseModel):
     name: str
@@ -277,6 +809,35 @@ class QuestionBankModel(BaseModel):
     difficulty: str = "medium"
     tags: str = ""
 
+class BankSampleStratum(BaseModel):
+    count: int
+    difficulty: Optional[str] = None
+    question_types: List[str] = []
+    tags_all: List[str] = []
+    tags_any: List[str] = []
+
+class BankSampleRequest(BaseModel):
+    class_id: int
+    strata: List[BankSampleStratum]
+    seed: Optional[int] = None
+    shuffle: bool = True  # False keeps questions grouped by stratum
+
+class ReviewGradeModel(BaseModel):
+    question_id: int
+    grade: Optional[int] = None  # SM-2 grade 0-5; when left out, the answer is graded
+    answer: Union[List[str], str, None] = None  # option text, or one entry per blank
+    seconds: Optional[float] = None  # time spent on the question
+
+class ReviewGradesModel(BaseModel):
+    learner: str
+    reviews: List[ReviewGradeModel]
+
+class AdaptiveAnswerModel(BaseModel):
+    learner: str
+    question_id: int
+    answer: Union[List[str], str, None] = None  # option text, or one entry per blank
+    seconds: Optional[float] = None  # time spent on the question
+
 class SystemPromptModel(BaseModel):
     name: str
     prompt_text: str
@@ -291,12 +852,24 @@ class AIConfigModel(BaseModel):
 class AIGenerationRequest(BaseModel):
     text_content: str = ""
     image_data: str = ""  # base64 encoded image
+    image_data_list: List[str] = []  # more base64 encoded images, one model call each
     class_id: int
     num_questions: int = 5
     min_options: int = 4
     question_types: List[str] = ["multiple_choice", "fill_blank"]
     difficulty_preference: str = "medium"
     custom_instructions: str = ""
+    force_refresh: bool = False  # skip the generation cache and call the model again
+
+class GenerationJobRequest(BaseModel):
+    class_id: int
+    text_content: str = ""  # long document; split into chunks of ai_job_chunk_chars
+    image_data_list: List[str] = []  # base64 encoded images, one chunk each
+    questions_per_chunk: Optional[int] = None  # defaults to the ai_job_questions_per_chunk setting
+    min_options: int = 4
+    question_types: List[str] = ["multiple_choice", "fill_blank"]
+    difficulty_preference: str = "medium"
+    custom_instructions: str = ""
 
 class AIGeneratedQuestion(BaseModel):
     question: str
@@ -328,12 +901,12 @@ async def version():
 
 @app.get("/styles")
 async def get_styles():
-    return FileResponse(os.path.join("static", "styles.css"))
+    return FileResponse(os.path.join(BASE_DIR, "static", "styles.css"))
 
 @app.get("/favicon.ico")
 async def favicon():
     return FileResponse(
-        os.path.join("static", "favicon.ico"),
+        os.path.join(BASE_DIR, "static", "favicon.ico"),
         media_type="image/x-icon",
         headers={"Cache-Control": "public, max-age=31536000"}
     )
@@ -359,7 +932,7 @@ async def quiz_builder(request: Request):
     return templates.TemplateResponse("quiz_builder.html", {"request": request})
 
 @app.get("/quiz_builder/{quiz_id}")
-async def edit_quiz(request: Request, quiz_id: int, db: Session = Depends(get_db)):
+def edit_quiz(request: Request, quiz_id: int, db: Session = Depends(get_db)):
     quiz = db.query(QuizDB).filter(QuizDB.id == quiz_id).first()
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
@@ -368,8 +941,10 @@ async def edit_quiz(request: Request, quiz_id: int, db: Session = Depends(get_db
         "id": quiz.id,
         "title": quiz.title,
         "class_id": quiz.class_id,
+        "version": quiz.version,
         "questions": [
             {
+                "id": q.id,
                 "question": q.question,
                 "question_type": q.question_type,
                 "options": json.loads(q.options),
@@ -381,7 +956,7 @@ async def edit_quiz(request: Request, quiz_id: int, db: Session = Depends(get_db
     return templates.TemplateResponse("quiz_builder.html", {"request": request, "quiz": quiz_data})
 
 @app.get("/quiz_practice/{quiz_id}")
-async def quiz_practice(request: Request, quiz_id: int, db: Session = Depends(get_db)):
+def quiz_practice(request: Request, quiz_id: int, db: Session = Depends(get_db)):
     quiz = db.query(QuizDB).filter(QuizDB.id == quiz_id).first()
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
@@ -389,12 +964,42 @@ async def quiz_practice(request: Request, quiz_id: int, db: Session = Depends(ge
 
 # Class CRUD endpoints
 @app.get("/api/classes")
-async def get_all_classes(db: Session = Depends(get_db)):
-    classes = db.query(ClassDB).all()
-    return [{"id": cls.id, "name": cls.name, "description": cls.description, "quiz_count": len(cls.quizzes)} for cls in classes]
+def get_all_classes(db: Session = Depends(get_db)):
+    quiz_counts = (
+        db.query(QuizDB.class_id, func.count(QuizDB.id).label("quiz_count"))
+        .group_by(QuizDB.class_id)
+        .subquery()
+    )
+    rows = (
+        db.query(ClassDB.id, ClassDB.name, ClassDB.description, func.coalesce(quiz_counts.c.quiz_count, 0))
+        .outerjoin(quiz_counts, quiz_counts.c.class_id == ClassDB.id)
+        .order_by(ClassDB.id)
+        .all()
+    )
+    return [{"id": id, "name": name, "description": description, "quiz_count": quiz_count} for id, name, description, quiz_count in rows]
+
+@app.get("/api/catalog")
+def get_catalog(db: Session = Depends(get_db)):
+    """Every class with its quiz count and quiz summaries, built from one joined query"""
+    rows = (
+        db.query(ClassDB.id, ClassDB.name, ClassDB.description, QuizDB.id, QuizDB.title)
+        .outerjoin(QuizDB, QuizDB.class_id == ClassDB.id)
+        .order_by(ClassDB.id, QuizDB.id)
+        .all()
+    )
+
+    catalog = {}
+    for class_id, name, description, quiz_id, quiz_title in rows:
+        entry = catalog.get(class_id)
+        if entry is None:
+            entry = catalog[class_id] = {"id": class_id, "name": name, "description": description, "quiz_count": 0, "quizzes": []}
+        if quiz_id is not None:
+            entry["quizzes"].append({"id": quiz_id, "title": quiz_title})
+            entry["quiz_count"] += 1
+    return list(catalog.values())
 
 @app.post("/api/classes")
-async def create_class(class_data: ClassModel, db: Session = Depends(get_db)):
+def create_class(class_data: ClassModel, db: Session = Depends(get_db)):
     # Check if class name already exists
     existing_class = db.query(ClassDB).filter(ClassDB.name == class_data.name).first()
     if existing_class:
@@ -407,7 +1012,7 @@ async def create_class(class_data: ClassModel, db: Session = Depends(get_db)):
     return {"class_id": db_class.id}
 
 @app.get("/api/classes/{class_id}")
-async def get_class(class_id: int, db: Session = Depends(get_db)):
+def get_class(class_id: int, db: Session = Depends(get_db)):
     class_obj = db.query(ClassDB).filter(ClassDB.id == class_id).first()
     if not class_obj:
         raise HTTPException(status_code=404, detail="Class not found")
@@ -419,7 +1024,7 @@ async def get_class(class_id: int, db: Session = Depends(get_db)):
     }
 
 @app.put("/api/classes/{class_id}")
-async def update_class(class_id: int, class_data: ClassModel, db: Session = Depends(get_db)):
+def update_class(class_id: int, class_data: ClassModel, db: Session = Depends(get_db)):
     db_class = db.query(ClassDB).filter(ClassDB.id == class_id).first()
     if not db_class:
         raise HTTPException(status_code=404, detail="Class not found")
@@ -435,7 +1040,7 @@ async def update_class(class_id: int, class_data: ClassModel, db: Session = Depe
     return {"class_id": db_class.id}
 
 @app.delete("/api/classes/{class_id}")
-async def delete_class(class_id: int, db: Session = Depends(get_db)):
+def delete_class(class_id: int, db: Session = Depends(get_db)):
     db_class = db.query(ClassDB).filter(ClassDB.id == class_id).first()
     if not db_class:
         raise HTTPException(status_code=404, detail="Class not found")
@@ -447,17 +1052,32 @@ async def delete_class(class_id: int, db: Session = Depends(get_db)):
             detail=f"Cannot delete class '{db_class.name}' because it contains {len(db_class.quizzes)} quiz(es). Please delete or reassign the quizzes first."
         )
     
+    bank_questions = db.query(func.count(QuestionBankDB.id)).filter(QuestionBankDB.class_id == class_id).scalar()
+    if bank_questions > 0:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot delete class '{db_class.name}' because its question bank contains {bank_questions} question(s). Please delete or move the questions first."
+        )
+    
+    db.execute(ReviewStateDB.__table__.delete().where(ReviewStateDB.class_id == class_id))
+    db.execute(ReviewProgressDB.__table__.delete().where(ReviewProgressDB.class_id == class_id))
+    for table in (
+        BankResponseDB.__table__, LearnerAbilityDB.__table__, ItemCalibrationDB.__table__, CalibrationRunDB.__table__,
+        QuestionSignatureDB.__table__, QuestionLSHBandDB.__table__
+    ):
+        db.execute(table.delete().where(table.c.class_id == class_id))
     db.delete(db_class)
     db.commit()
     return {"detail": "Class deleted successfully"}
 
 # Question Bank CRUD endpoints
 @app.get("/api/question-bank")
-async def get_question_bank(class_id: int = None, db: Session = Depends(get_db)):
+def get_question_bank(class_id: int = None, db: Session = Depends(get_db)):
+    query = db.query(QuestionBankDB).options(joinedload(QuestionBankDB.class_ref))
     if class_id:
-        questions = db.query(QuestionBankDB).filter(QuestionBankDB.class_id == class_id).all()
+        questions = query.filter(QuestionBankDB.class_id == class_id).all()
     else:
-        questions = db.query(QuestionBankDB).all()
+        questions = query.all()
     
     return [{
         "id": q.id,
@@ -472,8 +1092,120 @@ async def get_question_bank(class_id: int = None, db: Session = Depends(get_db))
         "created_at": q.created_at
     } for q in questions]
 
+def fts_match_expression(search: str) -> str:
+    """Turn free text into an FTS5 query: every word must match, as a prefix"""
+    terms = [term.replace('"', '""') for term in search.split()]
+    return " ".join(f'"{term}"*' for term in terms)
+
+@app.get("/api/question-bank/search")
+def search_question_bank(
+    q: str = "",
+    class_id: Optional[int] = None,
+    difficulty: Optional[str] = None,
+    question_type: Optional[str] = None,
+    tags_all: Optional[List[str]] = Query(None),
+    tags_any: Optional[List[str]] = Query(None),
+    after_id: Optional[int] = None,
+    limit: int = 50,
+    db: Session = Depends(get_db)
+):
+    """Paginated question bank search.
+
+    Full-text matches `q` against question text and tags, applies the
+    class / difficulty / type / tag filters, and pages by id: pass the
+    returned `next_cursor` as `after_id` to get the next page.
+    """
+    limit = max(1, min(limit, 200))
+
+    query = filter_by_tags(db.query(QuestionBankDB.id), tags_all, tags_any)
+    if class_id:
+        query = query.filter(QuestionBankDB.class_id == class_id)
+    if difficulty:
+        query = query.filter(QuestionBankDB.difficulty == difficulty)
+    if question_type:
+        query = query.filter(QuestionBankDB.question_type == question_type)
+    if q.strip():
+        if FTS_ENABLED:
+            matches = select(question_bank_fts.c.rowid).where(text("question_bank_fts MATCH :match"))
+            query = query.filter(QuestionBankDB.id.in_(matches)).params(match=fts_match_expression(q))
+        else:
+            pattern = f"%{q.strip()}%"
+            query = query.filter(or_(QuestionBankDB.question.ilike(pattern), cast(QuestionBankDB.tags, Text).ilike(pattern)))
+
+    total = query.count()
+
+    page_query = query
+    if after_id:
+        page_query = page_query.filter(QuestionBankDB.id > after_id)
+    page_ids = page_query.order_by(QuestionBankDB.id).limit(limit + 1).subquery()
+
+    rows = (
+        db.query(QuestionBankDB, ClassDB.name)
+        .join(ClassDB, QuestionBankDB.class_id == ClassDB.id)
+        .filter(QuestionBankDB.id.in_(select(page_ids.c.id)))
+        .order_by(QuestionBankDB.id)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        "items": [{
+            "id": question.id,
+            "question": question.question,
+            "question_type": question.question_type,
+            "options": json.loads(question.options),
+            "correct_answer": question.correct_answer,
+            "class_id": question.class_id,
+            "class_name": class_name,
+            "difficulty": question.difficulty,
+            "tags": json.loads(question.tags) if question.tags else [],
+            "created_at": question.created_at
+        } for question, class_name in rows],
+        "total": total,
+        "next_cursor": rows[-1][0].id if has_more else None
+    }
+
+@app.get("/api/question-bank/export")
+def export_question_bank(
+    class_id: Optional[int] = None,
+    export_format: str = Query("json", alias="format", regex="^(json|ndjson)$"),
+    gzip: bool = False,
+    db: Session = Depends(get_db)
+):
+    """Export the question bank, or one class's part of it, with difficulty
+    and tags; streamed in the same formats as a quiz export"""
+    from datetime import datetime
+    
+    class_name = None
+    if class_id:
+        class_obj = db.query(ClassDB).filter(ClassDB.id == class_id).first()
+        if not class_obj:
+            raise HTTPException(status_code=404, detail="Class not found")
+        class_name = class_obj.name
+    
+    bank_questions = db.query(QuestionBankDB)
+    if class_id:
+        bank_questions = bank_questions.filter(QuestionBankDB.class_id == class_id)
+    export_info = {
+        "class_id": class_id,
+        "class_name": class_name,
+        "exported_at": datetime.now().isoformat(),
+        "total_questions": bank_questions.count(),
+        "question_types": question_type_summary(bank_questions.with_entities(QuestionBankDB.question_type))
+    }
+    
+    def records(export_db: Session):
+        rows = export_db.query(QuestionBankDB, ClassDB.name).join(ClassDB, QuestionBankDB.class_id == ClassDB.id)
+        if class_id:
+            rows = rows.filter(QuestionBankDB.class_id == class_id)
+        for question, question_class in rows.order_by(QuestionBankDB.id).yield_per(EXPORT_BATCH_SIZE):
+            yield {**export_question(question), "class_name": question_class}
+    
+    return export_response(export_info, records, export_format, gzip, class_name or "question_bank")
+
 @app.post("/api/question-bank")
-async def add_to_question_bank(question: QuestionBankModel, db: Session = Depends(get_db)):
+def add_to_question_bank(question: QuestionBankModel, skip_duplicates: bool = False, db: Session = Depends(get_db)):
     # Check if class exists
     class_obj = db.query(ClassDB).filter(ClassDB.id == question.class_id).first()
     if not class_obj:
@@ -481,10 +1213,20 @@ async def add_to_question_bank(question: QuestionBankModel, db: Session = Depend
     
     from datetime import datetime
     
+    options = json.dumps(question.options)
+    check = check_duplicates(db, question.class_id, [question_text(question.question, options)])
+    match = check.matches[0]
+    duplicate = {
+        "duplicate_of": match.question_id if match else None,
+        "similarity": round(match.similarity, 3) if match else None
+    }
+    if match and skip_duplicates:
+        return {"question_id": None, **duplicate}
+    
     db_question = QuestionBankDB(
         question=question.question,
         question_type=question.question_type,
-        options=json.dumps(question.options),
+        options=options,
         correct_answer=question.correct_answer,
         class_id=question.class_id,
         difficulty=question.difficulty,
@@ -492,12 +1234,15 @@ async def add_to_question_bank(question: QuestionBankModel, db: Session = Depend
         created_at=datetime.now().isoformat()
     )
     db.add(db_question)
+    db.flush()
+    set_question_tags(db, {db_question.id: question.tags})
+    index_bank_questions(db, question.class_id, [db_question.id], check.signatures)
     db.commit()
     db.refresh(db_question)
-    return {"question_id": db_question.id}
+    return {"question_id": db_question.id, **duplicate}
 
 @app.get("/api/question-bank/{question_id}")
-async def get_question_bank_item(question_id: int, db: Session = Depends(get_db)):
+def get_question_bank_item(question_id: int, db: Session = Depends(get_db)):
     question = db.query(QuestionBankDB).filter(QuestionBankDB.id == question_id).first()
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
@@ -514,7 +1259,7 @@ async def get_question_bank_item(question_id: int, db: Session = Depends(get_db)
     }
 
 @app.put("/api/question-bank/{question_id}")
-async def update_question_bank_item(question_id: int, question: QuestionBankModel, db: Session = Depends(get_db)):
+def update_question_bank_item(question_id: int, question: QuestionBankModel, db: Session = Depends(get_db)):
     db_question = db.query(QuestionBankDB).filter(QuestionBankDB.id == question_id).first()
     if not db_question:
         raise HTTPException(status_code=404, detail="Question not found")
@@ -524,6 +1269,7 @@ async def update_question_bank_item(question_id: int, question: QuestionBankMode
     if not class_obj:
         raise HTTPException(status_code=400, detail="Invalid class_id")
     
+    previous_class_id = db_question.class_id
     db_question.question = question.question
     db_question.question_type = question.question_type
     db_question.options = json.dumps(question.options)
@@ -531,30 +1277,165 @@ async def update_question_bank_item(question_id: int, question: QuestionBankMode
     db_question.class_id = question.class_id
     db_question.difficulty = question.difficulty
     db_question.tags = json.dumps([t.strip() for t in question.tags.split(",") if t.strip()]) if question.tags else json.dumps([])
+    set_question_tags(db, {db_question.id: question.tags})
+    unindex_bank_questions(db, [question_id])
+    index_bank_questions(db, question.class_id, [question_id], signatures([question_text(db_question.question, db_question.options)]))
+    # Review states and calibrations carry the class for their indexes
+    db.execute(ReviewStateDB.__table__.update().where(ReviewStateDB.question_id == question_id).values(class_id=question.class_id))
+    db.execute(ItemCalibrationDB.__table__.update().where(ItemCalibrationDB.question_id == question_id).values(class_id=question.class_id))
+    if question.class_id != previous_class_id:
+        # New question cursors of the target class may already be past this id
+        db.execute(
+            ReviewProgressDB.__table__.update()
+            .where(ReviewProgressDB.class_id == question.class_id, ReviewProgressDB.new_cursor >= question_id)
+            .values(new_cursor=question_id - 1)
+        )
     
     db.commit()
     return {"question_id": db_question.id}
 
 @app.delete("/api/question-bank/{question_id}")
-async def delete_question_bank_item(question_id: int, db: Session = Depends(get_db)):
+def delete_question_bank_item(question_id: int, db: Session = Depends(get_db)):
     question = db.query(QuestionBankDB).filter(QuestionBankDB.id == question_id).first()
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
     
+    db.execute(ReviewStateDB.__table__.delete().where(ReviewStateDB.question_id == question_id))
+    db.execute(BankResponseDB.__table__.delete().where(BankResponseDB.question_id == question_id))
+    db.execute(ItemCalibrationDB.__table__.delete().where(ItemCalibrationDB.question_id == question_id))
+    for table in (ItemStatsDB.__table__, ItemAnswerCountDB.__table__):
+        db.execute(table.delete().where(table.c.item_type == "bank", table.c.item_id == question_id))
+    unindex_bank_questions(db, [question_id])
     db.delete(question)
     db.commit()
     return {"detail": "Question deleted successfully"}
 
+@app.get("/api/classes/{class_id}/duplicates")
+def get_duplicate_clusters(class_id: int, limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    """Clusters of near-duplicate questions in a class's bank, largest first.
+
+    Only questions sharing an LSH band key with another one are read (one
+    grouped pass over the class's range of the band index), and their
+    signatures are compared within each shared key.
+    """
+    if not db.query(ClassDB.id).filter(ClassDB.id == class_id).first():
+        raise HTTPException(status_code=404, detail="Class not found")
+    
+    bands = QuestionLSHBandDB.__table__
+    shared_keys = (
+        select(bands.c.band_key)
+        .where(bands.c.class_id == class_id)
+        .group_by(bands.c.band_key)
+        .having(func.count() > 1)
+    )
+    buckets = {}
+    for key, question_id in db.execute(
+        select(bands.c.band_key, bands.c.question_id).where(bands.c.class_id == class_id, bands.c.band_key.in_(shared_keys))
+    ):
+        buckets.setdefault(key, []).append(question_id)
+    signatures_by_id = load_signatures(db, {question_id for question_ids in buckets.values() for question_id in question_ids})
+    clusters = duplicate_clusters(buckets.values(), signatures_by_id)
+    
+    shown_ids = [question_id for cluster in clusters[:limit] for question_id in cluster]
+    questions = {}
+    for start in range(0, len(shown_ids), DUPLICATE_LOOKUP_CHUNK):
+        questions.update(
+            (row.id, row) for row in db.query(QuestionBankDB.id, QuestionBankDB.question, QuestionBankDB.question_type, QuestionBankDB.difficulty)
+            .filter(QuestionBankDB.id.in_(shown_ids[start:start + DUPLICATE_LOOKUP_CHUNK]))
+        )
+    
+    def cluster_entry(cluster: List[int]) -> dict:
+        scores = similarities(signatures_by_id[cluster[0]], np.stack([signatures_by_id[question_id] for question_id in cluster]))
+        return {
+            "size": len(cluster),
+            "questions": [{
+                "id": question_id,
+                "question": questions[question_id].question,
+                "question_type": questions[question_id].question_type,
+                "difficulty": questions[question_id].difficulty,
+                "similarity": round(float(score), 3)  # to the cluster's first (oldest) question
+            } for question_id, score in zip(cluster, scores)]
+        }
+    
+    return {
+        "class_id": class_id,
+        "total_clusters": len(clusters),
+        "duplicate_questions": sum(len(cluster) - 1 for cluster in clusters),  # questions beyond the first of each cluster
+        "clusters": [cluster_entry(cluster) for cluster in clusters[:limit]]
+    }
+
+SAMPLE_LOOKUP_CHUNK = 500  # row numbers or question ids per IN query
+
+def draw_random_ids(db: Session, id_query, count: int, rng: random.Random, exclude=()) -> List[int]:
+    """Pick `count` random ids from a query selecting QuestionBankDB.id.
+
+    Counts the matches, draws random row numbers, then resolves only those
+    to ids with ROW_NUMBER() queries, so no rows are loaded into memory.
+    A row number is drawn again when its id is in `exclude`, or when it no
+    longer exists because questions were deleted since the count.
+    """
+    matching = id_query.count()
+    if matching < count:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Not enough questions available. Found {matching}, requested {count}"
+        )
+    if count <= 0:
+        return []
+
+    numbered = id_query.add_columns(func.row_number().over(order_by=QuestionBankDB.id).label("row_number")).subquery()
+    exclude = set(exclude)
+    selected = []
+    tried = set()
+    while len(selected) < count and len(tried) < matching:
+        # A sample this size holds at least `needed` row numbers not tried yet
+        needed = count - len(selected)
+        drawn = rng.sample(range(1, matching + 1), min(matching, needed + len(tried)))
+        row_numbers = [row_number for row_number in drawn if row_number not in tried][:needed]
+        tried.update(row_numbers)
+        ids_by_row = {}
+        for start in range(0, len(row_numbers), SAMPLE_LOOKUP_CHUNK):
+            ids_by_row.update(
+                db.query(numbered.c.row_number, numbered.c.id)
+                .filter(numbered.c.row_number.in_(row_numbers[start:start + SAMPLE_LOOKUP_CHUNK]))
+                .all()
+            )
+        for row_number in row_numbers:
+            question_id = ids_by_row.get(row_number)
+            if question_id is not None and question_id not in exclude:
+                exclude.add(question_id)
+                selected.append(question_id)
+
+    if len(selected) < count:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Not enough questions available. Found {len(selected)}, requested {count}"
+        )
+    return selected
+
+def load_bank_questions(db: Session, question_ids: List[int]) -> List[QuestionBankDB]:
+    """Fetch the given bank questions, in the order of `question_ids`; ids deleted meanwhile are left out"""
+    by_id = {}
+    for start in range(0, len(question_ids), SAMPLE_LOOKUP_CHUNK):
+        by_id.update(
+            (q.id, q) for q in db.query(QuestionBankDB).filter(QuestionBankDB.id.in_(question_ids[start:start + SAMPLE_LOOKUP_CHUNK]))
+        )
+    return [by_id[question_id] for question_id in question_ids if question_id in by_id]
+
 @app.post("/api/question-bank/generate-quiz")
-async def generate_quiz_from_bank(
+def generate_quiz_from_bank(
     class_id: int, 
     num_questions: int = 10, 
     difficulty: str = None, 
     question_types: List[str] = None, 
+    tags_all: Optional[List[str]] = Query(None),
+    tags_any: Optional[List[str]] = Query(None),
+    seed: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
     # Build query filters
-    query = db.query(QuestionBankDB).filter(QuestionBankDB.class_id == class_id)
+    query = db.query(QuestionBankDB.id).filter(QuestionBankDB.class_id == class_id)
+    query = filter_by_tags(query, tags_all, tags_any)
     
     if difficulty:
         query = query.filter(QuestionBankDB.difficulty == difficulty)
@@ -562,16 +1443,8 @@ async def generate_quiz_from_bank(
     if question_types:
         query = query.filter(QuestionBankDB.question_type.in_(question_types))
     
-    available_questions = query.all()
-    
-    if len(available_questions) < num_questions:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Not enough questions available. Found {len(available_questions)}, requested {num_questions}"
-        )
-    
-    import random
-    selected_questions = random.sample(available_questions, num_questions)
+    selected_ids = draw_random_ids(db, query, num_questions, random.Random(seed))
+    selected_questions = load_bank_questions(db, selected_ids)
     
     return [{
         "question": q.question,
@@ -580,73 +1453,610 @@ async def generate_quiz_from_bank(
         "correct_answer": q.correct_answer
     } for q in selected_questions]
 
-# System Prompt Management endpoints
-@app.get("/api/system-prompts")
-async def get_system_prompts(name: str = None, db: Session = Depends(get_db)):
-    if name:
-        prompts = db.query(SystemPromptDB).filter(SystemPromptDB.name == name).order_by(SystemPromptDB.version.desc()).all()
-    else:
-        prompts = db.query(SystemPromptDB).order_by(SystemPromptDB.name, SystemPromptDB.version.desc()).all()
-    
-    return [{
-        "id": p.id,
-        "name": p.name,
-        "prompt_text": p.prompt_text,
-        "version": p.version,
-        "is_active": p.is_active == "true",
-        "created_at": p.created_at,
-        "created_by": p.created_by,
-        "description": p.description
-    } for p in prompts]
+@app.post("/api/question-bank/sample")
+def sample_question_bank(sample: BankSampleRequest, db: Session = Depends(get_db)):
+    """Stratified random sample from a class's question bank.
 
-@app.get("/api/system-prompts/active/{prompt_name}")
-async def get_active_prompt(prompt_name: str, db: Session = Depends(get_db)):
-    prompt = db.query(SystemPromptDB).filter(
-        SystemPromptDB.name == prompt_name,
-        SystemPromptDB.is_active == "true"
-    ).first()
+    Each stratum draws its own quota from the questions matching its
+    difficulty / type / tag filters; a question is never picked twice.
+    The seed used is returned so the same quiz can be drawn again.
+    """
+    seed = sample.seed if sample.seed is not None else random.randrange(2 ** 31)
+    rng = random.Random(seed)
+
+    selected_ids = []
+    for stratum in sample.strata:
+        query = db.query(QuestionBankDB.id).filter(QuestionBankDB.class_id == sample.class_id)
+        query = filter_by_tags(query, stratum.tags_all, stratum.tags_any)
+        if stratum.difficulty:
+            query = query.filter(QuestionBankDB.difficulty == stratum.difficulty)
+        if stratum.question_types:
+            query = query.filter(QuestionBankDB.question_type.in_(stratum.question_types))
+        selected_ids.extend(draw_random_ids(db, query, stratum.count, rng, exclude=selected_ids))
+
+    if sample.shuffle:
+        rng.shuffle(selected_ids)
+
+    return {
+        "seed": seed,
+        "questions": [{
+            "id": q.id,
+            "question": q.question,
+            "question_type": q.question_type,
+            "options": json.loads(q.options),
+            "correct_answer": q.correct_answer,
+            "difficulty": q.difficulty,
+            "tags": json.loads(q.tags) if q.tags else []
+        } for q in load_bank_questions(db, selected_ids)]
+    }
+
+REVIEW_CURSOR_STEP = 100  # bank ids checked per query when moving a learner's new question cursor
+
+def review_learner(learner: str) -> str:
+    learner = (learner or "").strip()
+    if not learner:
+        raise HTTPException(status_code=400, detail="A learner is required")
+    return learner
+
+def advance_review_cursor(db: Session, learner: str, class_id: int, cursor: int) -> int:
+    """Move a learner's new question cursor past the class's bank questions
+    they already have a review state for, in id order"""
+    while True:
+        next_ids = [row[0] for row in (
+            db.query(QuestionBankDB.id)
+            .filter(QuestionBankDB.class_id == class_id, QuestionBankDB.id > cursor)
+            .order_by(QuestionBankDB.id)
+            .limit(REVIEW_CURSOR_STEP)
+        )]
+        if not next_ids:
+            return cursor
+        reviewed = {row[0] for row in db.query(ReviewStateDB.question_id).filter(
+            ReviewStateDB.learner == learner, ReviewStateDB.question_id.in_(next_ids)
+        )}
+        for question_id in next_ids:
+            if question_id not in reviewed:
+                return cursor
+            cursor = question_id
+
+@app.get("/api/review/due")
+def get_due_reviews(
+    learner: str,
+    class_id: int,
+    limit: int = Query(20, ge=1, le=200),
+    new_limit: int = Query(10, ge=0, le=200),
+    db: Session = Depends(get_db)
+):
+    """Next questions for a learner to review from a class's question bank:
+    due reviews, most overdue first, then up to `new_limit` questions they
+    have not seen yet, in bank order.
+
+    Due reviews are one range of the (learner, class, due) index and new
+    questions a range of the class's bank ids past the learner's cursor, so
+    the cost follows `limit`, not the size of the bank or of the history.
+    """
+    from datetime import datetime
     
-    if not prompt:
-        raise HTTPException(status_code=404, detail="No active prompt found")
+    learner = review_learner(learner)
+    now = datetime.now().isoformat(timespec="seconds")
+    due = (
+        db.query(ReviewStateDB)
+        .filter(ReviewStateDB.learner == learner, ReviewStateDB.class_id == class_id, ReviewStateDB.due_at <= now)
+        .order_by(ReviewStateDB.due_at)
+        .limit(limit)
+        .all()
+    )
+    new_ids = []
+    if len(due) < limit and new_limit:
+        cursor = db.query(ReviewProgressDB.new_cursor).filter(
+            ReviewProgressDB.learner == learner, ReviewProgressDB.class_id == class_id
+        ).scalar() or 0
+        reviewed = select(ReviewStateDB.question_id).where(
+            ReviewStateDB.learner == learner, ReviewStateDB.question_id == QuestionBankDB.id
+        ).exists()
+        new_ids = [row[0] for row in (
+            db.query(QuestionBankDB.id)
+            .filter(QuestionBankDB.class_id == class_id, QuestionBankDB.id > cursor, ~reviewed)
+            .order_by(QuestionBankDB.id)
+            .limit(min(new_limit, limit - len(due)))
+        )]
     
+    states = {state.question_id: state for state in due}
     return {
-        "id": prompt.id,
-        "name": prompt.name,
-        "prompt_text": prompt.prompt_text,
-        "version": prompt.version,
-        "description": prompt.description
+        "learner": learner,
+        "class_id": class_id,
+        "questions": [{
+            "id": q.id,
+            "question": q.question,
+            "question_type": q.question_type,
+            "options": json.loads(q.options),
+            "correct_answer": q.correct_answer,
+            "difficulty": q.difficulty,
+            "tags": json.loads(q.tags) if q.tags else [],
+            "review": {
+                "due_at": states[q.id].due_at,
+                "repetitions": states[q.id].repetitions,
+                "interval_days": states[q.id].interval_days,
+                "ease": states[q.id].ease,
+                "lapses": states[q.id].lapses
+            } if q.id in states else None
+        } for q in load_bank_questions(db, list(states) + new_ids)]
     }
 
-@app.post("/api/system-prompts")
-async def create_or_update_prompt(prompt: SystemPromptModel, db: Session = Depends(get_db)):
+@app.post("/api/review/grades")
+def record_review_grades(grades: ReviewGradesModel, db: Session = Depends(get_db)):
+    """Apply a practice session's grades to the learner's review schedule.
+
+    A review carries either an SM-2 `grade` (0-5) or the learner's `answer`,
+    which is graded here: a correct answer counts as 4, or 5 when given
+    within ten seconds, and a wrong one as 1. Graded answers also count
+    towards the question's statistics and the learner's adaptive ability.
+    """
     from datetime import datetime
     
-    # Get the highest version for this prompt name
-    latest = db.query(SystemPromptDB).filter(SystemPromptDB.name == prompt.name).order_by(SystemPromptDB.version.desc()).first()
-    next_version = (latest.version + 1) if latest else 1
+    learner = review_learner(grades.learner)
+    reviews = {}
+    for review in grades.reviews:
+        if review.grade is not None and not MIN_GRADE <= review.grade <= MAX_GRADE:
+            raise HTTPException(status_code=400, detail=f"Grade must be between {MIN_GRADE} and {MAX_GRADE}")
+        reviews[review.question_id] = review
+    if not reviews:
+        return {"learner": learner, "results": []}
     
-    # Deactivate all previous versions
-    db.query(SystemPromptDB).filter(SystemPromptDB.name == prompt.name).update({"is_active": "false"})
+    rows = db.query(
+        QuestionBankDB.id, QuestionBankDB.class_id, QuestionBankDB.difficulty,
+        QuestionBankDB.question_type, QuestionBankDB.options, QuestionBankDB.correct_answer
+    ).filter(QuestionBankDB.id.in_(list(reviews))).all()
+    missing = set(reviews) - {row.id for row in rows}
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Question bank question {min(missing)} not found")
+    key = answer_key((row.id, row.question_type, row.options, row.correct_answer) for row in rows)
+    class_ids = {row.id: row.class_id for row in rows}
+    labels = {row.id: row.difficulty for row in rows}
+    states = {state.question_id: state for state in db.query(ReviewStateDB).filter(
+        ReviewStateDB.learner == learner, ReviewStateDB.question_id.in_(list(reviews))
+    )}
     
-    # Create new version
-    new_prompt = SystemPromptDB(
-        name=prompt.name,
-        prompt_text=prompt.prompt_text,
-        version=next_version,
-        is_active="true",
-        created_at=datetime.now().isoformat(),
-        created_by="user",
-        description=prompt.description
-    )
+    now = datetime.now()
+    reviewed_at = now.isoformat(timespec="seconds")
+    results = []
+    responses = []
+    for question_id, review in reviews.items():
+        keyed = key[question_id]
+        is_correct = None
+        if review.grade is None or review.answer is not None:
+            is_correct = grade_answer(keyed, review.answer)
+            responses.append({
+                "question_id": question_id,
+                "answer": json.dumps(review.answer) if review.answer is not None else None,
+                "is_correct": 1 if is_correct else 0,
+                "seconds": review.seconds
+            })
+        grade = review.grade if review.grade is not None else grade_for_answer(is_correct, review.seconds)
+        
+        state = states.get(question_id)
+        current = ReviewState(state.repetitions, state.interval_days, state.ease, state.lapses, state.reviews) if state else ReviewState()
+        scheduled, due = schedule(current, grade, now)
+        if state is None:
+            state = ReviewStateDB(learner=learner, question_id=question_id, class_id=class_ids[question_id])
+            db.add(state)
+        for field, value in scheduled._asdict().items():
+            setattr(state, field, value)
+        state.due_at = due.isoformat(timespec="seconds")
+        state.last_reviewed_at = reviewed_at
+        results.append({
+            "question_id": question_id,
+            "grade": grade,
+            "is_correct": is_correct,
+            "correct_answer": keyed.correct_answer,
+            "due_at": state.due_at,
+            "interval_days": scheduled.interval_days,
+            "repetitions": scheduled.repetitions,
+            "ease": round(scheduled.ease, 2)
+        })
+    
+    try:
+        db.flush()
+        for class_id in {class_ids[question_id] for question_id in reviews if question_id not in states}:
+            progress = db.get(ReviewProgressDB, (learner, class_id))
+            if progress is None:
+                progress = ReviewProgressDB(learner=learner, class_id=class_id, new_cursor=0)
+                db.add(progress)
+            progress.new_cursor = advance_review_cursor(db, learner, class_id, progress.new_cursor)
+        if responses:
+            totals = ItemTotals()
+            totals.add_attempt(sum(row["is_correct"] for row in responses), len(responses), responses)
+            add_item_totals(db, "bank", totals)
+            record_bank_answers(db, learner, [
+                (row["question_id"], class_ids[row["question_id"]], labels[row["question_id"]], row["is_correct"])
+                for row in responses
+            ], reviewed_at)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="These questions were graded for this learner at the same time. Try again.")
+    return {"learner": learner, "results": results}
+
+# Adaptive practice. Every graded bank answer is kept in bank_responses and
+# moves the learner's ability estimate; a background task refits the Rasch
+# difficulties of a class's questions from that history, and the next
+# question is the one whose difficulty is closest to the learner's ability.
+ADAPTIVE_RECENT_QUESTIONS = 20  # a learner's last answered questions are not asked again right away
+CALIBRATION_INTERVAL_SECONDS = float(os.getenv("ADAPTIVE_CALIBRATION_INTERVAL_SECONDS", "600"))
+CALIBRATION_TASK = None
+CALIBRATION_WAKEUP = None  # asyncio.Event set to calibrate now; made at startup on the running loop
+
+ITEM_PARAMETERS = ItemParameterCache(float(os.getenv("ITEM_PARAMETER_CACHE_TTL_SECONDS", "60")))
+
+def record_bank_answers(db: Session, learner: str, answers: List[tuple], answered_at: str) -> dict:
+    """Store graded bank answers, given as (question_id, class_id, difficulty
+    label, is_correct), and move the learner's ability in each class by
+    them. Returns the LearnerAbilityDB rows by class id; the caller commits."""
+    if not answers:
+        return {}
+    db.execute(BankResponseDB.__table__.insert(), [{
+        "learner": learner,
+        "class_id": class_id,
+        "question_id": question_id,
+        "is_correct": 1 if is_correct else 0,
+        "answered_at": answered_at
+    } for question_id, class_id, _, is_correct in answers])
+    
+    # Only the answered questions' calibrations, rather than whole classes from ITEM_PARAMETERS
+    question_ids = list({question_id for question_id, _, _, _ in answers})
+    calibrated = {}
+    for start in range(0, len(question_ids), BULK_INSERT_CHUNK_SIZE):
+        calibrated.update(db.query(ItemCalibrationDB.question_id, ItemCalibrationDB.difficulty).filter(
+            ItemCalibrationDB.question_id.in_(question_ids[start:start + BULK_INSERT_CHUNK_SIZE])
+        ))
+    abilities = {}
+    for question_id, class_id, label, is_correct in answers:
+        state = abilities.get(class_id) or db.get(LearnerAbilityDB, (learner, class_id))
+        if state is None:
+            state = LearnerAbilityDB(learner=learner, class_id=class_id, ability=0.0, information=1.0 / ABILITY_PRIOR_SD ** 2, responses=0)
+            db.add(state)
+        abilities[class_id] = state
+        difficulty = calibrated[question_id] if question_id in calibrated else difficulty_prior(label)
+        state.ability, state.information = update_ability(state.ability, state.information, difficulty, is_correct)
+        state.responses += 1
+        state.updated_at = answered_at
+    for class_id, state in abilities.items():
+        state.last_response_id = db.query(func.max(BankResponseDB.id)).filter(
+            BankResponseDB.learner == learner, BankResponseDB.class_id == class_id
+        ).scalar()
+    return abilities
+
+def calibrate_class(class_id: int) -> Optional[dict]:
+    """Refit the Rasch difficulties of a class's bank questions and its
+    learners' abilities from every recorded answer.
+
+    The answers are read in one pass into NumPy arrays and the fit runs
+    outside any transaction; the results replace the stored ones in a short
+    one. A learner who answered again meanwhile keeps their online estimate.
+    """
+    from datetime import datetime
+    
+    start = time.perf_counter()
+    db = SessionLocal()
+    try:
+        last_response_id = db.query(func.max(BankResponseDB.id)).filter(BankResponseDB.class_id == class_id).scalar()
+        questions = db.query(QuestionBankDB.id, QuestionBankDB.difficulty).filter(QuestionBankDB.class_id == class_id).order_by(QuestionBankDB.id).all()
+        if last_response_id is None or not questions:
+            return None
+        positions = {question_id: position for position, (question_id, _) in enumerate(questions)}
+        learners = {}
+        learner_index = []
+        question_index = []
+        correct = []
+        rows = (
+            db.query(BankResponseDB.learner, BankResponseDB.question_id, BankResponseDB.is_correct)
+            .filter(BankResponseDB.class_id == class_id, BankResponseDB.id <= last_response_id)
+            .yield_per(EXPORT_BATCH_SIZE)
+        )
+        for learner, question_id, is_correct in rows:
+            position = positions.get(question_id)
+            if position is None:
+                continue  # question moved to another class since
+            learner_index.append(learners.setdefault(learner, len(learners)))
+            question_index.append(position)
+            correct.append(is_correct)
+        db.rollback()  # end the read before the fit
+        
+        learner_index = np.array(learner_index, dtype=np.int64)
+        question_index = np.array(question_index, dtype=np.int64)
+        prior = np.array([difficulty_prior(label) for _, label in questions])
+        difficulty, std_error, ability, information, iterations = calibrate(
+            learner_index, question_index, np.array(correct, dtype=np.float64), prior, len(learners)
+        )
+        question_responses = np.bincount(question_index, minlength=len(questions))
+        
+        now = datetime.now().isoformat()
+        db.execute(ItemCalibrationDB.__table__.delete().where(ItemCalibrationDB.class_id == class_id))
+        db.execute(ItemCalibrationDB.__table__.insert(), [{
+            "question_id": question_id,
+            "class_id": class_id,
+            "difficulty": float(difficulty[position]),
+            "std_error": float(std_error[position]),
+            "responses": int(question_responses[position]),
+            "calibrated_at": now
+        } for position, (question_id, _) in enumerate(questions)])
+        if learners:
+            abilities = LearnerAbilityDB.__table__
+            db.execute(
+                abilities.update()
+                .where(
+                    abilities.c.learner == bindparam("b_learner"),
+                    abilities.c.class_id == class_id,
+                    abilities.c.last_response_id <= last_response_id
+                )
+                .values(ability=bindparam("b_ability"), information=bindparam("b_information")),
+                [{
+                    "b_learner": learner,
+                    "b_ability": float(ability[index]),
+                    "b_information": float(information[index])
+                } for learner, index in learners.items()]
+            )
+        result = {
+            "class_id": class_id,
+            "last_response_id": last_response_id,
+            "responses": len(correct),
+            "learners": len(learners),
+            "questions": len(questions),
+            "iterations": iterations,
+            "seconds": round(time.perf_counter() - start, 3),
+            "calibrated_at": now
+        }
+        run = db.get(CalibrationRunDB, class_id)
+        if run is None:
+            db.add(CalibrationRunDB(**result))
+        else:
+            for field, value in result.items():
+                setattr(run, field, value)
+        db.commit()
+        ITEM_PARAMETERS.invalidate(class_id)
+        print(f"✅ Calibrated {len(questions)} questions of class {class_id} from {len(correct)} answers in {result['seconds']}s")
+        return result
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def calibrate_pending_classes() -> List[dict]:
+    """Calibrate every class with answers newer than its last calibration"""
+    db = SessionLocal()
+    try:
+        newest = db.query(BankResponseDB.class_id, func.max(BankResponseDB.id)).group_by(BankResponseDB.class_id).all()
+        calibrated = dict(db.query(CalibrationRunDB.class_id, CalibrationRunDB.last_response_id).all())
+    finally:
+        db.close()
+    results = []
+    for class_id, last_response_id in newest:
+        if calibrated.get(class_id, 0) < last_response_id:
+            result = calibrate_class(class_id)
+            if result is not None:
+                results.append(result)
+    return results
+
+async def calibration_worker():
+    while True:
+        try:
+            await asyncio.wait_for(CALIBRATION_WAKEUP.wait(), timeout=CALIBRATION_INTERVAL_SECONDS or None)
+        except asyncio.TimeoutError:
+            pass
+        CALIBRATION_WAKEUP.clear()
+        try:
+            await run_in_threadpool(calibrate_pending_classes)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Calibration error: {e}")
+
+@app.on_event("startup")
+async def start_calibration_worker():
+    global CALIBRATION_TASK, CALIBRATION_WAKEUP
+    CALIBRATION_WAKEUP = asyncio.Event()
+    CALIBRATION_TASK = asyncio.ensure_future(calibration_worker())
+
+@app.on_event("shutdown")
+async def stop_calibration_worker():
+    global CALIBRATION_TASK
+    if CALIBRATION_TASK is not None:
+        CALIBRATION_TASK.cancel()
+        await asyncio.gather(CALIBRATION_TASK, return_exceptions=True)
+        CALIBRATION_TASK = None
+
+@app.get("/api/adaptive/next")
+def get_next_adaptive_question(learner: str, class_id: int, db: Session = Depends(get_db)):
+    """The most informative question for the learner's current ability in a
+    class: the one with the closest difficulty, skipping their last
+    ADAPTIVE_RECENT_QUESTIONS answers. Selection is a bisect over the cached
+    sorted difficulties."""
+    learner = review_learner(learner)
+    state = db.get(LearnerAbilityDB, (learner, class_id))
+    ability = state.ability if state else 0.0
+    information = state.information if state else 1.0 / ABILITY_PRIOR_SD ** 2
+    recent = [row[0] for row in (
+        db.query(BankResponseDB.question_id)
+        .filter(BankResponseDB.learner == learner, BankResponseDB.class_id == class_id)
+        .order_by(BankResponseDB.id.desc())
+        .limit(ADAPTIVE_RECENT_QUESTIONS)
+    )]
+    
+    for _ in range(2):
+        parameters = ITEM_PARAMETERS.get(db, class_id)
+        question_id = closest_question(parameters.difficulties, parameters.question_ids, ability, recent)
+        if question_id is None:
+            # Fewer questions than the recent window; repeat the best one
+            question_id = closest_question(parameters.difficulties, parameters.question_ids, ability)
+        if question_id is None:
+            raise HTTPException(status_code=404, detail="This class has no questions in its question bank")
+        q = db.get(QuestionBankDB, question_id)
+        if q is not None:
+            break
+        ITEM_PARAMETERS.invalidate(class_id)  # deleted since the parameters were loaded
+    else:
+        raise HTTPException(status_code=409, detail="The question bank changed. Try again.")
+    
+    difficulty = parameters.by_id[question_id]
+    return {
+        "learner": learner,
+        "class_id": class_id,
+        "ability": round(ability, 3),
+        "ability_std_error": round(1.0 / math.sqrt(information), 3),
+        "question": {
+            "id": q.id,
+            "question": q.question,
+            "question_type": q.question_type,
+            "options": json.loads(q.options),
+            "difficulty": q.difficulty,
+            "tags": json.loads(q.tags) if q.tags else [],
+            "estimated_difficulty": round(difficulty, 3),
+            "probability_correct": round(probability_correct(ability, difficulty), 3)
+        }
+    }
+
+@app.post("/api/adaptive/answers")
+def record_adaptive_answer(answer: AdaptiveAnswerModel, db: Session = Depends(get_db)):
+    """Grade an adaptive practice answer and update the learner's ability"""
+    from datetime import datetime
+    
+    learner = review_learner(answer.learner)
+    q = db.get(QuestionBankDB, answer.question_id)
+    if q is None:
+        raise HTTPException(status_code=404, detail="Question not found")
+    keyed = answer_key([(q.id, q.question_type, q.options, q.correct_answer)])[q.id]
+    is_correct = grade_answer(keyed, answer.answer)
+    
+    answered_at = datetime.now().isoformat()
+    state = record_bank_answers(db, learner, [(q.id, q.class_id, q.difficulty, is_correct)], answered_at)[q.class_id]
+    totals = ItemTotals()
+    totals.add_attempt(1 if is_correct else 0, 1, [{
+        "question_id": q.id,
+        "answer": json.dumps(answer.answer) if answer.answer is not None else None,
+        "is_correct": 1 if is_correct else 0,
+        "seconds": answer.seconds
+    }])
+    add_item_totals(db, "bank", totals)
+    db.commit()
+    
+    result = {
+        "question_id": q.id,
+        "is_correct": is_correct,
+        "correct_answer": q.correct_answer,
+        "ability": round(state.ability, 3),
+        "ability_std_error": round(1.0 / math.sqrt(state.information), 3)
+    }
+    if keyed.question_type == "fill_blank":
+        result["acceptable_answers"] = sorted(keyed.accepted)
+    return result
+
+@app.post("/api/adaptive/calibrate", status_code=202)
+async def request_calibration():
+    """Calibrate every class with new answers now, in the background, instead of waiting for the next interval"""
+    CALIBRATION_WAKEUP.set()
+    return {"detail": "Calibration started"}
+
+@app.get("/api/adaptive/calibration")
+def get_calibration_status(class_id: int, db: Session = Depends(get_db)):
+    """The class's last calibration run, and answers recorded since"""
+    run = db.get(CalibrationRunDB, class_id)
+    newest = db.query(func.max(BankResponseDB.id)).filter(BankResponseDB.class_id == class_id).scalar()
+    pending = 0
+    if newest is not None:
+        pending = db.query(func.count(BankResponseDB.id)).filter(
+            BankResponseDB.class_id == class_id, BankResponseDB.id > (run.last_response_id if run else 0)
+        ).scalar()
+    return {
+        "class_id": class_id,
+        "last_run": {
+            "responses": run.responses,
+            "learners": run.learners,
+            "questions": run.questions,
+            "iterations": run.iterations,
+            "seconds": run.seconds,
+            "calibrated_at": run.calibrated_at
+        } if run else None,
+        "answers_since": pending,
+        "parameter_cache": ITEM_PARAMETERS.stats()
+    }
+
+@app.get("/api/classes/{class_id}/tags")
+def get_class_tag_frequencies(class_id: int, db: Session = Depends(get_db)):
+    """How many question bank entries of a class carry each tag, most used first"""
+    class_obj = db.query(ClassDB).filter(ClassDB.id == class_id).first()
+    if not class_obj:
+        raise HTTPException(status_code=404, detail="Class not found")
+
+    rows = (
+        db.query(TagDB.name, func.count(question_tags.c.question_id).label("question_count"))
+        .join(question_tags, question_tags.c.tag_id == TagDB.id)
+        .join(QuestionBankDB, QuestionBankDB.id == question_tags.c.question_id)
+        .filter(QuestionBankDB.class_id == class_id)
+        .group_by(TagDB.name)
+        .order_by(func.count(question_tags.c.question_id).desc(), TagDB.name)
+        .all()
+    )
+    return [{"tag": name, "question_count": question_count} for name, question_count in rows]
+
+# System Prompt Management endpoints
+@app.get("/api/system-prompts")
+def get_system_prompts(name: str = None, db: Session = Depends(get_db)):
+    if name:
+        prompts = db.query(SystemPromptDB).filter(SystemPromptDB.name == name).order_by(SystemPromptDB.version.desc()).all()
+    else:
+        prompts = db.query(SystemPromptDB).order_by(SystemPromptDB.name, SystemPromptDB.version.desc()).all()
+    
+    return [{
+        "id": p.id,
+        "name": p.name,
+        "prompt_text": p.prompt_text,
+        "version": p.version,
+        "is_active": p.is_active == "true",
+        "created_at": p.created_at,
+        "created_by": p.created_by,
+        "description": p.description
+    } for p in prompts]
+
+@app.get("/api/system-prompts/active/{prompt_name}")
+def get_active_prompt(prompt_name: str, db: Session = Depends(get_db)):
+    prompt = get_active_system_prompt(db, prompt_name)
+    
+    if not prompt:
+        raise HTTPException(status_code=404, detail="No active prompt found")
+    
+    return prompt
+
+@app.post("/api/system-prompts")
+def create_or_update_prompt(prompt: SystemPromptModel, db: Session = Depends(get_db)):
+    from datetime import datetime
+    
+    # Get the highest version for this prompt name
+    latest = db.query(SystemPromptDB).filter(SystemPromptDB.name == prompt.name).order_by(SystemPromptDB.version.desc()).first()
+    next_version = (latest.version + 1) if latest else 1
+    
+    # Deactivate all previous versions
+    db.query(SystemPromptDB).filter(SystemPromptDB.name == prompt.name).update({"is_active": "false"})
+    
+    # Create new version
+    new_prompt = SystemPromptDB(
+        name=prompt.name,
+        prompt_text=prompt.prompt_text,
+        version=next_version,
+        is_active="true",
+        created_at=datetime.now().isoformat(),
+        created_by="user",
+        description=prompt.description
+    )
     
     db.add(new_prompt)
     db.commit()
     db.refresh(new_prompt)
+    AI_SETTINGS.invalidate()
     
     return {"prompt_id": new_prompt.id, "version": new_prompt.version}
 
 @app.post("/api/system-prompts/{prompt_id}/activate")
-async def activate_prompt_version(prompt_id: int, db: Session = Depends(get_db)):
+def activate_prompt_version(prompt_id: int, db: Session = Depends(get_db)):
     prompt = db.query(SystemPromptDB).filter(SystemPromptDB.id == prompt_id).first()
     if not prompt:
         raise HTTPException(status_code=404, detail="Prompt not found")
@@ -657,11 +2067,12 @@ async def activate_prompt_version(prompt_id: int, db: Session = Depends(get_db))
     # Activate the selected version
     prompt.is_active = "true"
     db.commit()
+    AI_SETTINGS.invalidate()
     
     return {"detail": f"Activated version {prompt.version} of {prompt.name}"}
 
 @app.delete("/api/system-prompts/{prompt_id}")
-async def delete_prompt_version(prompt_id: int, db: Session = Depends(get_db)):
+def delete_prompt_version(prompt_id: int, db: Session = Depends(get_db)):
     prompt = db.query(SystemPromptDB).filter(SystemPromptDB.id == prompt_id).first()
     if not prompt:
         raise HTTPException(status_code=404, detail="Prompt not found")
@@ -687,7 +2098,7 @@ async def get_ai_status():
     }
 
 @app.get("/api/ai/config")
-async def get_ai_config(db: Session = Depends(get_db)):
+def get_ai_config(db: Session = Depends(get_db)):
     """Get all AI configuration settings"""
     configs = db.query(AIConfigDB).all()
     return [{
@@ -701,23 +2112,17 @@ async def get_ai_config(db: Session = Depends(get_db)):
     } for config in configs]
 
 @app.get("/api/ai/config/{config_key}")
-async def get_ai_config_value(config_key: str, db: Session = Depends(get_db)):
+def get_ai_config_value(config_key: str, db: Session = Depends(get_db)):
     """Get a specific AI configuration value"""
     config = db.query(AIConfigDB).filter(AIConfigDB.config_key == config_key).first()
     if not config:
         raise HTTPException(status_code=404, detail="Configuration key not found")
     
     # Parse the value based on type
-    parsed_value = config.config_value
-    if config.config_type == "integer":
-        parsed_value = int(config.config_value)
-    elif config.config_type == "float":
-        parsed_value = float(config.config_value)
-    elif config.config_type == "boolean":
-        parsed_value = config.config_value.lower() == "true"
-    elif config.config_type == "json":
-        import json
-        parsed_value = json.loads(config.config_value)
+    try:
+        parsed_value = parse_config_value(config.config_type, config.config_value)
+    except ValueError:
+        parsed_value = config.config_value
     
     return {
         "config_key": config.config_key,
@@ -728,7 +2133,7 @@ async def get_ai_config_value(config_key: str, db: Session = Depends(get_db)):
     }
 
 @app.put("/api/ai/config/{config_key}")
-async def update_ai_config(config_key: str, config_data: AIConfigModel, db: Session = Depends(get_db)):
+def update_ai_config(config_key: str, config_data: AIConfigModel, db: Session = Depends(get_db)):
     """Update an AI configuration setting"""
     from datetime import datetime
     
@@ -738,16 +2143,7 @@ async def update_ai_config(config_key: str, config_data: AIConfigModel, db: Sess
     
     # Validate the value based on type
     try:
-        if config_data.config_type == "integer":
-            int(config_data.config_value)
-        elif config_data.config_type == "float":
-            float(config_data.config_value)
-        elif config_data.config_type == "boolean":
-            if config_data.config_value.lower() not in ["true", "false"]:
-                raise ValueError("Boolean values must be 'true' or 'false'")
-        elif config_data.config_type == "json":
-            import json
-            json.loads(config_data.config_value)
+        parse_config_value(config_data.config_type, config_data.config_value)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Invalid value for type {config_data.config_type}: {str(e)}")
     
@@ -758,11 +2154,12 @@ async def update_ai_config(config_key: str, config_data: AIConfigModel, db: Sess
     config.updated_by = "user"
     
     db.commit()
+    AI_SETTINGS.invalidate()
     
     return {"detail": f"Configuration '{config_key}' updated successfully"}
 
 @app.post("/api/ai/config")
-async def create_ai_config(config_data: AIConfigModel, db: Session = Depends(get_db)):
+def create_ai_config(config_data: AIConfigModel, db: Session = Depends(get_db)):
     """Create a new AI configuration setting"""
     from datetime import datetime
     
@@ -773,16 +2170,7 @@ async def create_ai_config(config_data: AIConfigModel, db: Session = Depends(get
     
     # Validate the value based on type
     try:
-        if config_data.config_type == "integer":
-            int(config_data.config_value)
-        elif config_data.config_type == "float":
-            float(config_data.config_value)
-        elif config_data.config_type == "boolean":
-            if config_data.config_value.lower() not in ["true", "false"]:
-                raise ValueError("Boolean values must be 'true' or 'false'")
-        elif config_data.config_type == "json":
-            import json
-            json.loads(config_data.config_value)
+        parse_config_value(config_data.config_type, config_data.config_value)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Invalid value for type {config_data.config_type}: {str(e)}")
     
@@ -798,11 +2186,12 @@ async def create_ai_config(config_data: AIConfigModel, db: Session = Depends(get
     db.add(new_config)
     db.commit()
     db.refresh(new_config)
+    AI_SETTINGS.invalidate()
     
     return {"config_id": new_config.id, "detail": f"Configuration '{config_data.config_key}' created successfully"}
 
 @app.delete("/api/ai/config/{config_key}")
-async def delete_ai_config(config_key: str, db: Session = Depends(get_db)):
+def delete_ai_config(config_key: str, db: Session = Depends(get_db)):
     """Delete an AI configuration setting"""
     config = db.query(AIConfigDB).filter(AIConfigDB.config_key == config_key).first()
     if not config:
@@ -810,47 +2199,102 @@ async def delete_ai_config(config_key: str, db: Session = Depends(get_db)):
     
     db.delete(config)
     db.commit()
+    AI_SETTINGS.invalidate()
     
     return {"detail": f"Configuration '{config_key}' deleted successfully"}
 
-# AI Question Generation endpoint
-@app.post("/api/ai/generate-questions")
-async def generate_questions_with_ai(request: AIGenerationRequest, db: Session = Depends(get_db)):
-    import openai
-    import json
-    import os
-    import base64
-    from typing import Dict, Any
-    
+@app.get("/api/ai/config-cache")
+async def get_ai_config_cache_stats():
+    """Hit/miss counters of this instance's in-memory AI settings cache"""
+    return AI_SETTINGS.stats()
+
+@app.get("/api/ai/response-cache")
+def get_ai_response_cache_stats(db: Session = Depends(get_db)):
+    """Entries and total hits of the stored AI response cache, per namespace"""
+    rows = (
+        db.query(AIResponseCacheDB.namespace, func.count(AIResponseCacheDB.id), func.coalesce(func.sum(AIResponseCacheDB.hit_count), 0))
+        .group_by(AIResponseCacheDB.namespace)
+        .all()
+    )
+    return [{"namespace": namespace, "entries": entries, "hits": hits} for namespace, entries, hits in rows]
+
+@app.delete("/api/ai/response-cache")
+def clear_ai_response_cache(namespace: Optional[str] = None, db: Session = Depends(get_db)):
+    """Drop stored AI responses, for one namespace or all of them"""
+    query = db.query(AIResponseCacheDB)
+    if namespace:
+        query = query.filter(AIResponseCacheDB.namespace == namespace)
+    deleted = query.delete(synchronize_session=False)
+    db.commit()
+    return {"detail": f"Removed {deleted} cached responses"}
+
+def validate_generation_request(request: AIGenerationRequest, db: Session):
+    """Check that a generation request can run; returns the active prompt and the model to use"""
     # Check if AI is available
     if not AI_AVAILABLE:
         raise HTTPException(
-            status_code=503, 
+            status_code=503,
             detail=f"AI features are not available: {OPENAI_API_KEY_STATUS.get('error', 'Unknown error')}"
         )
-    
-    # Get OpenAI API key from environment
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="OpenAI API key not configured")
-    
-    # Initialize OpenAI client
-    client = openai.OpenAI(api_key=api_key)
-    
+
     # Get active system prompt
-    system_prompt = db.query(SystemPromptDB).filter(
-        SystemPromptDB.name == "question_generation",
-        SystemPromptDB.is_active == "true"
-    ).first()
-    
+    system_prompt = get_active_system_prompt(db, "question_generation")
+
     if not system_prompt:
         raise HTTPException(status_code=404, detail="No active system prompt found for question generation")
-    
+
     # Validate class exists
     class_obj = db.query(ClassDB).filter(ClassDB.id == request.class_id).first()
     if not class_obj:
         raise HTTPException(status_code=400, detail="Invalid class_id")
-    
+
+    # Get configured model
+    return system_prompt, get_ai_setting(db, "default_model", "gpt-4o")
+
+def generation_cache_key(request: AIGenerationRequest, system_prompt: dict, ai_model: str, image_key: str = "") -> str:
+    """Generation cache key. class_id is not part of it since the model is
+    never told which class the questions are for. `image_key` is
+    image_cache_key() of the call's image, if it has one; the image itself
+    is not hashed, so a repeated image is found before it is downscaled."""
+    return response_cache_key(
+        system_prompt["id"],
+        system_prompt["version"],
+        ai_model,
+        request.dict(include={"num_questions", "min_options", "question_types", "difficulty_preference", "custom_instructions"}),
+        request.text_content,
+        image_key.encode("utf-8")
+    )
+
+def image_fingerprint(image) -> Tuple[str, int]:
+    """sha256 hex digest and size in bytes of an image as uploaded: a base64
+    string, raw bytes, or the Path of an uploaded file"""
+    digest = hashlib.sha256()
+    if isinstance(image, Path):
+        size = 0
+        with open(image, "rb") as image_file:
+            for block in iter(lambda: image_file.read(1024 * 1024), b""):
+                digest.update(block)
+                size += len(block)
+        return digest.hexdigest(), size
+    if isinstance(image, str):
+        try:
+            image = base64.b64decode(image)
+        except (binascii.Error, ValueError):
+            image = image.encode("utf-8")
+    digest.update(image)
+    return digest.hexdigest(), len(image)
+
+def image_cache_key(fingerprint: str, max_dimension: int, quality: int) -> str:
+    """What identifies an image in generation cache keys: the uploaded bytes
+    and the settings it is downscaled with"""
+    return response_cache_key(fingerprint, max_dimension, quality)
+
+def image_settings(db: Session) -> Tuple[int, int]:
+    """Largest dimension and JPEG quality images are downscaled to"""
+    return get_ai_setting(db, "image_max_dimension", 2048), get_ai_setting(db, "image_jpeg_quality", 85)
+
+def generation_messages(request: AIGenerationRequest, system_prompt: dict) -> list:
+    """Chat messages asking the model for questions from the request's text and/or image"""
     # Build the user prompt
     user_content = []
     
@@ -890,110 +2334,665 @@ Return a valid JSON array with the exact structure specified in the system promp
             }
         })
     
+    return [
+        {"role": "system", "content": system_prompt["prompt_text"]},
+        {"role": "user", "content": user_content}
+    ]
+
+async def save_cached_response(namespace: str, cache_key: str, response: dict, ttl_hours: float, max_entries: int) -> None:
+    """Store a response in the cache on a session of its own, so it can run
+    after the request's session is closed. Failures are only logged."""
+    cache_db = SessionLocal()
+    try:
+        await run_in_threadpool(store_cached_response, cache_db, namespace, cache_key, response, ttl_hours, max_entries)
+    except Exception as e:
+        print(f"⚠️ Could not store {namespace} response in cache: {e}")
+    finally:
+        cache_db.close()
+
+async def prepare_request_images(db: Session, images: list) -> List[dict]:
+    """Downscale and recompress images in the image process pool, all at once.
+
+    Each image is a base64 string, raw bytes (or a view of them), or the
+    Path of an uploaded file. Returns prepare_image()'s report for each, in order.
+    """
+    max_dimension, quality = image_settings(db)
+    loop = asyncio.get_running_loop()
+
+    def prepare(image):
+        if isinstance(image, Path):
+            return loop.run_in_executor(IMAGE_POOL, prepare_image_file, str(image), max_dimension, quality)
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            # Arguments to a process pool are pickled, which memoryviews are not
+            raw = image if IMAGE_POOL is None else bytes(image)
+            return loop.run_in_executor(IMAGE_POOL, prepare_image_bytes, raw, max_dimension, quality)
+        return loop.run_in_executor(IMAGE_POOL, prepare_image, image, max_dimension, quality)
+
+    results = await asyncio.gather(*(prepare(image) for image in images), return_exceptions=True)
+    for index, result in enumerate(results):
+        if isinstance(result, ValueError):
+            raise HTTPException(status_code=400, detail=f"Image {index + 1}: {result}")
+        if isinstance(result, BaseException):
+            raise result
+    return results
+
+def questions_from_response(ai_response: str, difficulty_preference: str) -> List[dict]:
+    """Processed questions from the model's reply"""
+    try:
+        return normalize_questions(ai_response, difficulty_preference)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# AI Question Generation endpoint
+@app.post("/api/ai/generate-questions")
+async def generate_questions_with_ai(request: AIGenerationRequest, http_request: Request, db: Session = Depends(get_db)):
+    """Generate questions from the text and image, plus `num_questions` more
+    from each image in `image_data_list`.
+
+    Images are downscaled first, except those of calls answered from the
+    cache. The text and `image_data` go to the model together as before;
+    every listed image is a model call of its own, and all calls run
+    concurrently. `images` reports each image's size before and after
+    processing and its timings; those not processed report only their
+    original size.
+    """
+    return await generate_questions(request, http_request, db)
+
+@app.post("/api/ai/generate-questions/upload")
+async def upload_and_generate_questions(http_request: Request, db: Session = Depends(get_db)):
+    """/api/ai/generate-questions for multipart/form-data uploads.
+
+    The `request` field holds the generation options as JSON, without
+    image data. Each `images` file part is treated like an entry of
+    image_data_list. Files are streamed to temporary spools and refused
+    with 413 once larger than max_upload_image_mb.
+    """
+    await load_ai_settings(db)
+    max_file_bytes = get_ai_setting(db, "max_upload_image_mb", 20) * 1024 * 1024
+    max_images = get_ai_setting(db, "max_images_per_request", 10)
+    try:
+        fields, files = await read_multipart(http_request, max_file_bytes, max_images)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid upload: {e}")
+
     try:
-        # Get configured model
-        model_config = db.query(AIConfigDB).filter(AIConfigDB.config_key == "default_model").first()
-        ai_model = model_config.config_value if model_config else "gpt-4o"
-        
-        # Call OpenAI API
-        response = client.chat.completions.create(
-            model=ai_model,  # Use configured model
-            messages=[
-                {"role": "system", "content": system_prompt.prompt_text},
-                {"role": "user", "content": user_content}
-            ]
-        )
-        
-        # Parse the response
-        ai_response = response.choices[0].message.content
-        
-        # Try to extract JSON from the response
         try:
-            # Look for JSON array in the response
-            import re
-            json_match = re.search(r'\[.*\]', ai_response, re.DOTALL)
-            if json_match:
-                questions_data = json.loads(json_match.group())
-            else:
-                questions_data = json.loads(ai_response)
-        except json.JSONDecodeError:
-            raise HTTPException(status_code=500, detail="AI response was not valid JSON")
-        
-        # Process and validate the generated questions
-        processed_questions = []
-        for q_data in questions_data:
-            # Handle fill_blank questions specially
-            if q_data.get("question_type") == "fill_blank":
-                # Process fill-in-the-blank questions
-                question_text = q_data.get("question", "")
-                
-                # Find blank positions (assuming _____ or [blank] format)
-                blank_positions = []
-                blank_markers = ["_____", "[blank]", "____", "___"]
-                for i, marker in enumerate(blank_markers):
-                    if marker in question_text:
-                        blank_positions = [pos for pos, char in enumerate(question_text) if question_text[pos:pos+len(marker)] == marker]
-                        break
-                
-                # Get acceptable answers (could be multiple variations)
-                correct_answer = q_data.get("correct_answer", "")
-                acceptable_answers = q_data.get("acceptable_answers", [correct_answer])
-                
-                if not acceptable_answers or not any(acceptable_answers):
-                    acceptable_answers = [correct_answer]
-                
-                processed_question = {
-                    "question": question_text,
-                    "question_type": "fill_blank",
-                    "options": acceptable_answers,  # Store all acceptable answers as options
-                    "correct_answer": correct_answer,
-                    "acceptable_answers": acceptable_answers,
-                    "difficulty": q_data.get("difficulty", request.difficulty_preference),
-                    "tags": ",".join(q_data.get("tags", [])),
-                    "explanation": q_data.get("explanation", ""),
-                    "blank_positions": blank_positions
-                }
-            else:
-                # Handle multiple choice questions
-                options = q_data.get("options", [])
-                correct_answer = q_data.get("correct_answer", "")
-                
-                # Validate that correct answer is in options
-                if correct_answer not in options:
-                    if options:
-                        correct_answer = options[0]  # Fallback to first option
-                    else:
-                        continue  # Skip invalid questions
-                
-                processed_question = {
-                    "question": q_data.get("question", ""),
-                    "question_type": q_data.get("question_type", "multiple_choice"),
-                    "options": options,
-                    "correct_answer": correct_answer,
-                    "difficulty": q_data.get("difficulty", request.difficulty_preference),
-                    "tags": q_data.get("tags", []),
-                    "explanation": q_data.get("explanation", "")
-                }
-            
-            processed_questions.append(processed_question)
-        
-        return {
+            request = AIGenerationRequest.parse_raw(fields.get("request") or "{}")
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors())
+        return await generate_questions(request, http_request, db, [spool.source() for spool in files])
+    finally:
+        for spool in files:
+            spool.close()
+
+async def generate_questions(request: AIGenerationRequest, http_request: Request, db: Session, uploads: list = ()):
+    """Shared by the JSON and multipart generation endpoints; `uploads` are
+    uploaded images as bytes or temporary file paths"""
+    system_prompt, ai_model = await run_in_threadpool(validate_generation_request, request, db)
+
+    sources = ([request.image_data] if request.image_data else []) + request.image_data_list + list(uploads)
+    max_images = get_ai_setting(db, "max_images_per_request", 10)
+    if len(sources) > max_images:
+        raise HTTPException(status_code=400, detail=f"At most {max_images} images can be sent in one request")
+    if not request.text_content and not sources:
+        raise HTTPException(status_code=400, detail="Provide text_content or at least one image")
+
+    # (request for one model call, index in `sources` of the image it carries or None)
+    calls = []
+    if request.text_content or request.image_data:
+        calls.append((request.copy(update={"image_data": "", "image_data_list": []}), 0 if request.image_data else None))
+    for source_index in range(1 if request.image_data else 0, len(sources)):
+        calls.append((request.copy(update={"text_content": "", "image_data": "", "image_data_list": []}), source_index))
+
+    # Identical calls reuse the stored result. Images are keyed as uploaded,
+    # so a cached call's image is never downscaled.
+    cache_enabled = get_ai_setting(db, "generation_cache_enabled", True)
+    cache_ttl_hours = get_ai_setting(db, "generation_cache_ttl_hours", 168)
+    cache_max_entries = get_ai_setting(db, "generation_cache_max_entries", 1000)
+    timeout = get_ai_timeout(db)
+    cache_keys = [None] * len(calls)
+    cached = [None] * len(calls)
+    fingerprints = [None] * len(sources)
+    if cache_enabled:
+        max_dimension, quality = image_settings(db)
+        fingerprints = await run_in_threadpool(lambda: [image_fingerprint(source) for source in sources])
+        cache_keys = [
+            generation_cache_key(
+                call, system_prompt, ai_model,
+                image_cache_key(fingerprints[source_index][0], max_dimension, quality) if source_index is not None else ""
+            )
+            for call, source_index in calls
+        ]
+        if not request.force_refresh:
+            for index, cache_key in enumerate(cache_keys):
+                try:
+                    cached[index] = await run_in_threadpool(get_cached_response, db, "generate_questions", cache_key, cache_ttl_hours)
+                except Exception as e:
+                    print(f"⚠️ Generation cache lookup failed: {e}")
+
+    missed = sorted({source_index for (_, source_index), hit in zip(calls, cached) if source_index is not None and hit is None})
+    images = dict(zip(missed, await prepare_request_images(db, [sources[source_index] for source_index in missed])))
+    calls = [
+        (call.copy(update={"image_data": images[source_index]["image_data"]}) if source_index in images else call, source_index)
+        for call, source_index in calls
+    ]
+
+    # Hand the connection back to the pool while the model calls are in flight
+    db.close()
+
+    async def generate(index: int):
+        """Result of one call and the milliseconds its model call took (None when cached)"""
+        if cached[index] is not None:
+            return cached[index], None
+        call = calls[index][0]
+        started = time.perf_counter()
+        try:
+            response = await run_chat_completion(
+                http_request,
+                timeout,
+                model=ai_model,  # Use configured model
+                messages=generation_messages(call, system_prompt)
+            )
+            processed_questions = questions_from_response(response.choices[0].message.content, call.difficulty_preference)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"AI generation failed: {str(e)}")
+        model_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        result = {
             "generated_questions": processed_questions,
             "total_generated": len(processed_questions),
             "ai_model_used": ai_model,
-            "prompt_version": system_prompt.version
+            "prompt_version": system_prompt["version"]
         }
-        
+        if cache_enabled and processed_questions:
+            await save_cached_response("generate_questions", cache_keys[index], result, cache_ttl_hours, cache_max_entries)
+        return result, model_ms
+
+    outcomes = await asyncio.gather(*(generate(index) for index in range(len(calls))), return_exceptions=True)
+    failures = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+    if len(failures) == len(outcomes):
+        raise failures[0]
+
+    generated_questions = []
+    image_reports = []
+    errors = []
+    for (call, source_index), outcome in zip(calls, outcomes):
+        if isinstance(outcome, BaseException):
+            detail = outcome.detail if isinstance(outcome, HTTPException) else str(outcome)
+            errors.append(detail)
+            result, model_ms = {"generated_questions": []}, None
+        else:
+            detail = None
+            result, model_ms = outcome
+            generated_questions.extend(result["generated_questions"])
+        if source_index is not None:
+            image = images.get(source_index) or {
+                "original_bytes": fingerprints[source_index][1], "processed_bytes": None,
+                "original_size": None, "processed_size": None, "process_ms": None
+            }
+            image_reports.append({
+                "original_bytes": image["original_bytes"],
+                "processed_bytes": image["processed_bytes"],
+                "saved_bytes": image["original_bytes"] - image["processed_bytes"] if image["processed_bytes"] is not None else None,
+                "original_size": image["original_size"],
+                "processed_size": image["processed_size"],
+                "process_ms": image["process_ms"],
+                "model_ms": model_ms,
+                "questions": len(result["generated_questions"]),
+                "error": detail
+            })
+
+    return {
+        "generated_questions": generated_questions,
+        "total_generated": len(generated_questions),
+        "ai_model_used": ai_model,
+        "prompt_version": system_prompt["version"],
+        "cached": all(entry is not None for entry in cached),
+        "images": image_reports,
+        "errors": errors
+    }
+
+@app.post("/api/ai/generate-questions/stream")
+async def stream_generated_questions(request: AIGenerationRequest, db: Session = Depends(get_db)):
+    """Generate questions as newline-delimited JSON.
+
+    The first line is {"type": "meta", ...}. Each question follows as
+    {"type": "question", "question": {...}} as soon as the model has
+    finished writing it. The stream ends with {"type": "done", ...}, or
+    {"type": "error", "detail": ...} if generation fails part way.
+    """
+    system_prompt, ai_model = await run_in_threadpool(validate_generation_request, request, db)
+    if request.image_data_list:
+        raise HTTPException(status_code=400, detail="image_data_list is not supported when streaming; use /api/ai/generate-questions")
+    if not request.text_content and not request.image_data:
+        raise HTTPException(status_code=400, detail="Provide text_content or at least one image")
+    meta = {"type": "meta", "ai_model_used": ai_model, "prompt_version": system_prompt["version"]}
+
+    cache_enabled = get_ai_setting(db, "generation_cache_enabled", True)
+    cache_ttl_hours = get_ai_setting(db, "generation_cache_ttl_hours", 168)
+    cache_max_entries = get_ai_setting(db, "generation_cache_max_entries", 1000)
+    image_key = ""
+    if request.image_data and cache_enabled:
+        max_dimension, quality = image_settings(db)
+        fingerprint, _ = await run_in_threadpool(image_fingerprint, request.image_data)
+        image_key = image_cache_key(fingerprint, max_dimension, quality)
+    cache_key = generation_cache_key(request, system_prompt, ai_model, image_key)
+    cached = None
+    if cache_enabled and not request.force_refresh:
+        try:
+            cached = await run_in_threadpool(get_cached_response, db, "generate_questions", cache_key, cache_ttl_hours)
+        except Exception as e:
+            print(f"⚠️ Generation cache lookup failed: {e}")
+    # Only downscale the image when the model will see it
+    if request.image_data and cached is None:
+        image = (await prepare_request_images(db, [request.image_data]))[0]
+        request = request.copy(update={"image_data": image["image_data"]})
+    timeout = get_ai_timeout(db)
+    db.close()
+
+    def line(event: dict) -> str:
+        return json.dumps(event) + "\n"
+
+    async def cached_events():
+        yield line({**meta, "cached": True})
+        for question in cached["generated_questions"]:
+            yield line({"type": "question", "question": question})
+        yield line({"type": "done", "total_generated": cached["total_generated"]})
+
+    async def generated_events():
+        yield line({**meta, "cached": False})
+        parser = JSONArrayStream("questions")
+        processed_questions = []
+        try:
+            messages = generation_messages(request, system_prompt)
+            async for text_delta in stream_chat_completion(timeout, model=ai_model, messages=messages):
+                for q_data in parser.feed(text_delta):
+                    processed_question = process_generated_question(q_data, request.difficulty_preference)
+                    if processed_question:
+                        processed_questions.append(processed_question)
+                        yield line({"type": "question", "question": processed_question})
+        except HTTPException as e:
+            yield line({"type": "error", "detail": e.detail})
+            return
+        except Exception as e:
+            yield line({"type": "error", "detail": f"AI generation failed: {str(e)}"})
+            return
+
+        if not parser.in_array:
+            yield line({"type": "error", "detail": "AI response was not valid JSON"})
+            return
+
+        if cache_enabled and processed_questions:
+            result = {
+                "generated_questions": processed_questions,
+                "total_generated": len(processed_questions),
+                "ai_model_used": ai_model,
+                "prompt_version": system_prompt["version"]
+            }
+            await save_cached_response("generate_questions", cache_key, result, cache_ttl_hours, cache_max_entries)
+        yield line({"type": "done", "total_generated": len(processed_questions)})
+
+    return StreamingResponse(cached_events() if cached is not None else generated_events(), media_type="application/x-ndjson")
+
+# Background generation jobs. A job splits a long document or a set of images
+# into chunks stored in generation_job_chunks; workers started with the app
+# claim chunks from the database, call the model and store each chunk's
+# questions as they finish, so progress survives restarts and is shared by
+# every instance on the database.
+JOB_WORKER_COUNT = int(os.getenv("AI_JOB_WORKERS", "4"))
+JOB_POLL_SECONDS = 2.0
+JOB_WORKERS = []
+JOB_WAKEUP = None  # asyncio.Event set when a job is created; made at startup on the running loop
+
+JOB_RATE_LIMITER = RateLimiter(60)
+
+def claim_job_chunk() -> Optional[dict]:
+    """Claim the next runnable chunk and return what the worker needs to run it; None if there is none"""
+    db = SessionLocal()
+    try:
+        timeout = get_ai_timeout(db)
+        chunk = claim_chunk(db, timeout)
+        if chunk is None:
+            return None
+        job = chunk.job
+        prompt = db.query(SystemPromptDB).filter(SystemPromptDB.id == job.prompt_id).first()
+        work = {
+            "chunk_id": chunk.id,
+            "claimed_at": chunk.claimed_at,
+            "job_id": job.id,
+            "class_id": job.class_id,
+            "position": chunk.position,
+            "source_type": chunk.source_type,
+            "content": chunk.content,
+            "image_key": chunk.image_key,
+            "attempts": chunk.attempts,
+            "params": json.loads(job.params),
+            "ai_model": job.ai_model,
+            "system_prompt": {"id": prompt.id, "prompt_text": prompt.prompt_text, "version": prompt.version} if prompt else None,
+            "timeout": timeout,
+            "max_attempts": get_ai_setting(db, "ai_job_max_attempts", 3),
+            "retry_delay_seconds": get_ai_setting(db, "ai_job_retry_delay_seconds", 10),
+            "cache_enabled": get_ai_setting(db, "generation_cache_enabled", True),
+            "cache_ttl_hours": get_ai_setting(db, "generation_cache_ttl_hours", 168),
+            "cache_max_entries": get_ai_setting(db, "generation_cache_max_entries", 1000)
+        }
+        JOB_RATE_LIMITER.per_minute = get_ai_setting(db, "ai_job_requests_per_minute", 60)
+        return work
+    finally:
+        db.close()
+
+def finish_job_chunk(work: dict, questions: Optional[List[dict]] = None, error: Optional[str] = None, retry_at: Optional[str] = None) -> None:
+    """Record the outcome of a claimed chunk: its questions, a retry at `retry_at`, or a final failure"""
+    db = SessionLocal()
+    try:
+        finish_chunk(db, work["job_id"], work["chunk_id"], work["claimed_at"], questions, error, retry_at)
+    finally:
+        db.close()
+
+def release_job_chunk(work: dict) -> None:
+    """Hand a claimed chunk back without counting the attempt, e.g. on shutdown"""
+    db = SessionLocal()
+    try:
+        release_chunk(db, work["chunk_id"], work["claimed_at"])
+    finally:
+        db.close()
+
+def cached_generation(cache_key: str, ttl_hours: float) -> Optional[dict]:
+    cache_db = SessionLocal()
+    try:
+        return get_cached_response(cache_db, "generate_questions", cache_key, ttl_hours)
+    finally:
+        cache_db.close()
+
+async def run_job_chunk(work: dict) -> None:
+    """Generate the questions of one claimed chunk and record the outcome"""
+    from datetime import datetime, timedelta
+
+    try:
+        if work["system_prompt"] is None:
+            raise ValueError("The job's system prompt no longer exists")
+        is_image = work["source_type"] == "image"
+        request = AIGenerationRequest(
+            class_id=work["class_id"],
+            text_content="" if is_image else work["content"],
+            image_data=work["content"] if is_image else "",
+            **work["params"]
+        )
+
+        # Chunks share the generation cache with the interactive endpoints.
+        # Chunks queued before image keys were stored are keyed on the stored image.
+        image_key = work["image_key"] or ""
+        if not image_key and is_image:
+            image_key = (await run_in_threadpool(image_fingerprint, work["content"]))[0]
+        cache_key = generation_cache_key(request, work["system_prompt"], work["ai_model"], image_key)
+        cached = None
+        if work["cache_enabled"]:
+            try:
+                cached = await run_in_threadpool(cached_generation, cache_key, work["cache_ttl_hours"])
+            except Exception as e:
+                print(f"⚠️ Generation cache lookup failed: {e}")
+
+        if cached is not None:
+            questions = cached["generated_questions"]
+        else:
+            response = await run_chat_completion(
+                None,
+                work["timeout"],
+                model=work["ai_model"],
+                messages=generation_messages(request, work["system_prompt"])
+            )
+            questions = normalize_questions(response.choices[0].message.content or "", request.difficulty_preference)
+            if work["cache_enabled"] and questions:
+                result = {
+                    "generated_questions": questions,
+                    "total_generated": len(questions),
+                    "ai_model_used": work["ai_model"],
+                    "prompt_version": work["system_prompt"]["version"]
+                }
+                await save_cached_response("generate_questions", cache_key, result, work["cache_ttl_hours"], work["cache_max_entries"])
+    except asyncio.CancelledError:
+        # Shielded so that the chunk is released even if the worker is cancelled again meanwhile
+        await asyncio.shield(run_in_threadpool(release_job_chunk, work))
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"AI generation failed: {str(e)}")
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        retry_at = None
+        if work["attempts"] < work["max_attempts"]:
+            delay = work["retry_delay_seconds"] * 2 ** (work["attempts"] - 1)
+            retry_at = (datetime.now() + timedelta(seconds=delay)).isoformat()
+        print(f"⚠️ Generation job {work['job_id']} chunk {work['position']} failed "
+              f"(attempt {work['attempts']} of {work['max_attempts']}): {detail}")
+        await run_in_threadpool(finish_job_chunk, work, None, detail, retry_at)
+        return
+
+    await run_in_threadpool(finish_job_chunk, work, questions)
+
+async def job_worker() -> None:
+    while True:
+        # Take a rate limit slot before claiming, so a claimed chunk never
+        # waits long enough to look abandoned
+        await JOB_RATE_LIMITER.wait()
+        try:
+            work = await run_in_threadpool(claim_job_chunk)
+        except Exception as e:
+            print(f"⚠️ Could not claim a generation job chunk: {e}")
+            work = None
+        if work is None:
+            try:
+                await asyncio.wait_for(JOB_WAKEUP.wait(), JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            JOB_WAKEUP.clear()
+            continue
+        try:
+            await run_job_chunk(work)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Generation job worker error: {e}")
+
+@app.on_event("startup")
+async def start_job_workers():
+    global JOB_WAKEUP
+    JOB_WAKEUP = asyncio.Event()
+    if not AI_AVAILABLE or JOB_WORKER_COUNT <= 0:
+        return
+    JOB_WORKERS.extend(asyncio.ensure_future(job_worker()) for _ in range(JOB_WORKER_COUNT))
+    print(f"✅ Started {JOB_WORKER_COUNT} generation job workers")
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    for worker in JOB_WORKERS:
+        worker.cancel()
+    await asyncio.gather(*JOB_WORKERS, return_exceptions=True)
+    JOB_WORKERS.clear()
+
+def insert_generation_job(db: Session, request: GenerationJobRequest, params: dict, system_prompt: dict, ai_model: str, sources: List[tuple]) -> dict:
+    from datetime import datetime
+
+    now = datetime.now().isoformat()
+    job = GenerationJobDB(
+        class_id=request.class_id,
+        status="queued",
+        params=json.dumps(params),
+        prompt_id=system_prompt["id"],
+        ai_model=ai_model,
+        total_chunks=len(sources),
+        created_at=now,
+        updated_at=now
+    )
+    db.add(job)
+    db.flush()
+    bulk_insert(db, GenerationJobChunkDB.__table__, [
+        {"job_id": job.id, "position": position, "source_type": source_type, "content": content, "image_key": image_key,
+         "status": "pending", "attempts": 0, "available_at": now, "question_count": 0}
+        for position, (source_type, content, image_key) in enumerate(sources)
+    ])
+    db.commit()
+    return job_summary(job)
+
+@app.post("/api/ai/jobs")
+async def create_generation_job(request: GenerationJobRequest, db: Session = Depends(get_db)):
+    """Queue a generation job over a long document and/or many images.
+
+    The text is split into chunks of at most ai_job_chunk_chars characters
+    and every image is a chunk of its own. Each chunk asks the model for
+    `questions_per_chunk` questions. Poll GET /api/ai/jobs/{job_id} for
+    progress and GET /api/ai/jobs/{job_id}/results for the questions.
+    """
+    system_prompt, ai_model = await run_in_threadpool(validate_generation_request, request, db)
+
+    questions_per_chunk = request.questions_per_chunk or get_ai_setting(db, "ai_job_questions_per_chunk", 5)
+    max_per_request = get_ai_setting(db, "max_questions_per_request", 20)
+    if not 1 <= questions_per_chunk <= max_per_request:
+        raise HTTPException(status_code=400, detail=f"questions_per_chunk must be between 1 and {max_per_request}")
+
+    chunk_chars = max(get_ai_setting(db, "ai_job_chunk_chars", 6000), 1)
+    sources = [("text", chunk, None) for chunk in split_text_into_chunks(request.text_content, chunk_chars)]
+    image_sources = [image_data for image_data in request.image_data_list if image_data]
+    if not sources and not image_sources:
+        raise HTTPException(status_code=400, detail="Provide text_content or at least one image")
+    max_chunks = get_ai_setting(db, "ai_job_max_chunks", 200)
+    if len(sources) + len(image_sources) > max_chunks:
+        raise HTTPException(
+            status_code=400,
+            detail=f"The source splits into {len(sources) + len(image_sources)} chunks; at most {max_chunks} are allowed per job"
+        )
+    # Store the downscaled images, so every attempt sends the smaller version,
+    # with the key of the image as uploaded, which the cache is looked up by
+    max_dimension, quality = image_settings(db)
+    fingerprints = await run_in_threadpool(lambda: [image_fingerprint(image_data) for image_data in image_sources])
+    images = await prepare_request_images(db, image_sources)
+    sources.extend(
+        ("image", image["image_data"], image_cache_key(fingerprint, max_dimension, quality))
+        for image, (fingerprint, _) in zip(images, fingerprints)
+    )
+
+    params = {
+        "num_questions": questions_per_chunk,
+        "min_options": request.min_options,
+        "question_types": request.question_types,
+        "difficulty_preference": request.difficulty_preference,
+        "custom_instructions": request.custom_instructions
+    }
+    summary = await run_in_threadpool(insert_generation_job, db, request, params, system_prompt, ai_model, sources)
+    if JOB_WAKEUP is not None:
+        JOB_WAKEUP.set()
+    return {**summary, "questions_per_chunk": questions_per_chunk, "expected_questions": questions_per_chunk * len(sources)}
+
+@app.get("/api/ai/jobs")
+def list_generation_jobs(class_id: Optional[int] = None, limit: int = Query(50, ge=1, le=500), db: Session = Depends(get_db)):
+    query = db.query(GenerationJobDB)
+    if class_id is not None:
+        query = query.filter(GenerationJobDB.class_id == class_id)
+    return [job_summary(job) for job in query.order_by(GenerationJobDB.id.desc()).limit(limit)]
+
+@app.get("/api/ai/jobs/{job_id}")
+def get_generation_job(job_id: int, db: Session = Depends(get_db)):
+    """Progress of a job: chunk counts by status and the errors of failing chunks"""
+    job = db.query(GenerationJobDB).filter(GenerationJobDB.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    chunk_counts = dict(
+        db.query(GenerationJobChunkDB.status, func.count(GenerationJobChunkDB.id))
+        .filter(GenerationJobChunkDB.job_id == job_id)
+        .group_by(GenerationJobChunkDB.status)
+        .all()
+    )
+    errors = (
+        db.query(GenerationJobChunkDB.position, GenerationJobChunkDB.status, GenerationJobChunkDB.attempts, GenerationJobChunkDB.error)
+        .filter(GenerationJobChunkDB.job_id == job_id, GenerationJobChunkDB.error.isnot(None))
+        .order_by(GenerationJobChunkDB.position)
+        .all()
+    )
+    return {
+        **job_summary(job),
+        "chunks": {status: chunk_counts.get(status, 0) for status in ["pending", "running", "done", "failed", "cancelled"]},
+        "errors": [
+            {"chunk": position, "status": status, "attempts": attempts, "error": error}
+            for position, status, attempts, error in errors
+        ]
+    }
+
+@app.get("/api/ai/jobs/{job_id}/results")
+def get_generation_job_results(job_id: int, db: Session = Depends(get_db)):
+    """Questions of every finished chunk so far, in source order"""
+    job = db.query(GenerationJobDB).filter(GenerationJobDB.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    questions = []
+    for position, result in (
+        db.query(GenerationJobChunkDB.position, GenerationJobChunkDB.result)
+        .filter(GenerationJobChunkDB.job_id == job_id, GenerationJobChunkDB.status == "done")
+        .order_by(GenerationJobChunkDB.position)
+    ):
+        questions.extend({**question, "chunk": position} for question in json.loads(result))
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "complete": job.status in ["completed", "failed", "cancelled"],
+        "generated_questions": questions,
+        "total_generated": len(questions),
+        "ai_model_used": job.ai_model
+    }
+
+@app.post("/api/ai/jobs/{job_id}/cancel")
+def cancel_generation_job(job_id: int, db: Session = Depends(get_db)):
+    """Stop a job. Chunks already running finish and keep their questions."""
+    job = db.query(GenerationJobDB).filter(GenerationJobDB.id == job_id).with_for_update().first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status in ["completed", "failed"]:
+        raise HTTPException(status_code=400, detail=f"Job is already {job.status}")
+
+    job.status = "cancelled"
+    db.query(GenerationJobChunkDB).filter(
+        GenerationJobChunkDB.job_id == job_id,
+        GenerationJobChunkDB.status == "pending"
+    ).update({"status": "cancelled"}, synchronize_session=False)
+    refresh_job_progress(db, job)
+    db.commit()
+    return job_summary(job)
+
+def question_bank_row(q_data: dict, class_id: int, created_at: str):
+    """QuestionBankDB insert values for a generated or imported question, and its tags"""
+    # Handle different question types
+    if q_data.get("question_type") == "fill_blank":
+        options_str = json.dumps(q_data.get("acceptable_answers", [q_data.get("correct_answer", "")]))
+    else:
+        options_str = json.dumps(q_data.get("options", []))
+    
+    # Generated fill_blank questions carry tags as a comma-separated string
+    tags = q_data.get("tags", [])
+    if isinstance(tags, str):
+        tags = [t.strip() for t in tags.split(",") if t.strip()]
+    
+    row = {
+        "question": q_data.get("question", ""),
+        "question_type": q_data.get("question_type", "multiple_choice"),
+        "options": options_str,
+        "correct_answer": q_data.get("correct_answer", ""),
+        "class_id": class_id,
+        "difficulty": q_data.get("difficulty", "medium"),
+        "tags": json.dumps(tags),
+        "created_at": created_at
+    }
+    return row, tags
 
 # Bulk add AI generated questions to question bank
 @app.post("/api/ai/add-to-bank")
-async def add_ai_questions_to_bank(request_data: dict, db: Session = Depends(get_db)):
+def add_ai_questions_to_bank(request_data: dict, db: Session = Depends(get_db)):
     from datetime import datetime
     
     questions = request_data.get("questions", [])
     class_id = request_data.get("class_id")
+    skip_duplicates = bool(request_data.get("skip_duplicates", False))
     
     if not class_id:
         raise HTTPException(status_code=400, detail="class_id is required")
@@ -1004,43 +3003,50 @@ async def add_ai_questions_to_bank(request_data: dict, db: Session = Depends(get
         raise HTTPException(status_code=400, detail="Invalid class_id")
     
     added_questions = []
+    added_tags = []
+    rows = []
+    positions = []
+    created_at = datetime.now().isoformat()
     
-    for q_data in questions:
+    for position, q_data in enumerate(questions):
         try:
-            # Handle different question types
-            if q_data.get("question_type") == "fill_blank":
-                options_str = json.dumps(q_data.get("acceptable_answers", [q_data.get("correct_answer", "")]))
-            else:
-                options_str = json.dumps(q_data.get("options", []))
-            
-            db_question = QuestionBankDB(
-                question=q_data.get("question", ""),
-                question_type=q_data.get("question_type", "multiple_choice"),
-                options=options_str,
-                correct_answer=q_data.get("correct_answer", ""),
-                class_id=class_id,
-                difficulty=q_data.get("difficulty", "medium"),
-                tags=json.dumps(q_data.get("tags", [])),
-                created_at=datetime.now().isoformat()
-            )
-            
-            db.add(db_question)
+            row, tags = question_bank_row(q_data, class_id, created_at)
+            rows.append(row)
+            positions.append(position)
             added_questions.append(q_data.get("question", "Untitled Question"))
+            added_tags.append(tags)
             
         except Exception as e:
             print(f"Error adding question: {e}")
             continue
     
+    check = check_duplicates(db, class_id, [question_text(row["question"], row["options"]) for row in rows])
+    kept = [i for i, match in enumerate(check.matches) if not (skip_duplicates and match)]
+    question_ids = bulk_insert(db, QuestionBankDB.__table__, [rows[i] for i in kept])
+    set_question_tags(db, dict(zip(question_ids, [added_tags[i] for i in kept])))
+    index_bank_questions(db, class_id, question_ids, check.signatures[kept])
     db.commit()
     
+    # A copy of an earlier question of the request points at that question, which is always added
+    new_ids = dict(zip(kept, question_ids))
+    duplicates = [{
+        "index": positions[i],
+        "question": added_questions[i],
+        "duplicate_of": match.question_id if match.index is None else new_ids[match.index],
+        "similarity": round(match.similarity, 3),
+        "skipped": skip_duplicates
+    } for i, match in enumerate(check.matches) if match]
+    
     return {
-        "questions_added": len(added_questions),
-        "added_questions": added_questions
+        "questions_added": len(kept),
+        "added_questions": [added_questions[i] for i in kept],
+        "question_ids": question_ids,
+        "duplicates": duplicates
     }
 
 # AI Answer Explanation endpoint
 @app.post("/api/ai/explain-answer")
-async def explain_answer(request_data: dict, db: Session = Depends(get_db)):
+async def explain_answer(request_data: dict, http_request: Request, db: Session = Depends(get_db)):
     """Generate AI explanation for a quiz question answer"""
     
     # Check if AI is available
@@ -1050,11 +3056,6 @@ async def explain_answer(request_data: dict, db: Session = Depends(get_db)):
             detail=f"AI features are not available: {OPENAI_API_KEY_STATUS.get('error', 'Unknown error')}"
         )
     
-    # Get OpenAI API key from environment
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=503, detail="OpenAI API key not configured")
-    
     # Extract request data
     question_text = request_data.get("question", "")
     question_type = request_data.get("question_type", "multiple_choice")
@@ -1066,9 +3067,6 @@ async def explain_answer(request_data: dict, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Question and correct answer are required")
     
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=api_key)
-        
         # Create explanation prompt
         if question_type == "fill_blank":
             explanation_prompt = f"""You are an educational assistant. Provide a clear, concise explanation for this fill-in-the-blank question. Keep your response to 2-3 sentences maximum.
@@ -1104,27 +3102,56 @@ Please explain:
 Be concise - respond with 2-4 sentences only."""
 
         # Get configured model
-        model_config = db.query(AIConfigDB).filter(AIConfigDB.config_key == "default_model").first()
-        ai_model = model_config.config_value if model_config else "gpt-4o"
+        await load_ai_settings(db)
+        ai_model = get_ai_setting(db, "default_model", "gpt-4o")
         
-        # Call OpenAI API
-        response = client.chat.completions.create(
-            model=ai_model,
-            messages=[
-                {"role": "user", "content": explanation_prompt}
-            ]
-        )
+        # Students who give the same answer get the same explanation
+        normalized_answer = " ".join(str(user_answer).split()).lower()
+        cache_key = response_cache_key(question_type, question_text, correct_answer, all_options, normalized_answer, ai_model)
+        cache_enabled = get_ai_setting(db, "explanation_cache_enabled", True)
+        cache_ttl_hours = get_ai_setting(db, "explanation_cache_ttl_hours", 720)
+        cache_max_entries = get_ai_setting(db, "explanation_cache_max_entries", 5000)
+        timeout = get_ai_timeout(db)
+        
+        cached = None
+        if cache_enabled:
+            try:
+                cached = await run_in_threadpool(get_cached_response, db, "explain_answer", cache_key, cache_ttl_hours)
+            except Exception as e:
+                print(f"⚠️ Explanation cache lookup failed: {e}")
+        # Hand the connection back to the pool while waiting on the model
+        db.close()
         
-        explanation = response.choices[0].message.content.strip()
+        async def fetch_explanation():
+            # Shared by every request waiting on this key, so it does not
+            # watch any one client's connection; single_flight cancels it
+            # once all of them have disconnected
+            response = await run_chat_completion(
+                None,
+                timeout,
+                model=ai_model,
+                messages=[
+                    {"role": "user", "content": explanation_prompt}
+                ]
+            )
+            result = {"explanation": response.choices[0].message.content.strip()}
+            if cache_enabled:
+                await save_cached_response("explain_answer", cache_key, result, cache_ttl_hours, cache_max_entries)
+            return result
+        
+        result = cached if cached is not None else await single_flight(f"explain_answer:{cache_key}", fetch_explanation, http_request)
         
         return {
-            "explanation": explanation,
+            "explanation": result["explanation"],
             "question": question_text,
             "correct_answer": correct_answer,
             "user_answer": user_answer,
-            "ai_model_used": ai_model
+            "ai_model_used": ai_model,
+            "cached": cached is not None
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error generating explanation: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to generate explanation: {str(e)}")
@@ -1184,81 +3211,186 @@ async def get_question_template():
     
     return template
 
+# Quiz, class and question bank exports
+EXPORT_BATCH_SIZE = 500
+
+def export_question(question) -> dict:
+    """A quiz or question bank question as an object of the import schema"""
+    # Parse options (stored as JSON-encoded list)
+    try:
+        raw_options = json.loads(question.options)
+    except Exception:
+        raw_options = []
+    options = [opt.strip() for opt in raw_options if isinstance(opt, str) and opt.strip()]
+    
+    # Quiz questions have no difficulty or tags of their own
+    tags = getattr(question, "tags", None)
+    question_obj = {
+        "question": question.question,
+        "question_type": question.question_type,
+        "options": options,
+        "correct_answer": question.correct_answer,
+        "difficulty": getattr(question, "difficulty", None) or "medium",
+        "tags": json.loads(tags) if tags else [],
+        "explanation": ""  # Default empty explanation
+    }
+    
+    # For fill_blank questions, add acceptable_answers and normalize case
+    if question.question_type == "fill_blank":
+        # Normalize options to lowercase for consistency
+        normalized_options = [opt.lower().strip() for opt in options if opt and opt.strip()]
+        normalized_correct = question.correct_answer.lower().strip() if question.correct_answer else ""
+        
+        # Update the question object with normalized values
+        question_obj["options"] = normalized_options
+        question_obj["correct_answer"] = normalized_correct
+        question_obj["acceptable_answers"] = normalized_options
+        
+        # Calculate blank positions
+        positions = blank_positions(question.question)
+        if positions:
+            question_obj["blank_positions"] = positions
+    
+    return question_obj
+
+def export_response(export_info: dict, records, export_format: str, compress: bool, filename: str) -> StreamingResponse:
+    """Stream an export as it is read from the database.
+
+    `records(db)` yields the question objects; it is called with a session
+    of the response's own and should read with yield_per, so memory stays
+    constant however large the export. "json" is the import schema,
+    {"export_info": ..., "questions": [...]}; "ndjson" is an export_info
+    line followed by one question per line. With `compress` the stream is
+    gzipped on the fly.
+    """
+    def text_chunks():
+        db = SessionLocal()
+        try:
+            if export_format == "ndjson":
+                yield json.dumps({"export_info": export_info}) + "\n"
+            else:
+                yield '{"export_info": ' + json.dumps(export_info) + ', "questions": [\n'
+            separator = ""
+            pieces = []
+            for record in records(db):
+                pieces.append(json.dumps(record))
+                if len(pieces) >= EXPORT_BATCH_SIZE:
+                    yield batch_text(pieces, separator)
+                    separator = ",\n"
+                    pieces = []
+            if pieces:
+                yield batch_text(pieces, separator)
+            if export_format != "ndjson":
+                yield "\n]}\n"
+        finally:
+            db.close()
+    
+    def batch_text(pieces: List[str], separator: str) -> str:
+        if export_format == "ndjson":
+            return "\n".join(pieces) + "\n"
+        return separator + ",\n".join(pieces)
+    
+    def body():
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits 31: gzip container
+        for chunk in text_chunks():
+            data = chunk.encode("utf-8")
+            if compressor is None:
+                yield data
+            else:
+                data = compressor.compress(data)
+                if data:
+                    yield data
+        if compressor is not None:
+            yield compressor.flush()
+    
+    extension = "ndjson" if export_format == "ndjson" else "json"
+    media_type = "application/x-ndjson" if export_format == "ndjson" else "application/json"
+    if compress:
+        extension += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{re.sub(r"[^a-zA-Z0-9]", "_", filename)}_export.{extension}"'}
+    )
+
+def question_type_summary(query) -> List[str]:
+    return [question_type for (question_type,) in query.distinct().all()]
+
 # Quiz Export endpoint
 @app.get("/api/quizzes/{quiz_id}/export")
-async def export_quiz_as_json(quiz_id: int, db: Session = Depends(get_db)):
-    """Export a quiz as JSON that matches the import schema"""
+def export_quiz_as_json(
+    quiz_id: int,
+    export_format: str = Query("json", alias="format", regex="^(json|ndjson)$"),
+    gzip: bool = False,
+    db: Session = Depends(get_db)
+):
+    """Export a quiz as JSON that matches the import schema, streamed"""
     from datetime import datetime
     
-    # Get the quiz with all its questions
-    quiz = db.query(QuizDB).filter(QuizDB.id == quiz_id).first()
+    quiz = db.query(QuizDB).options(joinedload(QuizDB.class_ref)).filter(QuizDB.id == quiz_id).first()
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
     
-    # Convert quiz questions to the JSON schema format
-    exported_questions = []
+    export_info = {
+        "quiz_id": quiz.id,
+        "quiz_title": quiz.title,
+        "class_name": quiz.class_ref.name,
+        "class_id": quiz.class_id,
+        "exported_at": datetime.now().isoformat(),
+        "total_questions": db.query(QuestionDB).filter(QuestionDB.quiz_id == quiz_id).count(),
+        "question_types": question_type_summary(db.query(QuestionDB.question_type).filter(QuestionDB.quiz_id == quiz_id))
+    }
     
-    for question in quiz.questions:
-        # Parse options (stored as JSON-encoded list)
-        try:
-            raw_options = json.loads(question.options)
-        except Exception:
-            raw_options = []
-        options = [opt.strip() for opt in raw_options if isinstance(opt, str) and opt.strip()]
-        
-        # Build the question object
-        question_obj = {
-            "question": question.question,
-            "question_type": question.question_type,
-            "options": options,
-            "correct_answer": question.correct_answer,
-            "difficulty": "medium",  # Default difficulty
-            "tags": [],  # Default empty tags
-            "explanation": ""  # Default empty explanation
-        }
-        
-        # For fill_blank questions, add acceptable_answers and normalize case
-        if question.question_type == "fill_blank":
-            # Normalize options to lowercase for consistency
-            normalized_options = [opt.lower().strip() for opt in options if opt and opt.strip()]
-            normalized_correct = question.correct_answer.lower().strip() if question.correct_answer else ""
-            
-            # Update the question object with normalized values
-            question_obj["options"] = normalized_options
-            question_obj["correct_answer"] = normalized_correct
-            question_obj["acceptable_answers"] = normalized_options
-            
-            # Calculate blank positions
-            blank_positions = []
-            question_text = question.question
-            start = 0
-            while True:
-                pos = question_text.find("{blank}", start)
-                if pos == -1:
-                    break
-                blank_positions.append(pos)
-                start = pos + 1
-            
-            if blank_positions:
-                question_obj["blank_positions"] = blank_positions
-        
-        exported_questions.append(question_obj)
-    
-    # Build the complete export structure
-    export_data = {
-        "export_info": {
-            "quiz_id": quiz.id,
-            "quiz_title": quiz.title,
-            "class_name": quiz.class_ref.name,
-            "class_id": quiz.class_id,
-            "exported_at": datetime.now().isoformat(),
-            "total_questions": len(exported_questions),
-            "question_types": list(set(q["question_type"] for q in exported_questions))
-        },
-        "questions": exported_questions
+    def records(export_db: Session):
+        questions = (
+            export_db.query(QuestionDB)
+            .filter(QuestionDB.quiz_id == quiz_id)
+            .order_by(QuestionDB.position, QuestionDB.id)
+            .yield_per(EXPORT_BATCH_SIZE)
+        )
+        for question in questions:
+            yield export_question(question)
+    
+    return export_response(export_info, records, export_format, gzip, quiz.title)
+
+@app.get("/api/classes/{class_id}/export")
+def export_class_quizzes(
+    class_id: int,
+    export_format: str = Query("json", alias="format", regex="^(json|ndjson)$"),
+    gzip: bool = False,
+    db: Session = Depends(get_db)
+):
+    """Export the questions of every quiz in a class, each with its quiz_id
+    and quiz_title, in the same formats as a quiz export"""
+    from datetime import datetime
+    
+    class_obj = db.query(ClassDB).filter(ClassDB.id == class_id).first()
+    if not class_obj:
+        raise HTTPException(status_code=404, detail="Class not found")
+    
+    class_questions = db.query(QuestionDB).join(QuizDB, QuestionDB.quiz_id == QuizDB.id).filter(QuizDB.class_id == class_id)
+    export_info = {
+        "class_id": class_obj.id,
+        "class_name": class_obj.name,
+        "exported_at": datetime.now().isoformat(),
+        "total_quizzes": db.query(QuizDB).filter(QuizDB.class_id == class_id).count(),
+        "total_questions": class_questions.count(),
+        "question_types": question_type_summary(class_questions.with_entities(QuestionDB.question_type))
     }
     
-    return export_data
+    def records(export_db: Session):
+        rows = (
+            export_db.query(QuestionDB, QuizDB.title)
+            .join(QuizDB, QuestionDB.quiz_id == QuizDB.id)
+            .filter(QuizDB.class_id == class_id)
+            .order_by(QuizDB.id, QuestionDB.position, QuestionDB.id)
+            .yield_per(EXPORT_BATCH_SIZE)
+        )
+        for question, quiz_title in rows:
+            yield {**export_question(question), "quiz_id": question.quiz_id, "quiz_title": quiz_title}
+    
+    return export_response(export_info, records, export_format, gzip, class_obj.name)
 
 # JSON Import validation endpoint
 @app.post("/api/validate-json-questions")
@@ -1274,98 +3406,11 @@ async def validate_json_questions(request_data: dict):
         errors = []
         
         for i, q_data in enumerate(questions_data):
-            question_errors = []
-            
-            # Required fields validation
-            required_fields = ["question", "question_type", "options", "correct_answer"]
-            for field in required_fields:
-                if field not in q_data or not q_data[field]:
-                    question_errors.append(f"Missing required field: {field}")
-            
-            # Question type validation
-            if q_data.get("question_type") not in ["multiple_choice", "fill_blank"]:
-                question_errors.append("Invalid question_type. Must be 'multiple_choice' or 'fill_blank'")
-            
-            # Options validation
-            options = q_data.get("options", [])
-            if not isinstance(options, list) or len(options) == 0:
-                question_errors.append("Options must be a non-empty array")
-            
-            # Correct answer validation
-            correct_answer = q_data.get("correct_answer", "")
-            if q_data.get("question_type") == "multiple_choice":
-                if correct_answer not in options:
-                    question_errors.append("Correct answer must be one of the provided options")
-            
-            # Fill-in-blank specific validation
-            if q_data.get("question_type") == "fill_blank":
-                question_text = q_data.get("question", "")
-                
-                # Check for {blank} tokens
-                blank_count = question_text.count("{blank}")
-                if blank_count == 0:
-                    question_errors.append("Fill-in-blank questions must contain at least one {blank} token")
-                
-                # Normalize case for fill-in-blank answers
-                acceptable_answers = q_data.get("acceptable_answers", [correct_answer])
-                if acceptable_answers:
-                    # Convert all to lowercase for comparison
-                    acceptable_answers_lower = [ans.lower().strip() for ans in acceptable_answers if ans and ans.strip()]
-                    correct_answer_lower = correct_answer.lower().strip() if correct_answer else ""
-                    
-                    if not acceptable_answers_lower or correct_answer_lower not in acceptable_answers_lower:
-                        question_errors.append("Correct answer must be in acceptable_answers for fill_blank questions")
-                else:
-                    question_errors.append("Fill-in-blank questions must have acceptable_answers")
-                
-                # Validate blank positions for multiple blanks
-                if blank_count > 1:
-                    blank_positions = q_data.get("blank_positions", [])
-                    if len(blank_positions) != blank_count:
-                        question_errors.append(f"Question has {blank_count} blanks but blank_positions array has {len(blank_positions)} items")
-            
-            # Process blank positions for fill_blank questions
-            blank_positions = []
-            if q_data.get("question_type") == "fill_blank":
-                question_text = q_data.get("question", "")
-                # Find all positions of {blank} tokens
-                start = 0
-                while True:
-                    pos = question_text.find("{blank}", start)
-                    if pos == -1:
-                        break
-                    blank_positions.append(pos)
-                    start = pos + 1
-            
-            # Normalize acceptable answers for fill-in-blank
-            acceptable_answers = q_data.get("acceptable_answers", [correct_answer] if q_data.get("question_type") == "fill_blank" else [])
-            if q_data.get("question_type") == "fill_blank" and acceptable_answers:
-                # Normalize to lowercase and remove empty strings
-                acceptable_answers = [ans.lower().strip() for ans in acceptable_answers if ans and ans.strip()]
-                # Also normalize the correct answer
-                correct_answer = correct_answer.lower().strip() if correct_answer else ""
-                # Update options to match acceptable answers for fill_blank
-                options = acceptable_answers
-            
-            # Build validated question
-            validated_question = {
-                "question": q_data.get("question", ""),
-                "question_type": q_data.get("question_type", "multiple_choice"),
-                "options": options,
-                "correct_answer": correct_answer,
-                "acceptable_answers": acceptable_answers,
-                "difficulty": q_data.get("difficulty", "medium"),
-                "tags": q_data.get("tags", []),
-                "explanation": q_data.get("explanation", ""),
-                "blank_positions": blank_positions,
-                "validation_errors": question_errors,
-                "is_valid": len(question_errors) == 0
-            }
-            
+            validated_question = validate_question(q_data)
             validated_questions.append(validated_question)
             
-            if question_errors:
-                errors.append(f"Question {i+1}: {'; '.join(question_errors)}")
+            if validated_question["validation_errors"]:
+                errors.append(f"Question {i+1}: {'; '.join(validated_question['validation_errors'])}")
         
         return {
             "is_valid": len(errors) == 0,
@@ -1378,21 +3423,194 @@ async def validate_json_questions(request_data: dict):
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"JSON validation failed: {str(e)}")
 
+IMPORT_BATCH_SIZE = 500
+GZIP_MAGIC = b"\x1f\x8b"
+DECOMPRESS_CHUNK_SIZE = 1024 * 1024
+
+async def request_text(http_request: Request):
+    """The request body as UTF-8 text, piece by piece as it arrives.
+
+    A gzip compressed body is decompressed on the fly, at most
+    DECOMPRESS_CHUNK_SIZE bytes at a time. Raises ValueError for broken or
+    truncated gzip data and UnicodeDecodeError for invalid UTF-8.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    decompressor = None
+    first = True
+    async for chunk in http_request.stream():
+        if not chunk:
+            continue
+        if first:
+            first = False
+            if chunk[:2] == GZIP_MAGIC:
+                decompressor = zlib.decompressobj(31)
+        if decompressor is None:
+            yield decoder.decode(chunk)
+            continue
+        try:
+            data = decompressor.decompress(chunk, DECOMPRESS_CHUNK_SIZE)
+            yield decoder.decode(data)
+            while decompressor.unconsumed_tail:
+                data = decompressor.decompress(decompressor.unconsumed_tail, DECOMPRESS_CHUNK_SIZE)
+                yield decoder.decode(data)
+        except zlib.error as e:
+            raise ValueError(f"Invalid gzip data: {e}")
+    if decompressor is not None and not decompressor.eof:
+        raise ValueError("gzip data ended before the end of the file")
+    yield decoder.decode(b"", final=True)
+
+@app.post("/api/validate-json-questions/batch")
+async def validate_json_questions_batch(
+    http_request: Request,
+    class_id: Optional[int] = None,
+    add_to_bank: bool = False,
+    skip_duplicates: bool = False,
+    max_errors: int = Query(100, ge=0, le=1000),
+    import_format: str = Query("json", alias="format", regex="^(json|ndjson)$"),
+    db: Session = Depends(get_db)
+):
+    """Validate a JSON import sent as the raw request body, as it arrives.
+
+    The body is a quiz export ({"questions": [...]}) or a bare array, or
+    with format=ndjson one question per line; any of the exports, gzipped
+    or not. It is parsed incrementally and validated IMPORT_BATCH_SIZE
+    questions at a time, so memory does not grow with the file. The
+    response is a summary with the first `max_errors` invalid questions
+    only. With `add_to_bank` the valid questions are bulk inserted into
+    `class_id`'s question bank, in one transaction that is rolled back if
+    the body turns out to be incomplete.
+
+    With a `class_id`, valid questions are also checked for near-duplicates
+    in that bank (including the questions this import added before them)
+    and in their own batch; the first `max_errors` are listed, and with
+    `skip_duplicates` they are not added.
+    """
+    from datetime import datetime
+    
+    if add_to_bank:
+        if not class_id:
+            raise HTTPException(status_code=400, detail="class_id is required to add questions to the bank")
+        class_obj = await run_in_threadpool(lambda: db.query(ClassDB).filter(ClassDB.id == class_id).first())
+        if not class_obj:
+            raise HTTPException(status_code=400, detail="Invalid class_id")
+    
+    created_at = datetime.now().isoformat()
+    summary = {"total_questions": 0, "valid_questions": 0, "invalid_questions": 0, "questions_added": 0, "duplicate_questions": 0}
+    invalid = []
+    validation_errors = []
+    duplicates = []
+    
+    def validate_batch(batch: List[dict]) -> None:
+        rows = []
+        row_tags = []
+        indexes = []
+        for q_data in batch:
+            summary["total_questions"] += 1
+            validated_question = validate_question(q_data)
+            if validated_question["is_valid"]:
+                summary["valid_questions"] += 1
+                if class_id:
+                    row, tags = question_bank_row(validated_question, class_id, created_at)
+                    rows.append(row)
+                    row_tags.append(tags)
+                    indexes.append(summary["total_questions"])
+                continue
+            summary["invalid_questions"] += 1
+            if len(invalid) < max_errors:
+                index = summary["total_questions"]
+                invalid.append({"index": index, **validated_question})
+                validation_errors.append(f"Question {index}: {'; '.join(validated_question['validation_errors'])}")
+        if not rows:
+            return
+        check = check_duplicates(db, class_id, [question_text(row["question"], row["options"]) for row in rows])
+        kept = [i for i, match in enumerate(check.matches) if not (skip_duplicates and match)]
+        new_ids = {}
+        if add_to_bank:
+            question_ids = bulk_insert(db, QuestionBankDB.__table__, [rows[i] for i in kept])
+            set_question_tags(db, dict(zip(question_ids, [row_tags[i] for i in kept])))
+            index_bank_questions(db, class_id, question_ids, check.signatures[kept])
+            summary["questions_added"] += len(question_ids)
+            new_ids = dict(zip(kept, question_ids))
+        for i, match in enumerate(check.matches):
+            if not match:
+                continue
+            summary["duplicate_questions"] += 1
+            if len(duplicates) < max_errors:
+                duplicates.append({
+                    "index": indexes[i],
+                    "duplicate_of": match.question_id if match.index is None else new_ids.get(match.index),
+                    "duplicate_of_index": None if match.index is None else indexes[match.index],
+                    "similarity": round(match.similarity, 3)
+                })
+    
+    if import_format == "ndjson" or http_request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        parser = NDJSONStream(skip_key="export_info")
+    else:
+        parser = JSONArrayStream("questions")
+    batch = []
+    try:
+        async for text_piece in request_text(http_request):
+            batch.extend(parser.feed(text_piece))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await run_in_threadpool(validate_batch, batch)
+                batch = []
+        if isinstance(parser, NDJSONStream):
+            batch.extend(parser.finish())
+        if batch:
+            await run_in_threadpool(validate_batch, batch)
+        
+        if not parser.in_array:
+            raise HTTPException(status_code=400, detail="No questions array found in the JSON")
+        if not parser.done:
+            raise HTTPException(status_code=400, detail="JSON ended before the questions array was closed")
+        if summary["total_questions"] == 0 and parser.malformed == 0:
+            raise HTTPException(status_code=400, detail="No questions provided")
+        if add_to_bank:
+            await run_in_threadpool(db.commit)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"JSON validation failed: {e}")
+    except BaseException:
+        db.rollback()
+        raise
+    
+    return {
+        "is_valid": summary["invalid_questions"] == 0 and parser.malformed == 0,
+        **summary,
+        "malformed_questions": parser.malformed,
+        "validation_errors": validation_errors,
+        "invalid": invalid,
+        "duplicates": duplicates
+    }
+
 @app.get("/api/quizzes")
-async def get_all_quizzes(db: Session = Depends(get_db)):
-    quizzes = db.query(QuizDB).all()
-    return [{"title": quiz.title, "id": quiz.id, "class_id": quiz.class_id, "class_name": quiz.class_ref.name} for quiz in quizzes]
+def get_all_quizzes(db: Session = Depends(get_db)):
+    rows = db.query(QuizDB.title, QuizDB.id, QuizDB.class_id, ClassDB.name).join(ClassDB, QuizDB.class_id == ClassDB.id).all()
+    return [{"title": title, "id": id, "class_id": class_id, "class_name": class_name} for title, id, class_id, class_name in rows]
 
 @app.get("/api/classes/{class_id}/quizzes")
-async def get_quizzes_by_class(class_id: int, db: Session = Depends(get_db)):
+def get_quizzes_by_class(class_id: int, db: Session = Depends(get_db)):
     class_obj = db.query(ClassDB).filter(ClassDB.id == class_id).first()
     if not class_obj:
         raise HTTPException(status_code=404, detail="Class not found")
     
     return [{"title": quiz.title, "id": quiz.id} for quiz in class_obj.quizzes]
 
+def question_values(q: QuestionModel, position: int) -> dict:
+    return {
+        "question": q.question,
+        "question_type": q.question_type,
+        "options": json.dumps(q.options),
+        "correct_answer": q.correct_answer,
+        "position": position
+    }
+
+def question_rows(questions: List[QuestionModel], quiz_id: int) -> List[dict]:
+    """QuestionDB column values for `bulk_insert`"""
+    return [dict(question_values(q, position), quiz_id=quiz_id) for position, q in enumerate(questions)]
+
 @app.post("/api/quizzes")
-async def create_quiz(quiz: QuizModel, db: Session = Depends(get_db)):
+def create_quiz(quiz: QuizModel, db: Session = Depends(get_db)):
     # Check if class exists
     class_obj = db.query(ClassDB).filter(ClassDB.id == quiz.class_id).first()
     if not class_obj:
@@ -1408,24 +3626,15 @@ async def create_quiz(quiz: QuizModel, db: Session = Depends(get_db)):
     
     db_quiz = QuizDB(title=quiz.title, class_id=quiz.class_id)
     db.add(db_quiz)
-    db.commit()
-    db.refresh(db_quiz)
-
-    for q in quiz.questions:
-        db_question = QuestionDB(
-            question=q.question,
-            question_type=q.question_type,
-            options=json.dumps(q.options),
-            correct_answer=q.correct_answer,
-            quiz_id=db_quiz.id
-        )
-        db.add(db_question)
+    db.flush()
+
+    question_ids = bulk_insert(db, QuestionDB.__table__, question_rows(quiz.questions, db_quiz.id))
     db.commit()
 
-    return {"quiz_id": db_quiz.id}
+    return {"quiz_id": db_quiz.id, "question_ids": question_ids}
 
 @app.get("/api/quizzes/{quiz_id}")
-async def quiz_questions(quiz_id: int, db: Session = Depends(get_db)):
+def quiz_questions(quiz_id: int, db: Session = Depends(get_db)):
     quiz = db.query(QuizDB).filter(QuizDB.id == quiz_id).first()
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
@@ -1433,8 +3642,10 @@ async def quiz_questions(quiz_id: int, db: Session = Depends(get_db)):
     return {
         "id": quiz.id,
         "title": quiz.title,
+        "version": quiz.version,
         "questions": [
             {
+                "id": q.id,
                 "question": q.question,
                 "question_type": q.question_type,
                 "options": json.loads(q.options),
@@ -1443,8 +3654,32 @@ async def quiz_questions(quiz_id: int, db: Session = Depends(get_db)):
         ]
     }
 
+def check_and_bump_version(db: Session, quiz_id: int, expected_version: Optional[int]) -> None:
+    """Increment the quiz version, failing with 409 if it is no longer `expected_version`"""
+    query = db.query(QuizDB).filter(QuizDB.id == quiz_id)
+    if expected_version is not None:
+        query = query.filter(QuizDB.version == expected_version)
+    if query.update({QuizDB.version: QuizDB.version + 1}, synchronize_session=False) == 0:
+        raise HTTPException(status_code=409, detail="Quiz was changed by someone else. Reload it and apply your edits again.")
+
+def write_question_changes(db: Session, quiz_id: int, inserts: List[dict], updates: List[dict], deletes: List[int]) -> List[int]:
+    """Apply a computed question diff with one statement per kind of change; returns the inserted ids"""
+    table = QuestionDB.__table__
+    if deletes:
+        db.execute(table.delete().where(table.c.quiz_id == quiz_id, table.c.id.in_(deletes)))
+    if updates:
+        db.execute(table.update().where(table.c.id == bindparam("question_id")), updates)
+    return bulk_insert(db, table, [dict(row, quiz_id=quiz_id) for row in inserts])
+
 @app.put("/api/quizzes/{quiz_id}")
-async def update_quiz(quiz_id: int, quiz: QuizModel, db: Session = Depends(get_db)):
+def update_quiz(quiz_id: int, quiz: QuizModel, db: Session = Depends(get_db)):
+    """Save the full question list of a quiz.
+
+    Questions are matched to existing rows by id and only rows whose
+    content or position changed are written, so question ids stay stable.
+    Questions without a known id are added; rows not in the list are
+    deleted. Send `version` to reject the save if the quiz changed since.
+    """
     db_quiz = db.query(QuizDB).filter(QuizDB.id == quiz_id).first()
     if not db_quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
@@ -1461,28 +3696,431 @@ async def update_quiz(quiz_id: int, quiz: QuizModel, db: Session = Depends(get_d
     
     validate_quiz(updated_quiz, existing_quiz_titles)
 
-    db_quiz.title = quiz.title
-    db_quiz.class_id = quiz.class_id
-    db.query(QuestionDB).filter(QuestionDB.quiz_id == quiz_id).delete()
-
-    for q in quiz.questions:
-        db_question = QuestionDB(
-            question=q.question,
-            question_type=q.question_type,
-            options=json.dumps(q.options),
-            correct_answer=q.correct_answer,
-            quiz_id=db_quiz.id
+    existing = {
+        row.id: row for row in db.query(
+            QuestionDB.id, QuestionDB.question, QuestionDB.question_type,
+            QuestionDB.options, QuestionDB.correct_answer, QuestionDB.position
+        ).filter(QuestionDB.quiz_id == quiz_id)
+    }
+
+    inserts, insert_positions, updates, kept = [], [], [], set()
+    question_ids = [None] * len(quiz.questions)
+    for position, q in enumerate(quiz.questions):
+        values = question_values(q, position)
+        current = existing.get(q.id) if q.id not in kept else None
+        if current is None:
+            inserts.append(values)
+            insert_positions.append(position)
+            continue
+        kept.add(q.id)
+        question_ids[position] = q.id
+        if any(getattr(current, column) != value for column, value in values.items()):
+            updates.append(dict(values, question_id=q.id))
+    deletes = [question_id for question_id in existing if question_id not in kept]
+
+    metadata_changed = db_quiz.title != quiz.title or db_quiz.class_id != quiz.class_id
+    if metadata_changed or inserts or updates or deletes:
+        check_and_bump_version(db, quiz_id, quiz.version)
+    elif quiz.version is not None and quiz.version != db_quiz.version:
+        raise HTTPException(status_code=409, detail="Quiz was changed by someone else. Reload it and apply your edits again.")
+
+    if metadata_changed:
+        db.query(QuizDB).filter(QuizDB.id == quiz_id).update(
+            {QuizDB.title: quiz.title, QuizDB.class_id: quiz.class_id}, synchronize_session=False
         )
-        db.add(db_question)
+    inserted_ids = write_question_changes(db, quiz_id, inserts, updates, deletes)
+    for position, question_id in zip(insert_positions, inserted_ids):
+        question_ids[position] = question_id
+
+    db.commit()
+    return {
+        "quiz_id": quiz_id,
+        "version": db.query(QuizDB.version).filter(QuizDB.id == quiz_id).scalar(),
+        "question_ids": question_ids,
+        "changes": {"inserted": len(inserts), "updated": len(updates), "deleted": len(deletes)}
+    }
+
+@app.patch("/api/quizzes/{quiz_id}")
+def patch_quiz(quiz_id: int, patch: QuizPatchModel, db: Session = Depends(get_db)):
+    """Apply a partial update: change the title or class, replace or add
+    individual questions, and delete questions by id. `version` must match
+    the quiz's current version (409 otherwise)."""
+    db_quiz = db.query(QuizDB).filter(QuizDB.id == quiz_id).first()
+    if not db_quiz:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+
+    title = patch.title if patch.title is not None else db_quiz.title
+    class_id = patch.class_id if patch.class_id is not None else db_quiz.class_id
+    if class_id != db_quiz.class_id and not db.query(ClassDB).filter(ClassDB.id == class_id).first():
+        raise HTTPException(status_code=400, detail="Invalid class_id")
+
+    positions = dict(db.query(QuestionDB.id, QuestionDB.position).filter(QuestionDB.quiz_id == quiz_id).all())
+    unknown = [qid for qid in patch.delete_question_ids + [q.id for q in patch.upsert_questions if q.id] if qid not in positions]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Questions {unknown} do not belong to this quiz")
+
+    next_position = max((p for p in positions.values() if p is not None), default=len(positions) - 1) + 1
+    inserts, updates, changed = [], [], []
+    for q in patch.upsert_questions:
+        if q.id:
+            position = q.position if q.position is not None else positions[q.id]
+            updates.append(dict(question_values(q, position), question_id=q.id))
+        else:
+            position = q.position if q.position is not None else next_position
+            next_position = max(next_position, position + 1)
+            inserts.append(question_values(q, position))
+        changed.append((position, Question(q.question, q.options, q.correct_answer)))
+
+    deletes = list(set(patch.delete_question_ids))
+    existing_quiz_titles = []
+    if title != db_quiz.title or class_id != db_quiz.class_id:
+        existing_quiz_titles = [q.title for q in db.query(QuizDB).filter(QuizDB.class_id == class_id, QuizDB.id != quiz_id).all()]
+    validate_quiz_patch(
+        title, changed, existing_quiz_titles, len(positions) - len(deletes) + len(inserts),
+        updated_question_ids=[update["question_id"] for update in updates], deleted_question_ids=deletes
+    )
+
+    check_and_bump_version(db, quiz_id, patch.version)
+    db.query(QuizDB).filter(QuizDB.id == quiz_id).update(
+        {QuizDB.title: title, QuizDB.class_id: class_id}, synchronize_session=False
+    )
+    inserted_ids = write_question_changes(db, quiz_id, inserts, updates, deletes)
 
     db.commit()
-    return {"quiz_id": db_quiz.id}
+    return {
+        "quiz_id": quiz_id,
+        "version": patch.version + 1,
+        "inserted_question_ids": inserted_ids,
+        "changes": {"inserted": len(inserts), "updated": len(updates), "deleted": len(deletes)}
+    }
+
+class AnswerKeyCache:
+    """Graded answer keys by (quiz id, quiz version); saves bump the version, so keys never go stale and old ones age out"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.keys = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, db: Session, quiz_id: int):
+        """(version, answer key) of a quiz, or None if it does not exist"""
+        version = db.query(QuizDB.version).filter(QuizDB.id == quiz_id).scalar()
+        if version is None:
+            return None
+        with self.lock:
+            key = self.keys.get((quiz_id, version))
+            if key is not None:
+                self.keys.move_to_end((quiz_id, version))
+                self.hits += 1
+                return version, key
+            self.misses += 1
+
+        # Version and questions in one statement, so they belong together
+        rows = (
+            db.query(QuizDB.version, QuestionDB.id, QuestionDB.question_type, QuestionDB.options, QuestionDB.correct_answer)
+            .join(QuizDB, QuestionDB.quiz_id == QuizDB.id)
+            .filter(QuestionDB.quiz_id == quiz_id)
+            .order_by(QuestionDB.position, QuestionDB.id)
+            .all()
+        )
+        if rows:
+            version = rows[0][0]
+        key = answer_key(row[1:] for row in rows)
+        with self.lock:
+            self.keys[(quiz_id, version)] = key
+            self.keys.move_to_end((quiz_id, version))
+            while len(self.keys) > self.max_entries:
+                self.keys.popitem(last=False)
+        return version, key
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "cached_quizzes": len(self.keys),
+                "max_entries": self.max_entries
+            }
+
+ANSWER_KEYS = AnswerKeyCache(int(os.getenv("ANSWER_KEY_CACHE_SIZE", "512")))
+
+def store_attempts(db: Session, batch: List[dict]) -> List[int]:
+    """Insert a batch of graded attempts, their responses and their running statistics; returns the attempt ids"""
+    attempt_ids = bulk_insert(db, QuizAttemptDB.__table__, [entry["attempt"] for entry in batch])
+    responses = [
+        dict(row, attempt_id=attempt_id)
+        for entry, attempt_id in zip(batch, attempt_ids)
+        for row in entry["responses"]
+    ]
+    if responses:
+        db.execute(QuizAttemptResponseDB.__table__.insert(), responses)
+    totals = ItemTotals()
+    for entry in batch:
+        totals.add_attempt(entry["attempt"]["score"], entry["attempt"]["total"], entry["responses"])
+    add_item_totals(db, "question", totals)
+    return attempt_ids
+
+ATTEMPT_WRITER = AttemptWriter(SessionLocal, store_attempts, int(os.getenv("ATTEMPT_WRITE_BATCH", "200")))
+
+@app.on_event("shutdown")
+async def stop_attempt_writer():
+    await run_in_threadpool(ATTEMPT_WRITER.close)
+
+@app.post("/api/quizzes/{quiz_id}/attempts")
+def submit_quiz_attempt(quiz_id: int, attempt: QuizAttemptModel, db: Session = Depends(get_db)):
+    """Grade a whole submission and record it.
+
+    Every question of the quiz is graded, and ones without an answer count
+    as wrong. Returns the score and, per question, whether it was right
+    with the correct or acceptable answers for feedback.
+    """
+    from datetime import datetime
+    
+    cached = ANSWER_KEYS.get(db, quiz_id)
+    if cached is None:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    version, key = cached
+    if attempt.quiz_version is not None and attempt.quiz_version != version:
+        raise HTTPException(status_code=409, detail="Quiz was changed since it was loaded. Reload it and try again.")
+    
+    answers = {}
+    for item in attempt.answers:
+        if item.question_id not in key:
+            raise HTTPException(status_code=400, detail=f"Question {item.question_id} is not in this quiz")
+        answers[item.question_id] = item
+    
+    results = []
+    for question_id, keyed in key.items():
+        answer = answers[question_id].answer if question_id in answers else None
+        result = {
+            "question_id": question_id,
+            "answer": answer,
+            "is_correct": grade_answer(keyed, answer),
+            "correct_answer": keyed.correct_answer
+        }
+        if keyed.question_type == "fill_blank":
+            result["acceptable_answers"] = sorted(keyed.accepted)
+        results.append(result)
+    score = sum(1 for result in results if result["is_correct"])
+    submitted_at = datetime.now().isoformat()
+    
+    # Nothing to roll back for the reads above; the write happens on the writer's session
+    db.close()
+    attempt_id = ATTEMPT_WRITER.write({
+        "quiz_id": quiz_id,
+        "quiz_version": version,
+        "student_name": (attempt.student_name or "").strip() or None,
+        "score": score,
+        "total": len(results),
+        "duration_seconds": attempt.duration_seconds,
+        "submitted_at": submitted_at
+    }, [{
+        "question_id": result["question_id"],
+        "answer": json.dumps(result["answer"]) if result["answer"] is not None else None,
+        "is_correct": 1 if result["is_correct"] else 0,
+        "seconds": answers[result["question_id"]].seconds if result["question_id"] in answers else None
+    } for result in results])
+    
+    # Plain JSON types only, so skip FastAPI's per-value jsonable_encoder walk
+    return JSONResponse({
+        "attempt_id": attempt_id,
+        "quiz_id": quiz_id,
+        "quiz_version": version,
+        "score": score,
+        "total": len(results),
+        "percent": round(100.0 * score / len(results), 1) if results else 0.0,
+        "submitted_at": submitted_at,
+        "results": results
+    })
+
+@app.get("/api/quizzes/{quiz_id}/attempts")
+def list_quiz_attempts(quiz_id: int, limit: int = Query(50, ge=1, le=500), before_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """Most recent attempts at a quiz, newest first; pass the last `attempt_id` as `before_id` for older ones"""
+    query = db.query(QuizAttemptDB).filter(QuizAttemptDB.quiz_id == quiz_id)
+    if before_id:
+        query = query.filter(QuizAttemptDB.id < before_id)
+    return [{
+        "attempt_id": attempt.id,
+        "quiz_version": attempt.quiz_version,
+        "student_name": attempt.student_name,
+        "score": attempt.score,
+        "total": attempt.total,
+        "duration_seconds": attempt.duration_seconds,
+        "submitted_at": attempt.submitted_at
+    } for attempt in query.order_by(QuizAttemptDB.id.desc()).limit(limit)]
+
+@app.get("/api/grading/stats")
+def get_grading_stats():
+    return {"answer_key_cache": ANSWER_KEYS.stats(), "attempt_writer": ATTEMPT_WRITER.stats()}
+
+ANSWER_DISTRIBUTION_LIMIT = 20  # most common answers listed per question, besides the options
+
+def add_item_totals(db: Session, item_type: str, totals: ItemTotals) -> None:
+    """Add `totals` to the stored running totals of their questions, inside
+    the session's transaction. Each row is inserted the first time its
+    question is graded and incremented by the same upsert after that."""
+    from datetime import datetime
+    
+    if not totals.items:
+        return
+    insert = sqlite_insert if db.bind.dialect.name == "sqlite" else postgresql_insert
+    stats = insert(ItemStatsDB.__table__)
+    now = datetime.now().isoformat()
+    db.execute(
+        stats.on_conflict_do_update(
+            index_elements=["item_type", "item_id"],
+            set_={**{field: stats.table.c[field] + stats.excluded[field] for field in STAT_FIELDS}, "updated_at": stats.excluded.updated_at}
+        ),
+        [dict(row, item_type=item_type, updated_at=now) for row in totals.rows()]
+    )
+    
+    if totals.answers:
+        counts = insert(ItemAnswerCountDB.__table__)
+        db.execute(
+            counts.on_conflict_do_update(
+                index_elements=["item_type", "item_id", "answer"],
+                set_={"responses": counts.table.c.responses + counts.excluded.responses}
+            ),
+            [
+                {"item_type": item_type, "item_id": item_id, "answer": answer, "responses": responses}
+                for (item_id, answer), responses in totals.answers.items()
+            ]
+        )
+
+def add_recorded_responses(db: Session, totals: ItemTotals, condition) -> int:
+    """Stream the recorded responses of attempts matching `condition` into `totals`; returns how many"""
+    rows = (
+        db.query(
+            QuizAttemptDB.score, QuizAttemptDB.total, QuizAttemptResponseDB.question_id,
+            QuizAttemptResponseDB.answer, QuizAttemptResponseDB.is_correct, QuizAttemptResponseDB.seconds
+        )
+        .join(QuizAttemptDB, QuizAttemptResponseDB.attempt_id == QuizAttemptDB.id)
+        .filter(condition)
+        .yield_per(EXPORT_BATCH_SIZE)
+    )
+    count = 0
+    for row in rows:
+        totals.add(*row)
+        count += 1
+    return count
+
+def rebuild_item_stats() -> dict:
+    """Recompute the quiz questions' running totals from every recorded attempt.
+
+    Responses are read in one streaming pass without holding the write
+    lock, so submissions carry on meanwhile. The stored totals are then
+    replaced in a short write transaction, which also adds the attempts
+    committed since the pass started.
+    """
+    db = SessionLocal()
+    try:
+        last_attempt_id = db.query(func.max(QuizAttemptDB.id)).scalar() or 0
+        totals = ItemTotals()
+        responses = add_recorded_responses(db, totals, QuizAttemptDB.id <= last_attempt_id)
+        db.rollback()  # end the read before taking the write lock
+        
+        db.execute(ItemStatsDB.__table__.delete().where(ItemStatsDB.item_type == "question"))
+        db.execute(ItemAnswerCountDB.__table__.delete().where(ItemAnswerCountDB.item_type == "question"))
+        responses += add_recorded_responses(db, totals, QuizAttemptDB.id > last_attempt_id)
+        add_item_totals(db, "question", totals)
+        db.commit()
+        return {"questions": len(totals.items), "responses": responses}
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def item_analytics(db: Session, item_type: str, item_id: int, question_type: str, options: str) -> dict:
+    """Statistics and answer distribution of one question: a handful of primary key lookups"""
+    result = item_statistics(db.get(ItemStatsDB, (item_type, item_id)))
+    counts = db.query(ItemAnswerCountDB.answer, ItemAnswerCountDB.responses).filter(
+        ItemAnswerCountDB.item_type == item_type, ItemAnswerCountDB.item_id == item_id
+    )
+    
+    labels = []
+    if question_type != "fill_blank":
+        try:
+            labels = [answer_label(option) for option in json.loads(options)]
+        except (TypeError, ValueError):
+            labels = []
+        labels = [label for label in labels if label is not None]
+    by_answer = dict(counts.filter(ItemAnswerCountDB.answer.in_(labels)).all()) if labels else {}
+    by_answer.update(counts.order_by(ItemAnswerCountDB.responses.desc()).limit(len(labels) + ANSWER_DISTRIBUTION_LIMIT).all())
+    
+    answered = result["responses"] - result["unanswered"]
+    others = sorted(((answer, n) for answer, n in by_answer.items() if answer not in labels), key=lambda pair: -pair[1])
+    result["answers"] = [{
+        "answer": answer,
+        "responses": n,
+        "percent": round(100.0 * n / answered, 1) if answered else 0.0,
+        "is_option": answer in labels
+    } for answer, n in [(label, by_answer.get(label, 0)) for label in labels] + others[:ANSWER_DISTRIBUTION_LIMIT]]
+    return result
+
+@app.get("/api/analytics/questions/{question_id}")
+def get_question_analytics(question_id: int, db: Session = Depends(get_db)):
+    """Statistics of a quiz question from every graded attempt, with how often each answer was given"""
+    question = db.query(QuestionDB).filter(QuestionDB.id == question_id).first()
+    if not question:
+        raise HTTPException(status_code=404, detail="Question not found")
+    result = {"question_id": question.id, "quiz_id": question.quiz_id, "question_type": question.question_type}
+    result.update(item_analytics(db, "question", question.id, question.question_type, question.options))
+    return result
+
+@app.get("/api/analytics/question-bank/{question_id}")
+def get_bank_question_analytics(question_id: int, db: Session = Depends(get_db)):
+    """Statistics of a question bank question, from the grades recorded for it"""
+    question = db.query(QuestionBankDB).filter(QuestionBankDB.id == question_id).first()
+    if not question:
+        raise HTTPException(status_code=404, detail="Question not found")
+    result = {"question_id": question.id, "class_id": question.class_id, "question_type": question.question_type}
+    result.update(item_analytics(db, "bank", question.id, question.question_type, question.options))
+    return result
+
+@app.get("/api/analytics/quizzes/{quiz_id}")
+def get_quiz_analytics(quiz_id: int, db: Session = Depends(get_db)):
+    """Statistics of every question of a quiz, in quiz order, read from the stored totals"""
+    if db.query(QuizDB.id).filter(QuizDB.id == quiz_id).scalar() is None:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    rows = (
+        db.query(QuestionDB.id, QuestionDB.question, QuestionDB.question_type, ItemStatsDB)
+        .outerjoin(ItemStatsDB, and_(ItemStatsDB.item_type == "question", ItemStatsDB.item_id == QuestionDB.id))
+        .filter(QuestionDB.quiz_id == quiz_id)
+        .order_by(QuestionDB.position, QuestionDB.id)
+        .all()
+    )
+    return {
+        "quiz_id": quiz_id,
+        "questions": [
+            {"question_id": question_id, "question": question, "question_type": question_type, **item_statistics(stats)}
+            for question_id, question, question_type, stats in rows
+        ]
+    }
+
+@app.post("/api/analytics/rebuild")
+def rebuild_analytics():
+    """Recompute the question statistics from the recorded attempts (also `python item_analysis.py`)"""
+    try:
+        return rebuild_item_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error rebuilding question statistics: {str(e)}")
 
 @app.delete("/api/quizzes/{quiz_id}")
-async def delete_quiz(quiz_id: int, db: Session = Depends(get_db)):
+def delete_quiz(quiz_id: int, db: Session = Depends(get_db)):
     quiz = db.query(QuizDB).filter(QuizDB.id == quiz_id).first()
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
+    attempt_ids = select(QuizAttemptDB.id).where(QuizAttemptDB.quiz_id == quiz_id)
+    db.execute(QuizAttemptResponseDB.__table__.delete().where(QuizAttemptResponseDB.attempt_id.in_(attempt_ids)))
+    db.execute(QuizAttemptDB.__table__.delete().where(QuizAttemptDB.quiz_id == quiz_id))
+    question_ids = select(QuestionDB.id).where(QuestionDB.quiz_id == quiz_id)
+    for table in (ItemStatsDB.__table__, ItemAnswerCountDB.__table__):
+        db.execute(table.delete().where(table.c.item_type == "question", table.c.item_id.in_(question_ids)))
     db.delete(quiz)
     db.commit()
     return {"detail": "Quiz deleted successfully"}
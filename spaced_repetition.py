@@ -0,0 +1,64 @@
+"""
+SM-2 scheduling for spaced-repetition review of the question bank.
+
+Each learner has a review state per question: how many times in a row it
+was recalled, the current interval, the ease factor and when it is due.
+schedule() applies one graded review to a state, following SuperMemo's
+SM-2: grades run from 0 (no recall) to 5 (perfect recall), a grade below 3
+starts the question over with a one day interval, and otherwise the
+interval goes 1 day, 6 days, then the previous interval times the ease.
+The ease starts at 2.5, moves with every grade and never drops below 1.3.
+
+Practice answers are graded right or wrong rather than 0-5;
+grade_for_answer() maps them to a grade, taking a quick correct answer
+as easier recall than a slow one.
+"""
+
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+MIN_GRADE = 0
+MAX_GRADE = 5
+PASSING_GRADE = 3
+INITIAL_EASE = 2.5
+MIN_EASE = 1.3
+QUICK_ANSWER_SECONDS = 10  # a correct answer this fast is graded as perfect recall
+
+
+class ReviewState(NamedTuple):
+    repetitions: int = 0  # reviews in a row graded PASSING_GRADE or better
+    interval_days: float = 0.0
+    ease: float = INITIAL_EASE
+    lapses: int = 0  # reviews that sent the question back to the start
+    reviews: int = 0
+
+
+def schedule(state: ReviewState, grade: int, now: datetime):
+    """(new state, due datetime) after a review graded `grade` at `now`"""
+    grade = max(MIN_GRADE, min(MAX_GRADE, grade))
+    if grade >= PASSING_GRADE:
+        if state.repetitions == 0:
+            interval = 1.0
+        elif state.repetitions == 1:
+            interval = 6.0
+        else:
+            interval = float(round(state.interval_days * state.ease))
+        repetitions = state.repetitions + 1
+        lapses = state.lapses
+    else:
+        interval = 1.0
+        repetitions = 0
+        lapses = state.lapses + (1 if state.reviews else 0)
+    miss = MAX_GRADE - grade
+    ease = max(MIN_EASE, state.ease + 0.1 - miss * (0.08 + miss * 0.02))
+    new_state = ReviewState(repetitions, interval, ease, lapses, state.reviews + 1)
+    return new_state, now + timedelta(days=interval)
+
+
+def grade_for_answer(is_correct: bool, seconds: Optional[float] = None) -> int:
+    """SM-2 grade for a practice answer graded right or wrong"""
+    if not is_correct:
+        return 1
+    if seconds is not None and seconds <= QUICK_ANSWER_SECONDS:
+        return 5
+    return 4
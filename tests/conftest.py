@@ -0,0 +1,115 @@
+"""
+Tests run the app against a throwaway SQLite database in a temporary
+directory, with background workers off and no OpenAI key.
+
+With TEST_DATABASE=postgresql they run against a throwaway PostgreSQL
+server instead, started in the temporary directory by pgserver
+(pip install pgserver psycopg2-binary). DATABASE_URL, if set, points the
+tests at an existing database.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_postgresql(directory: str) -> str:
+    import pgserver
+    server = pgserver.get_server(os.path.join(directory, "pgdata"), cleanup_mode="stop")
+    server.psql("CREATE DATABASE quizzes;")
+    return server.get_uri("quizzes").replace("postgresql://", "postgresql+psycopg2://")
+
+
+os.chdir(tempfile.mkdtemp(prefix="quiz-tests-"))
+os.environ.pop("OPENAI_API_KEY", None)
+if os.getenv("TEST_DATABASE") == "postgresql" and "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = start_postgresql(os.getcwd())
+os.environ.setdefault("DATABASE_URL", "sqlite:///./quizzes.db")
+os.environ["ADAPTIVE_CALIBRATION_INTERVAL_SECONDS"] = "0"
+os.environ["AI_JOB_WORKERS"] = "0"
+os.environ["IMAGE_PROCESS_WORKERS"] = "0"
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+STUB_CONTENT = (
+    '{"questions": [{"question": "What colour is the square?", "question_type": "multiple_choice", '
+    '"options": ["red", "blue"], "correct_answer": "red"}]}'
+)
+
+
+class StubAIClient:
+    """Stand-in for the OpenAI client that answers every chat completion with
+    STUB_CONTENT, in one piece when streamed"""
+
+    def __init__(self):
+        self.calls = 0
+        self.chat = type("Chat", (), {"completions": self})
+
+    async def create(self, timeout=None, stream=False, **kwargs):
+        self.calls += 1
+        if stream:
+            return self.stream()
+        message = type("Message", (), {"content": STUB_CONTENT})
+        choice = type("Choice", (), {"message": message})
+        return type("Response", (), {"choices": [choice]})
+
+    async def stream(self):
+        delta = type("Delta", (), {"content": STUB_CONTENT})
+        choice = type("Choice", (), {"delta": delta})
+        yield type("Chunk", (), {"choices": [choice]})
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def ai_client(server, monkeypatch):
+    """The app with AI available and its OpenAI client replaced by a StubAIClient"""
+    stub = StubAIClient()
+    monkeypatch.setattr(server, "AI_CLIENT", stub)
+    monkeypatch.setattr(server, "AI_AVAILABLE", True)
+    return stub
+
+
+@pytest.fixture(scope="session")
+def server():
+    import server
+    return server
+
+
+@pytest.fixture(scope="session")
+def client(server):
+    from fastapi.testclient import TestClient
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def make_class(client):
+    """Create a class with a unique name and return its id"""
+    created = []
+
+    def make(name=None):
+        response = client.post("/api/classes", json={"name": name or f"Class {len(created)} {os.urandom(4).hex()}"})
+        assert response.status_code == 200, response.text
+        created.append(response.json()["class_id"])
+        return created[-1]
+    return make
+
+
+@pytest.fixture
+def add_question(client):
+    """Add a multiple choice question to a class's bank and return its id; the first option is correct"""
+    def add(class_id, text, options=("a", "b")):
+        response = client.post("/api/question-bank", json={
+            "question": text, "question_type": "multiple_choice", "options": list(options),
+            "correct_answer": options[0], "class_id": class_id, "difficulty": "medium"
+        })
+        assert response.status_code == 200, response.text
+        return response.json()["question_id"]
+    return add
@@ -0,0 +1,89 @@
+import item_parameters
+
+
+def ability(server, learner, class_id):
+    db = server.SessionLocal()
+    try:
+        return db.get(server.LearnerAbilityDB, (learner, class_id)).ability
+    finally:
+        db.close()
+
+
+def answer(client, learner, question_id, value):
+    response = client.post("/api/adaptive/answers", json={"learner": learner, "question_id": question_id, "answer": value})
+    assert response.status_code == 200, response.text
+
+
+def test_calibration_updates_ability_after_a_question_moves_class(client, server, make_class, add_question):
+    class_a, class_b = make_class(), make_class()
+    moved = add_question(class_a, "What is the chemical symbol for gold?")
+    kept = [add_question(class_a, f"How many sides does a polygon number {i} have?") for i in range(3)]
+    answer(client, "kim", moved, "a")
+    for question_id in kept:
+        answer(client, "kim", question_id, "b")
+    answer(client, "lee", kept[0], "a")
+
+    response = client.put(f"/api/question-bank/{moved}", json={
+        "question": "What is the chemical symbol for gold?", "question_type": "multiple_choice",
+        "options": ["a", "b"], "correct_answer": "a", "class_id": class_b, "difficulty": "medium"
+    })
+    assert response.status_code == 200, response.text
+
+    online = ability(server, "kim", class_a)
+    assert server.calibrate_class(class_a) is not None
+    assert ability(server, "kim", class_a) != online
+
+
+def test_calibration_keeps_estimates_of_newer_answers(client, server, make_class, add_question):
+    class_id = make_class()
+    questions = [add_question(class_id, f"What is {i} times seven?") for i in range(3)]
+    answer(client, "max", questions[0], "a")
+    answer(client, "max", questions[1], "b")
+
+    db = server.SessionLocal()
+    state = db.get(server.LearnerAbilityDB, ("max", class_id))
+    state.last_response_id += 1  # as if an answer arrived while the fit was running
+    db.commit()
+    db.close()
+    online = ability(server, "max", class_id)
+    server.calibrate_class(class_id)
+    assert ability(server, "max", class_id) == online
+
+
+def test_answers_use_calibrations_without_loading_the_class(client, server, make_class, add_question, monkeypatch):
+    class_id = make_class()
+    question_id = add_question(class_id, "Which planet is known as the red planet?")
+    db = server.SessionLocal()
+    try:
+        db.add(server.ItemCalibrationDB(question_id=question_id, class_id=class_id, difficulty=2.0, std_error=0.5, responses=10, calibrated_at="2024-01-01T00:00:00"))
+        db.commit()
+    finally:
+        db.close()
+
+    def refuse(*args):
+        raise AssertionError("a whole class was loaded to grade one answer")
+    monkeypatch.setattr(server.ITEM_PARAMETERS, "get", refuse)
+    answer(client, "ana", question_id, "a")
+    expected, _ = server.update_ability(0.0, 1.0 / server.ABILITY_PRIOR_SD ** 2, 2.0, True)
+    assert ability(server, "ana", class_id) == expected
+
+
+def test_parameters_loaded_across_an_invalidation_are_not_kept(server, make_class, add_question, monkeypatch):
+    class_id = make_class()
+    add_question(class_id, "What is the boiling point of water in Celsius?")
+    cache = item_parameters.ItemParameterCache(ttl_seconds=60)
+    sorted_parameters = item_parameters.sorted_parameters
+
+    def calibrated_meanwhile(parameters):
+        cache.invalidate(class_id)
+        return sorted_parameters(parameters)
+    monkeypatch.setattr(item_parameters, "sorted_parameters", calibrated_meanwhile)
+    db = server.SessionLocal()
+    try:
+        assert len(cache.get(db, class_id).question_ids) == 1
+        assert class_id not in cache.classes
+        monkeypatch.setattr(item_parameters, "sorted_parameters", sorted_parameters)
+        cache.get(db, class_id)
+        assert class_id in cache.classes
+    finally:
+        db.close()
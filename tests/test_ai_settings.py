@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event
+
+
+@pytest.fixture
+def queries_on_event_loop(server):
+    """Statements executed from a thread running an event loop"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        statements.append(statement)
+
+    event.listen(server.engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(server.engine, "before_cursor_execute", record)
+
+
+@pytest.mark.parametrize("path", ["/api/ai/generate-questions", "/api/ai/generate-questions/stream", "/api/ai/jobs"])
+def test_generation_reads_settings_off_the_event_loop(server, client, make_class, ai_client, queries_on_event_loop, path):
+    class_id = make_class()
+    server.AI_SETTINGS.invalidate()
+    response = client.post(path, json={"class_id": class_id, "text_content": f"Notes for {path}", "force_refresh": True})
+    assert response.status_code == 200, response.text
+    assert '"type": "error"' not in response.text
+    assert queries_on_event_loop == []
+
+
+def test_explanation_reads_settings_off_the_event_loop(server, client, ai_client, queries_on_event_loop):
+    server.AI_SETTINGS.invalidate()
+    response = client.post("/api/ai/explain-answer", json={
+        "question": "What is 2 + 2?", "options": ["3", "4"], "correct_answer": "4", "user_answer": "3"
+    })
+    assert response.status_code == 200, response.text
+    assert queries_on_event_loop == []
@@ -0,0 +1,89 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from attempt_writer import AttemptWriter
+
+
+@pytest.fixture
+def quiz(client, make_class):
+    response = client.post("/api/quizzes", json={"title": "Writer quiz", "class_id": make_class(), "questions": [
+        {"question": "2 + 2?", "options": ["4", "5"], "correct_answer": "4"},
+    ]})
+    assert response.status_code == 200, response.text
+    return response.json()["quiz_id"], response.json()["question_ids"][0]
+
+
+def attempt_rows(quiz, score=1):
+    quiz_id, question_id = quiz
+    attempt = {"quiz_id": quiz_id, "quiz_version": 1, "score": score, "total": 1, "submitted_at": "2024-01-01T00:00:00"}
+    return attempt, [{"question_id": question_id, "answer": '"4"', "is_correct": 1, "seconds": None}]
+
+
+def stored_attempts(client, quiz):
+    return client.get(f"/api/analytics/quizzes/{quiz[0]}").json()["questions"][0]["responses"]
+
+
+def test_close_stores_queued_attempts_then_refuses_more(server, client, quiz, monkeypatch):
+    writer = AttemptWriter(server.SessionLocal, server.store_attempts, max_batch=2)
+    first_flush = threading.Event()
+    release = threading.Event()
+    flush = writer.flush
+
+    def held_flush(batch):
+        first_flush.set()
+        release.wait()
+        flush(batch)
+    monkeypatch.setattr(writer, "flush", held_flush)
+
+    ids = []
+    writers = [threading.Thread(target=lambda: ids.append(writer.write(*attempt_rows(quiz)))) for _ in range(5)]
+    writers[0].start()
+    first_flush.wait()
+    for thread in writers[1:]:
+        thread.start()
+    while writer.queue.qsize() < 4:
+        time.sleep(0.01)
+    closing = threading.Thread(target=writer.close)
+    closing.start()
+    release.set()
+    closing.join()
+    for thread in writers:
+        thread.join()
+
+    assert len(set(ids)) == 5 and None not in ids
+    assert not writer.thread.is_alive()
+    assert stored_attempts(client, quiz) == 5
+    with pytest.raises(RuntimeError):
+        writer.write(*attempt_rows(quiz))
+
+
+def test_transient_errors_are_retried(server, client, quiz, monkeypatch):
+    writer = AttemptWriter(server.SessionLocal, server.store_attempts, max_batch=10, retries=2, retry_delay=0)
+    bulk_insert = server.bulk_insert
+    failures = [OperationalError("INSERT", {}, Exception("database is locked"))] * 2
+
+    def flaky_insert(*args):
+        if failures:
+            raise failures.pop()
+        return bulk_insert(*args)
+    monkeypatch.setattr(server, "bulk_insert", flaky_insert)
+
+    assert writer.write(*attempt_rows(quiz)) is not None
+    assert writer.stats()["commits"] == 1
+    assert stored_attempts(client, quiz) == 1
+    writer.close()
+
+
+def test_bad_row_only_fails_its_own_submission(server, client, quiz):
+    writer = AttemptWriter(server.SessionLocal, server.store_attempts, max_batch=10)
+    batch = [
+        {"attempt": attempt, "responses": responses, "done": threading.Event(), "id": None, "error": None}
+        for attempt, responses in [attempt_rows(quiz), attempt_rows(quiz, score=None), attempt_rows(quiz)]
+    ]
+    writer.flush(batch)
+    assert [entry["id"] is not None for entry in batch] == [True, False, True]
+    assert isinstance(batch[1]["error"], IntegrityError)
+    assert stored_attempts(client, quiz) == 2
@@ -0,0 +1,47 @@
+def question_texts(server, model, ids):
+    db = server.SessionLocal()
+    try:
+        by_id = dict(db.query(model.id, model.question).filter(model.id.in_(ids)).all())
+    finally:
+        db.close()
+    return [by_id.get(question_id) for question_id in ids]
+
+
+def quiz_body(class_id, texts):
+    return {"title": f"Bulk quiz {class_id}", "class_id": class_id, "questions": [
+        {"question": text, "options": ["yes", "no"], "correct_answer": "yes"} for text in texts
+    ]}
+
+
+def test_returned_ids_match_the_inserted_rows(server, client, make_class):
+    class_id = make_class()
+    texts = [f"Bulk bank question {i}?" for i in range(5)]
+    response = client.post("/api/ai/add-to-bank", json={"class_id": class_id, "questions": [
+        {"question": text, "options": ["a", "b"], "correct_answer": "a"} for text in texts
+    ]})
+    assert response.status_code == 200, response.text
+    question_ids = response.json()["question_ids"]
+    assert question_texts(server, server.QuestionBankDB, question_ids) == texts
+
+
+def test_quiz_question_ids_follow_the_quiz_order(server, client, make_class):
+    class_id = make_class()
+    response = client.post("/api/quizzes", json=quiz_body(class_id, ["First?", "Second?", "Third?"]))
+    assert response.status_code == 200, response.text
+    created = response.json()
+    assert question_texts(server, server.QuestionDB, created["question_ids"]) == ["First?", "Second?", "Third?"]
+
+    response = client.put(f"/api/quizzes/{created['quiz_id']}", json=quiz_body(class_id, ["Only?", "Other?"]))
+    assert response.status_code == 200, response.text
+    updated = response.json()["question_ids"]
+    assert question_texts(server, server.QuestionDB, updated) == ["Only?", "Other?"]
+    questions = client.get(f"/api/quizzes/{created['quiz_id']}").json()["questions"]
+    assert [question["question"] for question in questions] == ["Only?", "Other?"]
+
+
+def test_empty_batch_inserts_nothing(server):
+    db = server.SessionLocal()
+    try:
+        assert server.bulk_insert(db, server.QuestionBankDB.__table__, []) == []
+    finally:
+        db.close()
@@ -0,0 +1,9 @@
+def test_class_with_bank_questions_is_not_deleted(client, make_class, add_question):
+    class_id = make_class()
+    question_id = add_question(class_id, "What is 2 + 2?", ("4", "5"))
+    response = client.delete(f"/api/classes/{class_id}")
+    assert response.status_code == 400
+    assert "question bank" in response.json()["detail"]
+
+    assert client.delete(f"/api/question-bank/{question_id}").status_code == 200
+    assert client.delete(f"/api/classes/{class_id}").status_code == 200
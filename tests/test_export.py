@@ -0,0 +1,57 @@
+import gzip
+import json
+
+
+def bank_export(client, **params):
+    response = client.get("/api/question-bank/export", params=params)
+    assert response.status_code == 200, response.text
+    return response
+
+
+def test_json_export_matches_the_import_schema(server, client, make_class, add_question, monkeypatch):
+    monkeypatch.setattr(server, "EXPORT_BATCH_SIZE", 2)
+    class_id = make_class()
+    for i in range(5):
+        add_question(class_id, f"Exported {i}?")
+    export = bank_export(client, class_id=class_id).json()
+    assert export["export_info"]["total_questions"] == 5
+    assert [question["question"] for question in export["questions"]] == [f"Exported {i}?" for i in range(5)]
+
+
+def test_gzipped_ndjson_has_one_question_per_line(client, make_class, add_question):
+    class_id = make_class()
+    add_question(class_id, "First?")
+    add_question(class_id, "Second?")
+    response = bank_export(client, class_id=class_id, format="ndjson", gzip="true")
+    assert response.headers["content-type"] == "application/gzip"
+    assert ".ndjson.gz" in response.headers["content-disposition"]
+    lines = [json.loads(line) for line in gzip.decompress(response.content).decode("utf-8").splitlines()]
+    assert lines[0]["export_info"]["total_questions"] == 2
+    assert [line["question"] for line in lines[1:]] == ["First?", "Second?"]
+
+
+def test_gzipped_export_imports_unchanged(server, client, make_class, add_question):
+    source, target = make_class(), make_class()
+    add_question(source, "Round trip?")
+    for export_format in ["json", "ndjson"]:
+        body = bank_export(client, class_id=source, format=export_format, gzip="true").content
+        response = client.post("/api/validate-json-questions/batch", data=body, params={
+            "class_id": target, "add_to_bank": "true", "format": export_format
+        })
+        assert response.status_code == 200, response.text
+        assert response.json()["valid_questions"] == 1
+
+
+def test_class_export_names_each_question_quiz(client, make_class):
+    class_id = make_class()
+    for title in ["Quiz A", "Quiz B"]:
+        response = client.post("/api/quizzes", json={"title": title, "class_id": class_id, "questions": [
+            {"question": f"{title} question?", "options": ["yes", "no"], "correct_answer": "yes"}
+        ]})
+        assert response.status_code == 200, response.text
+    response = client.get(f"/api/classes/{class_id}/export")
+    assert response.status_code == 200, response.text
+    export = response.json()
+    assert export["export_info"]["total_quizzes"] == 2
+    assert [(question["quiz_title"], question["question"]) for question in export["questions"]] == \
+        [("Quiz A", "Quiz A question?"), ("Quiz B", "Quiz B question?")]
@@ -0,0 +1,44 @@
+import base64
+import io
+
+from PIL import Image
+
+
+def photo(colour):
+    output = io.BytesIO()
+    Image.new("RGB", (64, 48), colour).save(output, "PNG")
+    return base64.b64encode(output.getvalue()).decode("ascii")
+
+
+def test_cached_image_is_not_downscaled_again(server, client, make_class, ai_client, monkeypatch):
+    body = {"class_id": make_class(), "image_data": photo("red"), "num_questions": 1}
+    first = client.post("/api/ai/generate-questions", json=body).json()
+    assert not first["cached"]
+    assert first["images"][0]["processed_bytes"] is not None
+
+    def refuse(*args):
+        raise AssertionError("a cached image was downscaled")
+    monkeypatch.setattr(server, "prepare_image", refuse)
+    second = client.post("/api/ai/generate-questions", json=body).json()
+    assert second["cached"]
+    assert second["generated_questions"] == first["generated_questions"]
+    assert second["images"][0]["processed_bytes"] is None
+    assert second["images"][0]["original_bytes"] == first["images"][0]["original_bytes"]
+    assert ai_client.calls == 1
+
+
+def test_listed_images_are_cached_separately(client, make_class, ai_client):
+    body = {"class_id": make_class(), "image_data_list": [photo("green")], "num_questions": 1}
+    assert not client.post("/api/ai/generate-questions", json=body).json()["cached"]
+    body["image_data_list"].append(photo("yellow"))
+    response = client.post("/api/ai/generate-questions", json=body).json()
+    assert not response["cached"]
+    assert [image["processed_bytes"] is None for image in response["images"]] == [True, False]
+    assert ai_client.calls == 2
+
+
+def test_image_key_depends_on_downscaling_settings(server):
+    fingerprint, size = server.image_fingerprint(photo("blue"))
+    assert size == len(base64.b64decode(photo("blue")))
+    assert server.image_cache_key(fingerprint, 2048, 85) != server.image_cache_key(fingerprint, 1024, 85)
+    assert server.image_cache_key(fingerprint, 2048, 85) != server.image_cache_key(fingerprint, 2048, 70)
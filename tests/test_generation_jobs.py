@@ -0,0 +1,140 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from job_queue import RateLimiter, split_text_into_chunks
+
+
+@pytest.fixture
+def job(server, client, make_class, ai_client):
+    """A queued one-chunk job; chunks left pending by other tests are cancelled so only this job's chunk can be claimed"""
+    db = server.SessionLocal()
+    try:
+        db.query(server.GenerationJobChunkDB).filter(server.GenerationJobChunkDB.status == "pending").update(
+            {"status": "cancelled"}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+    response = client.post("/api/ai/jobs", json={
+        "class_id": make_class(), "text_content": f"Job source {os.urandom(4).hex()}.", "questions_per_chunk": 1
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["job_id"]
+
+
+def job_status(client, job_id):
+    response = client.get(f"/api/ai/jobs/{job_id}")
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def make_available_now(server, job_id):
+    db = server.SessionLocal()
+    try:
+        db.query(server.GenerationJobChunkDB).filter(server.GenerationJobChunkDB.job_id == job_id).update(
+            {"available_at": datetime.now().isoformat()}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_claimed_chunk_is_run_once(server, client, job, ai_client):
+    work = server.claim_job_chunk()
+    assert (work["job_id"], work["attempts"]) == (job, 1)
+    assert server.claim_job_chunk() is None
+
+    asyncio.run(server.run_job_chunk(work))
+    status = job_status(client, job)
+    assert status["status"] == "completed"
+    assert status["chunks"]["done"] == 1
+    results = client.get(f"/api/ai/jobs/{job}/results").json()
+    assert [question["question"] for question in results["generated_questions"]] == ["What colour is the square?"]
+    assert ai_client.calls == 1
+
+
+def test_failed_chunk_is_retried_after_a_delay_then_fails(server, client, job, ai_client, monkeypatch):
+    async def fail(**kwargs):
+        raise RuntimeError("model overloaded")
+    monkeypatch.setattr(ai_client, "create", fail)
+
+    work = server.claim_job_chunk()
+    asyncio.run(server.run_job_chunk(work))
+    status = job_status(client, job)
+    assert status["chunks"]["pending"] == 1
+    assert [(error["status"], error["attempts"]) for error in status["errors"]] == [("pending", 1)]
+    assert "model overloaded" in status["errors"][0]["error"]
+    assert server.claim_job_chunk() is None  # still waiting out the retry delay
+
+    make_available_now(server, job)
+    work = server.claim_job_chunk()
+    assert work["attempts"] == 2
+    work["max_attempts"] = 2
+    asyncio.run(server.run_job_chunk(work))
+    status = job_status(client, job)
+    assert status["status"] == "failed"
+    assert status["errors"][0]["attempts"] == 2
+
+
+def test_cancelled_chunk_is_released(server, client, job, ai_client, monkeypatch):
+    async def hang(**kwargs):
+        await asyncio.sleep(60)
+    monkeypatch.setattr(ai_client, "create", hang)
+
+    async def cancel_mid_call():
+        task = asyncio.create_task(server.run_job_chunk(server.claim_job_chunk()))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    asyncio.run(cancel_mid_call())
+    status = job_status(client, job)
+    assert status["chunks"]["pending"] == 1
+    assert status["chunks"]["running"] == 0
+
+
+def test_abandoned_chunk_is_reclaimed_and_the_old_claim_ignored(server, client, job):
+    abandoned = server.claim_job_chunk()
+    db = server.SessionLocal()
+    try:
+        long_ago = (datetime.now() - timedelta(days=1)).isoformat()
+        db.query(server.GenerationJobChunkDB).filter(server.GenerationJobChunkDB.id == abandoned["chunk_id"]).update(
+            {"claimed_at": long_ago}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+    abandoned["claimed_at"] = long_ago
+
+    reclaimed = server.claim_job_chunk()
+    assert reclaimed["chunk_id"] == abandoned["chunk_id"]
+    assert reclaimed["attempts"] == 2
+    server.finish_job_chunk(abandoned, [{"question": "Stale?"}])
+    assert job_status(client, job)["chunks"]["running"] == 1
+
+    server.release_job_chunk(reclaimed)
+    status = job_status(client, job)
+    assert status["chunks"]["pending"] == 1
+    assert status["question_count"] == 0
+
+
+def test_rate_limiter_spaces_out_calls():
+    limiter = RateLimiter(per_minute=600)
+
+    async def three_calls():
+        start = time.monotonic()
+        await asyncio.gather(limiter.wait(), limiter.wait(), limiter.wait())
+        return time.monotonic() - start
+    assert 0.19 <= asyncio.run(three_calls()) < 1
+
+
+def test_text_is_split_between_paragraphs_then_sentences():
+    text = "First paragraph.\n\nSecond one here.\n\n" + "A long sentence. " * 4
+    chunks = split_text_into_chunks(text, 40)
+    assert chunks[0] == "First paragraph.\n\nSecond one here."
+    assert all(len(chunk) <= 40 for chunk in chunks)
+    assert " ".join(chunks[1:]).split() == ("A long sentence. " * 4).split()
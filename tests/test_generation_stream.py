@@ -0,0 +1,53 @@
+import json
+import os
+
+from json_stream import JSONArrayStream
+
+
+def stream_events(client, body):
+    response = client.post("/api/ai/generate-questions/stream", json=body)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_questions_are_streamed_then_served_from_the_cache(client, make_class, ai_client):
+    body = {"class_id": make_class(), "text_content": f"Colours {os.urandom(4).hex()}", "num_questions": 1}
+
+    events = stream_events(client, body)
+    assert [event["type"] for event in events] == ["meta", "question", "done"]
+    assert not events[0]["cached"]
+    assert events[1]["question"]["question"] == "What colour is the square?"
+    assert events[2]["total_generated"] == 1
+
+    cached = stream_events(client, body)
+    assert cached[0]["cached"]
+    assert cached[1:] == events[1:]
+    assert ai_client.calls == 1
+
+
+def test_empty_request_is_rejected_before_streaming(client, make_class, ai_client):
+    response = client.post("/api/ai/generate-questions/stream", json={"class_id": make_class(), "num_questions": 1})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Provide text_content or at least one image"
+    assert ai_client.calls == 0
+
+
+def test_objects_are_returned_as_soon_as_they_close():
+    text = 'Sure! ```json\n{"questions": [{"question": "A \\"quoted\\" [one]?"}, 7, {"question": "B?"}]}\n```'
+    parser = JSONArrayStream("questions")
+    completed = []
+    for position, character in enumerate(text):
+        for item in parser.feed(character):
+            completed.append((item["question"], position))
+
+    first_closed = text.index('}, 7')
+    assert completed == [('A "quoted" [one]?', first_closed), ("B?", text.index("}]}"))]
+    assert parser.done
+
+
+def test_bare_arrays_and_malformed_entries():
+    parser = JSONArrayStream("questions")
+    assert parser.feed('[{"question": "A?"}, {"question": oops}, {"question"') == [{"question": "A?"}]
+    assert parser.feed(': "C?"}]') == [{"question": "C?"}]
+    assert parser.malformed == 1
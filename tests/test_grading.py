@@ -0,0 +1,45 @@
+import json
+
+from grading import answer_key, grade_answer
+
+
+def keyed(question_type, options, correct_answer):
+    return answer_key([(1, question_type, json.dumps(options), correct_answer)])[1]
+
+
+def test_multiple_choice():
+    question = keyed("multiple_choice", ["Paris", "Rome"], "Paris")
+    assert grade_answer(question, "  paris ")
+    assert not grade_answer(question, "Rome")
+    assert not grade_answer(question, None)
+
+
+def test_single_blank():
+    question = keyed("fill_blank", ["mitochondria", "the mitochondria"], "mitochondria")
+    assert grade_answer(question, ["The  Mitochondria"])
+    assert grade_answer(question, "mitochondria")
+    assert not grade_answer(question, ["mito"])
+    assert not grade_answer(question, [""])
+
+
+def test_blanks_match_the_answers_in_order():
+    question = keyed("fill_blank", ["moon", "earth"], "moon")
+    assert grade_answer(question, ["Moon", "earth"])
+    assert not grade_answer(question, ["earth", "moon"])
+    assert not grade_answer(question, ["moon", "moon"])
+    assert not grade_answer(question, ["moon", ""])
+
+
+def test_blanks_match_the_parts_of_an_answer():
+    question = keyed("fill_blank", ["moon, earth", "moon; planet"], "moon, earth")
+    assert grade_answer(question, ["moon", "earth"])
+    assert grade_answer(question, ["moon", "planet"])
+    assert not grade_answer(question, ["earth", "moon"])
+    assert not grade_answer(question, ["moon", "moon"])
+    assert not grade_answer(question, ["earth", "earth"])
+
+
+def test_blanks_joined_are_an_answer():
+    question = keyed("fill_blank", ["new york"], "new york")
+    assert grade_answer(question, ["New", "York"])
+    assert not grade_answer(question, ["york", "new"])
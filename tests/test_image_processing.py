@@ -0,0 +1,82 @@
+import asyncio
+import base64
+import io
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+
+from image_processing import EXIF_ORIENTATION, prepare_image
+
+
+def encode(image, format="PNG", **params):
+    output = io.BytesIO()
+    image.save(output, format, **params)
+    return base64.b64encode(output.getvalue()).decode("ascii")
+
+
+def decode(image_data):
+    return Image.open(io.BytesIO(base64.b64decode(image_data)))
+
+
+def test_large_image_is_scaled_to_fit():
+    result = prepare_image(encode(Image.new("RGB", (800, 400), "red")), 200, 85)
+    assert result["original_size"] == [800, 400]
+    assert result["processed_size"] == [200, 100]
+    image = decode(result["image_data"])
+    assert (image.format, image.size) == ("JPEG", (200, 100))
+
+
+def test_small_jpeg_is_kept_as_is():
+    image_data = encode(Image.effect_noise((40, 30), 64).convert("RGB"), "JPEG", quality=30)
+    result = prepare_image(image_data, 200, 95)
+    assert result["image_data"] == image_data
+    assert result["processed_bytes"] == result["original_bytes"]
+
+
+def test_exif_orientation_is_applied():
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = 6  # rotated 90 degrees
+    image_data = encode(Image.new("RGB", (60, 20), "green"), "JPEG", exif=exif)
+    assert prepare_image(image_data, 200, 85)["processed_size"] == [20, 60]
+
+
+def test_transparency_is_flattened_onto_white():
+    result = prepare_image(encode(Image.new("RGBA", (10, 10), (0, 0, 0, 0))), 200, 95)
+    assert min(decode(result["image_data"]).convert("L").getdata()) > 240
+
+
+def test_unreadable_data_raises_value_error():
+    with pytest.raises(ValueError):
+        prepare_image(base64.b64encode(b"not an image").decode("ascii"), 200, 85)
+    with pytest.raises(ValueError):
+        prepare_image("%%%", 200, 85)
+
+
+def test_request_images_are_prepared_in_the_process_pool(server, monkeypatch):
+    pool = ProcessPoolExecutor(max_workers=2)
+    monkeypatch.setattr(server, "IMAGE_POOL", pool)
+    images = [encode(Image.new("RGB", (3000, 1000), colour)) for colour in ["red", "blue"]]
+    db = server.SessionLocal()
+    try:
+        results = asyncio.run(server.prepare_request_images(db, images))
+        assert [result["processed_size"] for result in results] == [[2048, 683]] * 2
+
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(server.prepare_request_images(db, images + ["bm90IGFuIGltYWdl"]))
+        assert error.value.status_code == 400
+        assert error.value.detail.startswith("Image 3:")
+    finally:
+        db.close()
+        pool.shutdown()
+
+
+def test_each_listed_image_is_reported(client, make_class, ai_client):
+    images = [encode(Image.new("RGB", (64, 48), colour)) for colour in ["purple", "orange"]]
+    response = client.post("/api/ai/generate-questions", json={"class_id": make_class(), "image_data_list": images, "num_questions": 1})
+    assert response.status_code == 200, response.text
+    reports = response.json()["images"]
+    assert len(reports) == 2
+    assert all(report["original_size"] == [64, 48] and report["questions"] == 1 for report in reports)
+    assert ai_client.calls == 2
@@ -0,0 +1,75 @@
+import json
+
+import numpy as np
+
+from item_analysis import ItemTotals, answer_label, item_statistics
+
+
+def stats_of(totals, question_id):
+    return item_statistics(type("Totals", (), dict(zip(
+        ("responses", "correct", "unanswered", "rest_score_sum", "rest_score_sq_sum",
+         "correct_rest_score_sum", "timed_responses", "seconds_sum"),
+        totals.items[question_id]
+    ))))
+
+
+def test_discrimination_is_the_correlation_with_the_rest_score():
+    # Per attempt: whether each of questions 1-3 was answered correctly
+    attempts = [(1, 1, 1), (1, 1, 0), (1, 0, 0), (0, 0, 1), (0, 1, 0), (1, 1, 1), (0, 0, 0)]
+    totals = ItemTotals()
+    for graded in attempts:
+        totals.add_attempt(sum(graded), len(graded), [
+            {"question_id": question_id, "answer": json.dumps("x"), "is_correct": is_correct, "seconds": 10.0}
+            for question_id, is_correct in enumerate(graded, start=1)
+        ])
+
+    statistics = stats_of(totals, 1)
+    correct = [graded[0] for graded in attempts]
+    rest_scores = [(sum(graded) - graded[0]) / 2 for graded in attempts]
+    assert statistics["discrimination"] == round(float(np.corrcoef(correct, rest_scores)[0, 1]), 3)
+    assert statistics["percent_correct"] == round(100.0 * 4 / 7, 1)
+    assert statistics["avg_seconds"] == 10.0
+
+
+def test_unanswered_questions_are_counted_apart_from_the_answers():
+    totals = ItemTotals()
+    totals.add_attempt(0, 1, [{"question_id": 1, "answer": None, "is_correct": 0}])
+    totals.add_attempt(1, 1, [{"question_id": 1, "answer": json.dumps(["  Moon ", "EARTH"]), "is_correct": 1}])
+    assert totals.items[1][2] == 1
+    assert dict(totals.answers) == {(1, "moon / earth"): 1}
+    assert answer_label([" ", ""]) is None
+    assert stats_of(totals, 1)["avg_seconds"] is None
+
+
+def test_question_without_responses_has_empty_statistics():
+    statistics = item_statistics(None)
+    assert statistics["responses"] == 0
+    assert statistics["percent_correct"] is None
+    assert statistics["discrimination"] is None
+
+
+def make_quiz(client, class_id):
+    response = client.post("/api/quizzes", json={"title": f"Stats quiz {class_id}", "class_id": class_id, "questions": [
+        {"question": "Capital of France?", "options": ["Paris", "Rome", "Oslo"], "correct_answer": "Paris"},
+        {"question": "2 + 2?", "options": ["4", "5"], "correct_answer": "4"},
+    ]})
+    assert response.status_code == 200, response.text
+    return response.json()["quiz_id"], response.json()["question_ids"]
+
+
+def test_submissions_update_the_stored_totals(client, make_class):
+    quiz_id, (capital, sum_question) = make_quiz(client, make_class())
+    for answers in [{capital: "Paris", sum_question: "4"}, {capital: "Rome", sum_question: "4"}, {capital: "Paris"}]:
+        response = client.post(f"/api/quizzes/{quiz_id}/attempts", json={"answers": [
+            {"question_id": question_id, "answer": answer, "seconds": 5} for question_id, answer in answers.items()
+        ]})
+        assert response.status_code == 200, response.text
+
+    questions = client.get(f"/api/analytics/quizzes/{quiz_id}").json()["questions"]
+    assert [(question["responses"], question["correct"], question["unanswered"]) for question in questions] == [(3, 2, 0), (3, 2, 1)]
+
+    capital_stats = client.get(f"/api/analytics/questions/{capital}").json()
+    assert [(answer["answer"], answer["responses"]) for answer in capital_stats["answers"]] == [("Paris", 2), ("Rome", 1), ("Oslo", 0)]
+
+    assert client.post("/api/analytics/rebuild").status_code == 200
+    assert client.get(f"/api/analytics/quizzes/{quiz_id}").json()["questions"] == questions
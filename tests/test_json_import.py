@@ -0,0 +1,71 @@
+import json
+
+from question_normalization import validate_question
+
+
+def multiple_choice(text, answer="a"):
+    return {"question": text, "question_type": "multiple_choice", "options": ["a", "b"], "correct_answer": answer}
+
+
+def import_questions(client, body, **params):
+    return client.post("/api/validate-json-questions/batch", params=params, data=body)
+
+
+def bank_questions(server, class_id):
+    db = server.SessionLocal()
+    try:
+        return [text for (text,) in db.query(server.QuestionBankDB.question).filter(server.QuestionBankDB.class_id == class_id).order_by(server.QuestionBankDB.id)]
+    finally:
+        db.close()
+
+
+def test_summary_lists_only_the_invalid_questions(client):
+    questions = [multiple_choice("One?"), multiple_choice("Two?", answer="c"), multiple_choice("Three?")]
+    response = import_questions(client, json.dumps({"title": "Export", "questions": questions}))
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert (result["total_questions"], result["valid_questions"], result["invalid_questions"]) == (3, 2, 1)
+    assert not result["is_valid"]
+    assert [question["index"] for question in result["invalid"]] == [2]
+    assert result["validation_errors"] == ["Question 2: Correct answer must be one of the provided options"]
+
+
+def test_valid_questions_are_added_to_the_bank_in_batches(server, client, make_class, monkeypatch):
+    monkeypatch.setattr(server, "IMPORT_BATCH_SIZE", 2)
+    class_id = make_class()
+    questions = [multiple_choice(f"Batch {i}?") for i in range(5)] + [{"question": "Broken"}]
+    response = import_questions(client, json.dumps(questions), class_id=class_id, add_to_bank="true")
+    assert response.status_code == 200, response.text
+    assert response.json()["questions_added"] == 5
+    assert bank_questions(server, class_id) == [f"Batch {i}?" for i in range(5)]
+
+
+def test_truncated_import_adds_nothing(server, client, make_class, monkeypatch):
+    monkeypatch.setattr(server, "IMPORT_BATCH_SIZE", 1)
+    class_id = make_class()
+    body = json.dumps({"questions": [multiple_choice("Kept?"), multiple_choice("Lost?")]})[:-10]
+    response = import_questions(client, body, class_id=class_id, add_to_bank="true")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "JSON ended before the questions array was closed"
+    assert bank_questions(server, class_id) == []
+
+
+def test_body_without_questions_is_rejected(client):
+    assert import_questions(client, '{"title": "Nothing"}').json()["detail"] == "No questions array found in the JSON"
+    assert import_questions(client, '{"questions": []}').json()["detail"] == "No questions provided"
+
+
+def test_fill_blank_answers_are_lowercased_into_the_options():
+    question = validate_question({
+        "question": "The capital of France is {blank}.", "question_type": "fill_blank",
+        "options": ["Paris"], "correct_answer": "Paris", "acceptable_answers": [" Paris ", "PARIS", ""]
+    })
+    assert question["is_valid"], question["validation_errors"]
+    assert question["options"] == question["acceptable_answers"] == ["paris", "paris"]
+    assert question["correct_answer"] == "paris"
+    assert question["blank_positions"] == [25]
+
+
+def test_fill_blank_without_a_blank_is_invalid():
+    question = validate_question({"question": "No blank here", "question_type": "fill_blank", "options": ["x"], "correct_answer": "x"})
+    assert question["validation_errors"] == ["Fill-in-blank questions must contain at least one {blank} token"]
@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+
+from sqlalchemy import create_engine, inspect, text
+
+import migrations
+import models
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_added_column_gets_its_server_default(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE quizzes (id INTEGER PRIMARY KEY, title VARCHAR)"))
+        conn.execute(text("INSERT INTO quizzes (title) VALUES ('Cells')"))
+        migrations.add_column(conn, models.Base.metadata, "quizzes", "version")
+        assert conn.execute(text("SELECT version FROM quizzes")).scalar() == 1
+        version = next(column for column in inspect(conn).get_columns("quizzes") if column["name"] == "version")
+        assert not version["nullable"]
+
+
+def test_script_migrates_without_the_app(tmp_path):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'deploy.db'}")
+    result = subprocess.run(
+        [sys.executable, "-c", "import runpy, sys; runpy.run_path('migrations.py', run_name='__main__'); assert 'server' not in sys.modules"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    assert f"Schema is at version {len(migrations.MIGRATIONS)} of {len(migrations.MIGRATIONS)}" in result.stdout
@@ -0,0 +1,74 @@
+import numpy as np
+
+from near_duplicates import band_keys, duplicate_clusters, match_batch, question_text, signatures, similarities
+
+PHOTOSYNTHESIS = "Which organelle carries out photosynthesis in plant cells?"
+OPTIONS = ["Chloroplast", "Mitochondrion", "Nucleus", "Ribosome"]
+
+
+def test_text_ignores_case_punctuation_and_option_order():
+    assert question_text("What is H2O?!", ["water", "salt"]) == question_text("what is h2o", '["salt", "water"]')
+
+
+def test_edited_copy_is_similar_and_other_questions_are_not():
+    original, copy, other = signatures([
+        question_text(PHOTOSYNTHESIS, OPTIONS),
+        question_text(PHOTOSYNTHESIS.replace("Which", "What"), OPTIONS),
+        question_text("In what year did the Second World War end?", ["1943", "1944", "1945", "1946"]),
+    ])
+    assert similarities(original, np.stack([original, copy, other])).tolist()[0] == 1.0
+    assert similarities(original, copy[None, :])[0] >= 0.8
+    assert similarities(original, other[None, :])[0] < 0.3
+
+
+def test_batch_copies_point_at_the_bank_question_or_the_first_copy():
+    texts = [question_text(PHOTOSYNTHESIS, OPTIONS), question_text("Name the largest planet.", ["Jupiter", "Mars"])]
+    bank = signatures(texts[:1])
+    bank_keys = band_keys(bank)
+    batch = signatures(texts + texts[1:])
+    matches = match_batch(batch, band_keys(batch), {key: [41] for key in bank_keys[0].tolist()}, {41: bank[0]})
+    assert (matches[0].question_id, matches[0].index) == (41, None)
+    assert matches[1] is None
+    assert (matches[2].question_id, matches[2].index) == (None, 1)
+
+
+def test_clusters_join_matches_transitively():
+    a, b = signatures([question_text(PHOTOSYNTHESIS, OPTIONS), question_text("Name the largest planet.", ["Jupiter", "Mars"])])
+    signatures_by_id = {1: a, 2: a, 3: a, 4: b, 5: b, 6: signatures(["unrelated text entirely"])[0]}
+    assert duplicate_clusters([[1, 2], [2, 3], [4, 5, 6]], signatures_by_id) == [[1, 2, 3], [4, 5]]
+
+
+def add(client, class_id, text, options=OPTIONS, **params):
+    response = client.post("/api/question-bank", params=params, json={
+        "question": text, "question_type": "multiple_choice", "options": options,
+        "correct_answer": options[0], "class_id": class_id
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_duplicates_are_reported_skipped_and_clustered(client, make_class):
+    class_id = make_class()
+    original = add(client, class_id, PHOTOSYNTHESIS)
+    assert original["duplicate_of"] is None
+
+    skipped = add(client, class_id, PHOTOSYNTHESIS.upper(), options=list(reversed(OPTIONS)), skip_duplicates="true")
+    assert skipped["question_id"] is None
+    assert skipped["duplicate_of"] == original["question_id"]
+
+    kept = add(client, class_id, PHOTOSYNTHESIS + "!")
+    assert kept["duplicate_of"] == original["question_id"]
+
+    response = client.post("/api/ai/add-to-bank", json={"class_id": class_id, "questions": [
+        {"question": "Name the largest planet.", "options": ["Jupiter", "Mars"], "correct_answer": "Jupiter"},
+        {"question": "Name the largest planet!", "options": ["Mars", "Jupiter"], "correct_answer": "Jupiter"},
+    ]})
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert [(duplicate["index"], duplicate["duplicate_of"]) for duplicate in result["duplicates"]] == [(1, result["question_ids"][0])]
+
+    report = client.get(f"/api/classes/{class_id}/duplicates").json()
+    assert report["total_clusters"] == 2
+    assert [[question["id"] for question in cluster["questions"]] for cluster in report["clusters"]] == [
+        [original["question_id"], kept["question_id"]], result["question_ids"]
+    ]
@@ -0,0 +1,92 @@
+"""
+Statements only PostgreSQL runs, compiled against its dialect, so they are
+checked even when the suite runs on SQLite. TEST_DATABASE=postgresql runs
+the whole suite against a real server.
+"""
+
+import json
+
+from sqlalchemy import Text, cast, create_mock_engine, or_
+from sqlalchemy.dialects import postgresql
+
+
+class RecordingSession:
+    """Stands in for a Session bound to PostgreSQL: records the statements
+    executed and answers each with the next of `returned` id lists"""
+
+    class Result:
+        def __init__(self, ids):
+            self.ids = ids
+
+        def scalars(self):
+            return self
+
+        def all(self):
+            return self.ids
+
+    def __init__(self, returned=()):
+        self.bind = create_mock_engine("postgresql://", lambda sql, *multiparams, **params: None)
+        self.statements = []
+        self.returned = list(returned)
+
+    def execute(self, statement, params=None):
+        self.statements.append(str(statement.compile(dialect=self.bind.dialect)))
+        return self.Result(self.returned.pop(0) if self.returned else [])
+
+
+def test_schema_uses_jsonb(server):
+    statements = []
+    engine = create_mock_engine("postgresql://", lambda sql, *multiparams, **params: statements.append(str(sql.compile(dialect=engine.dialect))))
+    server.Base.metadata.create_all(engine, checkfirst=False)
+    question_bank = next(statement for statement in statements if statement.strip().startswith("CREATE TABLE question_bank "))
+    assert "options JSONB NOT NULL" in question_bank
+    assert "tags JSONB" in question_bank
+    # add_column() in migrations.py compiles the column type the same way
+    assert server.QuestionBankDB.__table__.c.tags.type.compile(dialect=postgresql.dialect()) == "JSONB"
+
+
+def test_json_text_is_sent_and_read_as_json():
+    from database import JSONText
+    dialect = postgresql.dialect()
+    column_type = JSONText()
+    assert column_type.process_bind_param('["a", "b"]', dialect) == ["a", "b"]
+    assert json.loads(column_type.process_result_value(["a", "b"], dialect)) == ["a", "b"]
+    assert column_type.process_bind_param(None, dialect) is None
+
+
+def test_bulk_insert_returns_ids_from_returning(server, monkeypatch):
+    monkeypatch.setattr(server, "BULK_INSERT_CHUNK_SIZE", 2)
+    db = RecordingSession(returned=[[1, 2], [3]])
+    ids = server.bulk_insert(db, server.ClassDB.__table__, [{"name": f"Class {i}"} for i in range(3)])
+    assert ids == [1, 2, 3]
+    assert len(db.statements) == 2
+    assert all(statement.startswith("INSERT INTO classes") and statement.endswith("RETURNING classes.id") for statement in db.statements)
+
+
+def test_insert_tags_skips_existing_names(server):
+    db = RecordingSession()
+    server.insert_tags(db, ["biology"])
+    assert len(db.statements) == 1
+    assert db.statements[0].startswith("INSERT INTO tags") and db.statements[0].endswith("ON CONFLICT (name) DO NOTHING")
+
+
+def test_item_totals_are_added_by_upserts(server):
+    from item_analysis import ItemTotals
+    totals = ItemTotals()
+    totals.add_attempt(1, 1, [{"question_id": 7, "answer": json.dumps("x"), "is_correct": 1}])
+    db = RecordingSession()
+    server.add_item_totals(db, "question", totals)
+    assert len(db.statements) == 2
+    stats, counts = db.statements
+    assert stats.startswith("INSERT INTO item_stats")
+    assert "ON CONFLICT (item_type, item_id) DO UPDATE SET responses = (item_stats.responses + excluded.responses)" in stats
+    assert counts.startswith("INSERT INTO item_answer_counts")
+    assert counts.endswith("ON CONFLICT (item_type, item_id, answer) DO UPDATE SET responses = (item_answer_counts.responses + excluded.responses)")
+
+
+def test_search_falls_back_to_ilike(server):
+    pattern = "%cell%"
+    condition = or_(server.QuestionBankDB.question.ilike(pattern), cast(server.QuestionBankDB.tags, Text).ilike(pattern))
+    compiled = str(condition.compile(dialect=postgresql.dialect()))
+    assert "question_bank.question ILIKE" in compiled
+    assert "CAST(question_bank.tags AS TEXT) ILIKE" in compiled
@@ -0,0 +1,52 @@
+import pytest
+
+from question_normalization import (BLANK_MARKER, blank_positions, extract_questions,
+                                    normalize_questions, process_generated_question)
+
+QUESTION = '{"question": "Which [1] is right?", "question_type": "multiple_choice", "options": ["a", "b"], "correct_answer": "b"}'
+
+
+@pytest.mark.parametrize("reply", [
+    '{"questions": [%s]}' % QUESTION,
+    '[%s]' % QUESTION,
+    'Here you go:\n```json\n{"questions": [%s]}\n```\nSee [1] for more.' % QUESTION,
+    'Note {"unrelated": true} first. [%s, 3]' % QUESTION,
+])
+def test_questions_are_found_in_any_reply_shape(reply):
+    assert [question["question"] for question in extract_questions(reply)] == ["Which [1] is right?"]
+
+
+def test_truncated_reply_keeps_the_finished_questions():
+    assert len(extract_questions('{"questions": [%s, {"question": "Cut o' % QUESTION)) == 1
+
+
+def test_reply_without_json_is_rejected():
+    with pytest.raises(ValueError):
+        extract_questions("Sorry, I can't help with that.")
+
+
+def test_blanks_are_found_in_one_pass():
+    text = "The {blank} sat on the [blank] near the ____."
+    assert blank_positions(text) == [4]
+    assert blank_positions(text, BLANK_MARKER) == [4, 23, 40]
+
+
+def test_fill_blank_answers_become_the_options():
+    question = process_generated_question({
+        "question": "Water boils at ___ degrees.", "question_type": "fill_blank",
+        "correct_answer": "100", "acceptable_answers": ["100", "one hundred"], "tags": ["physics", "heat"]
+    }, "easy")
+    assert question["options"] == question["acceptable_answers"] == ["100", "one hundred"]
+    assert question["tags"] == "physics,heat"
+    assert question["difficulty"] == "easy"
+    assert question["blank_positions"] == [15]
+
+
+def test_multiple_choice_answer_falls_back_to_the_first_option():
+    assert process_generated_question({"question": "Q?", "options": ["x", "y"], "correct_answer": "z"}, "medium")["correct_answer"] == "x"
+    assert process_generated_question({"question": "Q?", "options": [], "correct_answer": "z"}, "medium") is None
+
+
+def test_unusable_questions_are_dropped():
+    reply = '{"questions": [%s, {"question": "No options", "correct_answer": "z"}]}' % QUESTION
+    assert [question["correct_answer"] for question in normalize_questions(reply, "hard")] == ["b"]
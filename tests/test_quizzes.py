@@ -0,0 +1,33 @@
+def create_quiz(client, class_id, title, count=2):
+    response = client.post("/api/quizzes", json={"title": title, "class_id": class_id, "questions": [
+        {"question": f"Question {i}?", "options": ["a", "b"], "correct_answer": "a"} for i in range(count)
+    ]})
+    assert response.status_code == 200, response.text
+    quiz_id = response.json()["quiz_id"]
+    return client.get(f"/api/quizzes/{quiz_id}").json()
+
+
+def test_patch_updates_and_deletes(client, make_class):
+    quiz = create_quiz(client, make_class(), "Patched", count=3)
+    first, second, third = (question["id"] for question in quiz["questions"])
+    response = client.patch(f"/api/quizzes/{quiz['id']}", json={
+        "version": quiz["version"],
+        "upsert_questions": [{"id": first, "question": "Edited?", "options": ["a", "b"], "correct_answer": "b"}],
+        "delete_question_ids": [third]
+    })
+    assert response.status_code == 200, response.text
+    questions = client.get(f"/api/quizzes/{quiz['id']}").json()["questions"]
+    assert [(question["id"], question["question"]) for question in questions] == [(first, "Edited?"), (second, "Question 1?")]
+
+
+def test_patch_rejects_updating_and_deleting_one_question(client, make_class):
+    quiz = create_quiz(client, make_class(), "Conflicting")
+    question_id = quiz["questions"][0]["id"]
+    response = client.patch(f"/api/quizzes/{quiz['id']}", json={
+        "version": quiz["version"],
+        "upsert_questions": [{"id": question_id, "question": "Edited?", "options": ["a", "b"], "correct_answer": "a"}],
+        "delete_question_ids": [question_id]
+    })
+    assert response.status_code == 400
+    assert str(question_id) in response.json()["detail"]
+    assert client.get(f"/api/quizzes/{quiz['id']}").json() == quiz
@@ -0,0 +1,31 @@
+def due_ids(client, learner, class_id):
+    response = client.get("/api/review/due", params={"learner": learner, "class_id": class_id})
+    assert response.status_code == 200, response.text
+    return [question["id"] for question in response.json()["questions"]]
+
+
+def test_new_questions_in_bank_order(client, make_class, add_question):
+    class_id = make_class()
+    first = add_question(class_id, "Which planet is known as the red planet?")
+    second = add_question(class_id, "Which gas do plants take in for photosynthesis?")
+    assert due_ids(client, "ana", class_id) == [first, second]
+
+    response = client.post("/api/review/grades", json={"learner": "ana", "reviews": [{"question_id": first, "grade": 5}]})
+    assert response.status_code == 200, response.text
+    assert due_ids(client, "ana", class_id) == [second]
+
+
+def test_question_moved_behind_the_cursor_is_offered(client, make_class, add_question):
+    class_a, class_b = make_class(), make_class()
+    moved = add_question(class_a, "What is the boiling point of water at sea level?")
+    reviewed = add_question(class_b, "Who painted the Mona Lisa?")
+    response = client.post("/api/review/grades", json={"learner": "sam", "reviews": [{"question_id": reviewed, "grade": 4}]})
+    assert response.status_code == 200, response.text
+    assert due_ids(client, "sam", class_b) == []
+
+    response = client.put(f"/api/question-bank/{moved}", json={
+        "question": "What is the boiling point of water at sea level?", "question_type": "multiple_choice",
+        "options": ["a", "b"], "correct_answer": "a", "class_id": class_b, "difficulty": "medium"
+    })
+    assert response.status_code == 200, response.text
+    assert due_ids(client, "sam", class_b) == [moved]
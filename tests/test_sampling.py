@@ -0,0 +1,91 @@
+import random
+
+
+def add_bank_questions(client, class_id, count, difficulty, tags=""):
+    ids = []
+    for i in range(count):
+        response = client.post("/api/question-bank", json={
+            "question": f"{difficulty} question {i}?", "question_type": "multiple_choice",
+            "options": ["a", "b"], "correct_answer": "a", "class_id": class_id,
+            "difficulty": difficulty, "tags": tags
+        })
+        assert response.status_code == 200, response.text
+        ids.append(response.json()["question_id"])
+    return ids
+
+
+def sample(client, body):
+    response = client.post("/api/question-bank/sample", json=body)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_strata_draw_their_own_quota_without_repeats(client, make_class):
+    class_id = make_class()
+    easy = add_bank_questions(client, class_id, 6, "easy", tags="warmup")
+    hard = add_bank_questions(client, class_id, 4, "hard")
+
+    result = sample(client, {"class_id": class_id, "strata": [
+        {"count": 3, "difficulty": "easy"},
+        {"count": 2, "difficulty": "hard"},
+        {"count": 3, "tags_any": ["warmup"]},
+    ], "shuffle": False})
+    ids = [question["id"] for question in result["questions"]]
+    assert len(ids) == len(set(ids)) == 8
+    assert set(ids[:3]) <= set(easy)
+    assert set(ids[3:5]) <= set(hard)
+    assert set(ids[5:]) <= set(easy)
+    assert all(question["tags"] == ["warmup"] for question in result["questions"][5:])
+
+
+def test_the_same_seed_draws_the_same_sample(client, make_class):
+    class_id = make_class()
+    add_bank_questions(client, class_id, 20, "medium")
+    body = {"class_id": class_id, "strata": [{"count": 5}]}
+
+    first = sample(client, body)
+    again = sample(client, dict(body, seed=first["seed"]))
+    assert again == first
+
+    response = client.post("/api/question-bank/generate-quiz", params={"class_id": class_id, "num_questions": 5, "seed": 7})
+    assert response.status_code == 200, response.text
+    assert client.post("/api/question-bank/generate-quiz", params={"class_id": class_id, "num_questions": 5, "seed": 7}).json() == response.json()
+
+
+def test_not_enough_questions_is_rejected(client, make_class):
+    class_id = make_class()
+    add_bank_questions(client, class_id, 2, "easy")
+    response = client.post("/api/question-bank/sample", json={"class_id": class_id, "strata": [
+        {"count": 2, "difficulty": "easy"}, {"count": 1, "difficulty": "easy"}
+    ]})
+    assert response.status_code == 400
+    assert "Found 0, requested 1" in response.json()["detail"]
+
+
+def test_excluded_ids_are_drawn_around(server, client, make_class):
+    class_id = make_class()
+    ids = add_bank_questions(client, class_id, 30, "medium")
+    db = server.SessionLocal()
+    try:
+        query = db.query(server.QuestionBankDB.id).filter(server.QuestionBankDB.class_id == class_id)
+        drawn = server.draw_random_ids(db, query, 5, random.Random(1), exclude=ids[:25])
+    finally:
+        db.close()
+    assert sorted(drawn) == ids[25:]
+
+
+def test_questions_deleted_after_the_count_are_skipped(server, client, make_class):
+    class_id = make_class()
+    ids = add_bank_questions(client, class_id, 6, "medium")
+    db = server.SessionLocal()
+    try:
+        query = db.query(server.QuestionBankDB.id).filter(server.QuestionBankDB.class_id == class_id)
+        counted = query.count
+        query.count = lambda: counted() + 3  # three questions deleted since they were counted
+        drawn = server.draw_random_ids(db, query, 6, random.Random(2))
+        assert sorted(drawn) == ids
+
+        client.delete(f"/api/question-bank/{ids[0]}")
+        assert [question.id for question in server.load_bank_questions(db, ids)] == ids[1:]
+    finally:
+        db.close()
@@ -0,0 +1,59 @@
+import pytest
+
+
+def search(client, **params):
+    response = client.get("/api/question-bank/search", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_search_matches_question_text_and_tags(client, make_class):
+    class_id = make_class()
+    for text, tags in [("Photosynthesis happens in which organelle?", "botany"),
+                       ("Where does respiration happen?", "cells"),
+                       ("Which gas do plants release?", "botany, gases")]:
+        response = client.post("/api/question-bank", json={
+            "question": text, "question_type": "multiple_choice", "options": ["a", "b"],
+            "correct_answer": "a", "class_id": class_id, "tags": tags
+        })
+        assert response.status_code == 200, response.text
+
+    assert [item["question"] for item in search(client, q="photo", class_id=class_id)["items"]] == \
+        ["Photosynthesis happens in which organelle?"]
+    result = search(client, q="botany", class_id=class_id)
+    assert result["total"] == 2
+    assert search(client, q="nothing-like-this", class_id=class_id) == {"items": [], "total": 0, "next_cursor": None}
+
+
+def test_every_word_must_match_in_any_order(server, client, make_class, add_question):
+    if not server.FTS_ENABLED:
+        pytest.skip("needs SQLite FTS5")
+    class_id = make_class()
+    add_question(class_id, "The mitochondria is the powerhouse of the cell")
+    add_question(class_id, "The nucleus holds the cell's DNA")
+    items = search(client, q="power mito", class_id=class_id)["items"]
+    assert [item["question"] for item in items] == ["The mitochondria is the powerhouse of the cell"]
+
+
+def test_quotes_in_the_search_are_not_query_syntax(server):
+    assert server.fts_match_expression('say "hi" now') == '"say"* """hi"""* "now"*'
+
+
+def test_pages_follow_the_cursor(client, make_class, add_question):
+    class_id = make_class()
+    question_ids = [add_question(class_id, f"Page question {i}?") for i in range(5)]
+
+    seen = []
+    after_id = None
+    while True:
+        params = {"class_id": class_id, "limit": 2}
+        if after_id:
+            params["after_id"] = after_id
+        page = search(client, **params)
+        assert page["total"] == 5
+        assert len(page["items"]) <= 2
+        seen.extend(item["id"] for item in page["items"])
+        after_id = page["next_cursor"]
+        if after_id is None:
+            break
+    assert seen == question_ids
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+
+class Client:
+    """Stands in for a request's Request: is_disconnected() once `leave` is set"""
+
+    def __init__(self):
+        self.leave = asyncio.Event()
+
+    async def is_disconnected(self):
+        return self.leave.is_set()
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(server, monkeypatch):
+    monkeypatch.setattr(server, "DISCONNECT_POLL_SECONDS", 0.01)
+
+
+def test_call_continues_while_one_caller_waits(server):
+    async def scenario():
+        release = asyncio.Event()
+        calls = []
+
+        async def make_call():
+            calls.append(1)
+            await release.wait()
+            return "explanation"
+
+        leaving, staying = Client(), Client()
+        first = asyncio.ensure_future(server.single_flight("key", make_call, leaving))
+        second = asyncio.ensure_future(server.single_flight("key", make_call, staying))
+        await asyncio.sleep(0.02)
+        leaving.leave.set()
+        with pytest.raises(server.HTTPException) as disconnected:
+            await first
+        assert disconnected.value.status_code == 499
+        release.set()
+        assert await second == "explanation"
+        assert calls == [1]
+    asyncio.run(scenario())
+
+
+def test_call_is_cancelled_when_every_caller_disconnects(server):
+    async def scenario():
+        cancelled = asyncio.Event()
+
+        async def make_call():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        clients = [Client(), Client()]
+        waiters = [asyncio.ensure_future(server.single_flight("key", make_call, client)) for client in clients]
+        await asyncio.sleep(0.02)
+        for client in clients:
+            client.leave.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        assert all(isinstance(result, server.HTTPException) for result in results)
+        await asyncio.wait_for(cancelled.wait(), 1)
+        assert "key" not in server.IN_FLIGHT_AI_CALLS
+
+        async def next_call():
+            return "fresh"
+        assert await server.single_flight("key", next_call, Client()) == "fresh"
+    asyncio.run(scenario())
@@ -0,0 +1,23 @@
+def test_tags_are_linked_and_counted(client, make_class):
+    class_id = make_class()
+    response = client.post("/api/question-bank", json={
+        "question": "What is the powerhouse of the cell?", "question_type": "multiple_choice",
+        "options": ["mitochondria", "nucleus"], "correct_answer": "mitochondria", "class_id": class_id,
+        "tags": "Biology, cells ,biology"
+    })
+    assert response.status_code == 200, response.text
+    counts = {row["tag"]: row["question_count"] for row in client.get(f"/api/classes/{class_id}/tags").json()}
+    assert counts == {"biology": 1, "cells": 1}
+
+
+def test_inserting_a_tag_that_already_exists(server):
+    db = server.SessionLocal()
+    try:
+        db.execute(server.TagDB.__table__.insert(), [{"name": "added-meanwhile"}])
+        # As when a concurrent request added the tag after this one looked for it
+        server.insert_tags(db, ["added-meanwhile", "brand-new"])
+        names = [name for name, in db.query(server.TagDB.name).filter(server.TagDB.name.in_(["added-meanwhile", "brand-new"]))]
+        assert sorted(names) == ["added-meanwhile", "brand-new"]
+    finally:
+        db.rollback()
+        db.close()
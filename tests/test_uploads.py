@@ -0,0 +1,87 @@
+import asyncio
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from PIL import Image
+
+from uploads import UploadSpool, UploadTooLarge
+
+
+def png(colour):
+    output = io.BytesIO()
+    Image.new("RGB", (64, 48), colour).save(output, "PNG")
+    return output.getvalue()
+
+
+def test_small_upload_stays_in_memory():
+    spool = UploadSpool("photo.png", "image/png", max_bytes=100, memory_limit=10)
+    spool.write(b"12345")
+    spool.write(b"678")
+    source = spool.source()
+    assert isinstance(source, memoryview)
+    assert bytes(source) == b"12345678"
+    spool.close()
+
+
+def test_large_upload_moves_to_a_temporary_file():
+    spool = UploadSpool("photo.png", "image/png", max_bytes=100, memory_limit=10)
+    for piece in [b"0123456789", b"abcdef", b"ghij"]:
+        spool.write(piece)
+    path = spool.source()
+    assert path.read_bytes() == b"0123456789abcdefghij"
+    spool.close()
+    assert not os.path.exists(path)
+
+
+def test_upload_past_the_limit_is_refused():
+    spool = UploadSpool("photo.png", "image/png", max_bytes=10, memory_limit=4)
+    spool.write(b"0123456789")
+    with pytest.raises(UploadTooLarge):
+        spool.write(b"!")
+    spool.close()
+
+
+def test_uploaded_images_are_generated_from(client, make_class, ai_client):
+    files = [("images", (f"{colour}.png", png(colour), "image/png")) for colour in ["navy", "olive"]]
+    response = client.post(
+        "/api/ai/generate-questions/upload",
+        data={"request": json.dumps({"class_id": make_class(), "num_questions": 1})},
+        files=files
+    )
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert [image["original_size"] for image in result["images"]] == [[64, 48], [64, 48]]
+    assert result["total_generated"] == 2
+
+
+def test_spooled_bytes_are_sent_to_the_image_process_pool(server, monkeypatch):
+    spool = UploadSpool("photo.png", "image/png", max_bytes=10 ** 6)
+    spool.write(png("teal"))
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        monkeypatch.setattr(server, "IMAGE_POOL", pool)
+        db = server.SessionLocal()
+        try:
+            [report] = asyncio.run(server.prepare_request_images(db, [spool.source()]))
+        finally:
+            db.close()
+    assert report["original_size"] == [64, 48]
+    spool.close()
+
+
+def test_too_many_files_are_refused(client, make_class, ai_client):
+    files = [("images", (f"{index}.png", png("white"), "image/png")) for index in range(11)]
+    response = client.post(
+        "/api/ai/generate-questions/upload",
+        data={"request": json.dumps({"class_id": make_class()})},
+        files=files
+    )
+    assert response.status_code == 413
+    assert ai_client.calls == 0
+
+
+def test_body_must_be_multipart(client):
+    response = client.post("/api/ai/generate-questions/upload", json={"class_id": 1})
+    assert response.status_code == 400
@@ -0,0 +1,148 @@
+"""
+Streaming multipart/form-data uploads with a size limit.
+
+Starlette's request.form() has no size limit and keeps form fields in memory.
+read_multipart() parses the body as it arrives instead. Each file part is
+written to an UploadSpool, which holds up to `memory_limit` bytes in memory
+and moves to a temporary file on disk past that. An upload larger than
+`max_file_bytes` is refused as soon as it crosses the limit, without reading
+the rest of the body.
+
+A spool's source() is a view of the bytes, or the path of its temporary
+file. Image processing reads a file straight from that path in its own
+process, so an upload of any size costs this process at most
+`memory_limit` plus one network chunk.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+import multipart
+from multipart.multipart import parse_options_header
+
+SPOOL_MEMORY_LIMIT = 1024 * 1024
+MAX_FIELD_BYTES = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class UploadSpool:
+    def __init__(self, filename: str, content_type: str, max_bytes: int, memory_limit: int = SPOOL_MEMORY_LIMIT):
+        self.filename = filename
+        self.content_type = content_type
+        self.max_bytes = max_bytes
+        self.memory_limit = memory_limit
+        self.size = 0
+        self.buffer = bytearray()
+        self.file = None  # temporary file once past memory_limit
+
+    def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(f"{self.filename or 'Upload'} is larger than {self.max_bytes // (1024 * 1024)} MB")
+        if self.file is None and self.size > self.memory_limit:
+            self.file = tempfile.NamedTemporaryFile(prefix="quiz-upload-", delete=False)
+            self.file.write(self.buffer)
+            self.buffer = bytearray()
+        if self.file is not None:
+            self.file.write(data)
+        else:
+            self.buffer += data
+
+    def source(self) -> Union[memoryview, Path]:
+        """A view of the uploaded bytes, or the path of the temporary file holding them"""
+        if self.file is None:
+            return memoryview(self.buffer)
+        self.file.flush()
+        return Path(self.file.name)
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            try:
+                os.unlink(self.file.name)
+            except OSError:
+                pass
+            self.file = None
+        self.buffer = bytearray()
+
+
+async def read_multipart(request, max_file_bytes: int, max_files: int) -> Tuple[Dict[str, str], List[UploadSpool]]:
+    """Form fields (last value per name) and spooled file parts of a multipart request.
+
+    Raises UploadTooLarge past `max_file_bytes` per file, `max_files` files
+    or MAX_FIELD_BYTES per field, and ValueError for a body that is not
+    multipart/form-data. On error the spools already written are closed.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise ValueError("Expected a multipart/form-data body")
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_files * max_file_bytes + MAX_FIELD_BYTES:
+        raise UploadTooLarge(f"Upload is larger than {max_files} files of {max_file_bytes // (1024 * 1024)} MB")
+
+    fields = {}
+    files = []
+    part = {}
+
+    def on_part_begin():
+        part.clear()
+        part.update(headers={}, header_field=b"", header_value=b"", spool=None, data=bytearray())
+
+    def on_header_field(data, start, end):
+        part["header_field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        part["header_value"] += data[start:end]
+
+    def on_header_end():
+        part["headers"][part["header_field"].lower()] = part["header_value"]
+        part["header_field"] = part["header_value"] = b""
+
+    def on_headers_finished():
+        _, options = parse_options_header(part["headers"].get(b"content-disposition", b""))
+        part["name"] = options.get(b"name", b"").decode("utf-8", "replace")
+        if b"filename" in options:
+            if len(files) >= max_files:
+                raise UploadTooLarge(f"At most {max_files} files can be uploaded at once")
+            part["spool"] = UploadSpool(
+                options[b"filename"].decode("utf-8", "replace"),
+                part["headers"].get(b"content-type", b"").decode("latin-1"),
+                max_file_bytes
+            )
+            files.append(part["spool"])
+
+    def on_part_data(data, start, end):
+        if part["spool"] is not None:
+            part["spool"].write(data[start:end])
+        else:
+            part["data"] += data[start:end]
+            if len(part["data"]) > MAX_FIELD_BYTES:
+                raise UploadTooLarge(f"Form field '{part['name']}' is larger than {MAX_FIELD_BYTES // 1024} KB")
+
+    def on_part_end():
+        if part["spool"] is None:
+            fields[part["name"]] = part["data"].decode("utf-8", "replace")
+
+    parser = multipart.MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+        parser.finalize()
+    except BaseException:
+        for spool in files:
+            spool.close()
+        raise
+    return fields, files